@@ -1,7 +1,26 @@
 from django.contrib import admin
-from .models import CustomUserManager, User, Wallet
+from .models import CustomUserManager, User, Wallet, WalletLedgerEntry
 
 # Register your models here.
 
 admin.site.register(User)
 admin.site.register(Wallet)
+
+
+@admin.register(WalletLedgerEntry)
+class WalletLedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only: entries are append-only, and only the ledger functions keep balances in step."""
+
+    list_display = ("created_at", "user", "kind", "amount", "reference")
+    list_filter = ("kind",)
+    search_fields = ("reference",)
+    actions = None
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,251 @@
+"""
+Stateless JWT authentication with cached principals.
+
+Tokens issued by ``User_Login`` carry what a request needs to be
+authorized (see ``jwt_payload``): the user id, whether the account is
+active and ``User.token_version``. ``JWTAuthenticationMiddleware`` checks
+the signature and expiry and turns those claims into a ``Principal``
+without touching the database; ``principal.user`` loads the full row for
+the rare caller that needs it.
+
+Changing a password or soft-deleting a user bumps ``token_version``. Once
+the transaction commits, ``revoke`` records the new version in the shared
+Django cache for as long as a token can live, and tokens carrying another
+version are rejected from then on. Verified principals are kept in a
+small in-process cache for ``TTL`` seconds: the worker that revoked a
+user forgets them at once, other workers within ``TTL`` seconds.
+
+A user without a record in the shared cache (never looked up, or
+evicted) is checked against the database once, and the current version
+is recorded with ``add`` so it cannot overwrite a concurrent revocation.
+``CACHE_ALIAS`` must name a cache shared by every process; a deployment
+check (``accounts.E001``, run by ``check --deploy``) rejects per-process
+and dummy caches, with which a revocation would never reach the other
+workers. Configured by
+``settings.ACCOUNTS_PRINCIPALS``::
+
+    ACCOUNTS_PRINCIPALS = {
+        "CACHE_ALIAS": "default",   # where revocations are recorded
+        "TTL": 30,                  # seconds a verified principal is reused
+        "MAX_ENTRIES": 10000,       # principals kept per process
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import cached_property
+from graphql_jwt import utils as jwt_utils
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.settings import jwt_settings
+
+from core import metrics
+
+DEFAULT_SETTINGS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 30,
+    "MAX_ENTRIES": 10000,
+}
+
+
+# Caches that do not share entries between processes.
+UNSHARED_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "ACCOUNTS_PRINCIPALS", {})}
+
+
+@checks.register(checks.Tags.security, checks.Tags.caches, deploy=True)
+def check_revocation_cache(app_configs, **kwargs):
+    alias = _settings()["CACHE_ALIAS"]
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend is None:
+        return [checks.Error(
+            f"ACCOUNTS_PRINCIPALS['CACHE_ALIAS'] names the undefined cache {alias!r}.",
+            id="accounts.E001",
+        )]
+    if backend in UNSHARED_CACHE_BACKENDS:
+        return [checks.Error(
+            f"Token revocations are recorded in the {alias!r} cache, which is not shared between processes.",
+            hint="Point ACCOUNTS_PRINCIPALS['CACHE_ALIAS'] at a shared cache such as Redis.",
+            id="accounts.E001",
+        )]
+    return []
+
+
+def jwt_payload(user, context=None):
+    """``GRAPHQL_JWT["JWT_PAYLOAD_HANDLER"]``: the default claims plus id, state and version."""
+    payload = jwt_utils.jwt_payload(user, context)
+    payload.update({
+        "uid": user.pk,
+        "ver": user.token_version,
+        "active": user.is_active and not user.is_deleted,
+    })
+    return payload
+
+
+def token_lifetime():
+    """Seconds a token stays valid, or None when expiry is not verified."""
+    if not jwt_settings.JWT_VERIFY_EXPIRATION:
+        return None
+    lifetime = jwt_settings.JWT_EXPIRATION_DELTA
+    leeway = jwt_settings.JWT_LEEWAY
+    if not isinstance(leeway, timedelta):
+        leeway = timedelta(seconds=leeway)
+    return int((lifetime + leeway).total_seconds()) + 1
+
+
+class Principal:
+    """The authenticated user as far as the token tells; no database row behind it."""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, user_id, phone, token_version):
+        self.id = self.pk = user_id
+        self.phone = phone
+        self.token_version = token_version
+
+    def __str__(self):
+        return f"Principal #{self.pk}"
+
+    def __eq__(self, other):
+        return getattr(other, "is_authenticated", False) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def get_username(self):
+        return self.phone
+
+    # Staff permissions only come with a session login.
+    def has_perm(self, perm, obj=None):
+        return False
+
+    def has_perms(self, perm_list, obj=None):
+        return False
+
+    def has_module_perms(self, app_label):
+        return False
+
+    @cached_property
+    def user(self):
+        return get_user_model().objects.get(pk=self.pk)
+
+
+class PrincipalCache:
+    def __init__(self, alias, ttl, max_entries):
+        self.alias = alias
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id):
+        return f"accounts:token-version:{user_id}"
+
+    def get(self, payload):
+        """The principal for verified claims, or None when they were revoked."""
+        user_id, version = payload["uid"], payload["ver"]
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > time.monotonic() and entry[1].token_version == version:
+                self._data.move_to_end(user_id)
+                metrics.record_cache("principal", True)
+                return entry[1]
+        metrics.record_cache("principal", False)
+
+        shared = caches[self.alias]
+        current = shared.get(self.key(user_id))
+        if current is None:
+            current = (
+                get_user_model().objects.filter(pk=user_id, is_active=True, is_deleted=False)
+                .values_list("token_version", flat=True)
+                .first()
+            )
+            if current is None:
+                return None
+            shared.add(self.key(user_id), current, token_lifetime())
+        if current != version:
+            return None
+        username = payload.get(get_user_model().USERNAME_FIELD)
+        principal = Principal(user_id, username, version)
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, principal)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return principal
+
+    def revoke(self, user_id, token_version):
+        caches[self.alias].set(self.key(user_id), token_version, token_lifetime())
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_principal_cache = None
+_principal_cache_lock = threading.Lock()
+
+
+def get_principal_cache():
+    """The process-wide cache configured by ``settings.ACCOUNTS_PRINCIPALS``."""
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                config = _settings()
+                _principal_cache = PrincipalCache(config["CACHE_ALIAS"], config["TTL"], config["MAX_ENTRIES"])
+    return _principal_cache
+
+
+def revoke(user_id, token_version):
+    """Reject tokens of ``user_id`` that were issued before ``token_version``."""
+    get_principal_cache().revoke(user_id, token_version)
+
+
+def authenticate_token(token, context=None):
+    """The ``Principal`` for a valid, unrevoked token of an active user; None otherwise."""
+    try:
+        payload = jwt_utils.get_payload(token, context)
+    except JSONWebTokenError:
+        return None
+    if payload.get("uid") is None or payload.get("ver") is None or not payload.get("active"):
+        return None
+    return get_principal_cache().get(payload)
+
+
+class JWTAuthenticationMiddleware(MiddlewareMixin):
+    """
+    Sets ``request.user`` from a ``JWT <token>`` Authorization header (or the
+    JWT cookie). Requests without a token keep the session user.
+    """
+
+    def process_request(self, request):
+        token = jwt_utils.get_http_authorization(request)
+        if token:
+            user = authenticate_token(token, request) or AnonymousUser()
+            request.user = user
+
+            async def auser():
+                return user
+
+            request.auser = auser
@@ -0,0 +1,145 @@
+"""
+Password hashing on a bounded worker pool.
+
+PBKDF2 costs tens to hundreds of milliseconds of CPU per call. Signup and
+login hand it to a small thread pool instead of hashing inline: the
+pool caps how many hashes run at once (hashlib releases the GIL while it
+hashes, so the rest of the worker keeps serving requests), and a login
+burst queues behind at most ``MAX_QUEUE`` waiting hashes. Beyond that,
+calls fail fast with ``HashingPoolFull`` instead of piling up, as they do
+when a hash has not started within ``TIMEOUT`` seconds.
+
+``TunedPBKDF2PasswordHasher`` reads its iteration count from the settings
+(``manage.py tune_password_hashing`` measures one for a latency target).
+A successful login transparently rehashes passwords stored with other
+parameters or another hasher. Wait and hashing times and rejections are
+exported on /metrics/ (see ``core.metrics``).
+
+Configured by ``settings.ACCOUNTS_PASSWORD_HASHING``::
+
+    ACCOUNTS_PASSWORD_HASHING = {
+        "WORKERS": 4,            # hashes running at once
+        "MAX_QUEUE": 32,         # hashes waiting for a worker
+        "TIMEOUT": 5,            # seconds to wait for a worker
+        "ITERATIONS": 1000000,   # PBKDF2 iterations for new hashes
+    }
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from core import metrics
+
+DEFAULT_SETTINGS = {
+    "WORKERS": 4,
+    "MAX_QUEUE": 32,
+    "TIMEOUT": 5,
+    "ITERATIONS": hashers.PBKDF2PasswordHasher.iterations,
+}
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "ACCOUNTS_PASSWORD_HASHING", {})}
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2-SHA256 with the iteration count taken from the settings."""
+
+    @property
+    def iterations(self):
+        return _settings()["ITERATIONS"]
+
+
+class HashingPoolFull(Exception):
+    """The pool is saturated; the caller should ask the client to retry."""
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    def run(self, operation, fn, *args):
+        """
+        ``fn(*args)`` on a pool worker; raises ``HashingPoolFull`` when saturated.
+
+        Blocks the calling thread until the hash is done, so under ASGI the
+        async view runs signup and login off the shared sync thread (see
+        ``core.views.AsyncGraphQLView``).
+        """
+        if not self._slots.acquire(blocking=False):
+            metrics.registry.reject_password_hash(operation)
+            raise HashingPoolFull("Too many password hashes in flight.")
+        queued = perf_counter()
+        started = threading.Event()
+
+        def call():
+            started.set()
+            start = perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                metrics.registry.observe_password_hash(operation, start - queued, perf_counter() - start)
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+        if not started.wait(self.timeout) and future.cancel():
+            self._slots.release()
+            metrics.registry.reject_password_hash(operation)
+            raise HashingPoolFull("Timed out waiting for a password hashing worker.")
+        return future.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool configured by ``settings.ACCOUNTS_PASSWORD_HASHING``."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = _settings()
+                _pool = HashingPool(config["WORKERS"], config["MAX_QUEUE"], config["TIMEOUT"])
+    return _pool
+
+
+def make_password(raw_password):
+    """``django.contrib.auth.hashers.make_password`` on the pool."""
+    return get_pool().run("hash", hashers.make_password, raw_password)
+
+
+def needs_rehash(encoded):
+    """Whether ``encoded`` was made by another hasher or with other parameters than the default."""
+    if not hashers.is_password_usable(encoded):
+        return False
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = hashers.get_hasher("default")
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def check_password(user, raw_password):
+    """
+    ``user.check_password`` with the hashing on the pool. A correct password
+    stored with outdated parameters is rehashed and saved; that does not
+    count as a password change, so the user's tokens stay valid.
+    """
+    encoded = user.password
+    if not get_pool().run("verify", hashers.check_password, raw_password, encoded):
+        return False
+    if needs_rehash(encoded):
+        user.password = make_password(raw_password)
+        user.save(update_fields=["password"])
+    return True
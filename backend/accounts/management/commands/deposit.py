@@ -0,0 +1,41 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from accounts.models import User, Wallet, WalletLedgerEntry
+from accounts.wallet import credit
+
+
+class Command(BaseCommand):
+    help = "Book a DEPOSIT into a user's wallet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("phone", help="Phone number of the user to credit.")
+        parser.add_argument("amount", help="Amount to deposit, e.g. 25.00.")
+        parser.add_argument(
+            "--reference",
+            help="Unique reference for the deposit; re-running with the same reference books nothing.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            amount = Decimal(options["amount"])
+        except InvalidOperation:
+            raise CommandError(f"Invalid amount: {options['amount']}")
+        if not amount.is_finite() or amount <= 0 or amount != amount.quantize(Decimal("0.01")):
+            raise CommandError("Amount must be positive with at most two decimal places.")
+
+        user = User.objects.filter(phone=options["phone"]).first()
+        if user is None:
+            raise CommandError(f"No user with phone {options['phone']}.")
+
+        try:
+            credit(user.pk, amount, WalletLedgerEntry.DEPOSIT, reference=options["reference"])
+        except Wallet.DoesNotExist:
+            raise CommandError(f"User {user.pk} has no wallet.")
+        except IntegrityError:
+            raise CommandError(f"Deposit {options['reference']} was already booked.")
+
+        balance = Wallet.objects.get(user=user).balance
+        self.stdout.write(self.style.SUCCESS(f"Deposited {amount} for user {user.pk}; balance is now {balance}."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.wallet import reconcile, unreconciled_wallets
+
+
+class Command(BaseCommand):
+    help = "Check that every cached Wallet.balance equals the sum of its ledger entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reset mismatched balances to their ledger sum instead of failing.",
+        )
+
+    def handle(self, *args, **options):
+        mismatched = list(unreconciled_wallets().values_list("pk", "user_id", "balance", "ledger_balance"))
+        for wallet_id, user_id, balance, ledger_balance in mismatched:
+            self.stdout.write(
+                f"wallet {wallet_id} (user {user_id}): cached {balance}, ledger {ledger_balance}"
+            )
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("All wallets reconcile with the ledger."))
+            return
+
+        if options["fix"]:
+            fixed = reconcile([row[0] for row in mismatched])
+            self.stdout.write(self.style.WARNING(f"Reset {fixed} wallet balance(s) to the ledger sum."))
+            return
+
+        raise CommandError(f"{len(mismatched)} wallet(s) do not reconcile with the ledger.")
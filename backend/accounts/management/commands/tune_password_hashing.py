@@ -0,0 +1,39 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.utils.crypto import get_random_string, pbkdf2
+
+from accounts.hashing import _settings
+
+# OWASP's floor for PBKDF2-HMAC-SHA256; fewer iterations trade away too much.
+MIN_ITERATIONS = 600000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure PBKDF2 on this machine and suggest ACCOUNTS_PASSWORD_HASHING['ITERATIONS'] "
+        "for a target hashing time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target-ms", type=float, default=250.0, help="Wanted time per hash (default 250).")
+        parser.add_argument("--rounds", type=int, default=5, help="Measurements to take the median of.")
+
+    def handle(self, *args, **options):
+        sample = 100000
+        salt = get_random_string(22)
+        timings = []
+        for _ in range(options["rounds"]):
+            start = perf_counter()
+            pbkdf2("correct horse battery staple", salt, sample)
+            timings.append(perf_counter() - start)
+        per_iteration = sorted(timings)[len(timings) // 2] / sample
+
+        current = _settings()["ITERATIONS"]
+        suggested = int(options["target_ms"] / 1000 / per_iteration) // 10000 * 10000
+        self.stdout.write(f"Current: {current} iterations, about {current * per_iteration * 1000:.0f} ms per hash.")
+        self.stdout.write(f"Suggested for {options['target_ms']:g} ms: {suggested} iterations.")
+        if suggested < MIN_ITERATIONS:
+            self.stdout.write(self.style.WARNING(
+                f"That is below {MIN_ITERATIONS}; prefer more WORKERS (or faster hardware) to fewer iterations."
+            ))
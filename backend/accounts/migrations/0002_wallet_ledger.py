@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-17 00:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    """Book existing balances as opening entries so every wallet reconciles."""
+    Wallet = apps.get_model("accounts", "Wallet")
+    WalletLedgerEntry = apps.get_model("accounts", "WalletLedgerEntry")
+    WalletLedgerEntry.objects.bulk_create(
+        [
+            WalletLedgerEntry(
+                user_id=wallet.user_id,
+                amount=wallet.balance,
+                kind="adjustment",
+                reference=f"opening:{wallet.user_id}",
+            )
+            for wallet in Wallet.objects.exclude(balance=0).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('deposit', 'Deposit'), ('stake', 'Stake'), ('payout', 'Payout'), ('refund', 'Refund'), ('adjustment', 'Adjustment')], max_length=16)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
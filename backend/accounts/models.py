@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models
+from django.db import models, transaction
+
+from . import hashing
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, phone=None, email=None, password=None, **extra_fields):
@@ -8,7 +10,8 @@ class CustomUserManager(BaseUserManager):
         
         email = self.normalize_email(email) if email else None
         user = self.model(phone=phone, email=email, **extra_fields)
-        user.set_password(password)
+        # Hashed on the bounded pool (see accounts/hashing.py).
+        user.password = hashing.make_password(password)
         user.save(using=self._db)
         return user
 
@@ -25,6 +28,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
+    # Carried in issued JWTs; bumping it revokes every earlier token (see accounts/auth.py).
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "phone"
     REQUIRED_FIELDS = ["email", "first_name", "last_name"]
@@ -34,6 +39,26 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def revoke_tokens(self):
+        """Revoke the user's tokens when the instance is next saved."""
+        self._revoke_tokens = True
+
+    def save(self, *args, **kwargs):
+        # ``_password`` is only set by a real password change; the transparent
+        # rehash in ``check_password`` clears it first and keeps tokens valid.
+        revoke = not self._state.adding and (self._password is not None or getattr(self, "_revoke_tokens", False))
+        if revoke:
+            self.token_version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "token_version"}
+        super().save(*args, **kwargs)
+        if revoke:
+            from .auth import revoke as revoke_principal
+
+            self._revoke_tokens = False
+            user_id, version = self.pk, self.token_version
+            transaction.on_commit(lambda: revoke_principal(user_id, version), using=kwargs.get("using"))
+
 
 class Wallet(models.Model):
     user = models.OneToOneField("User", on_delete=models.CASCADE, related_name="wallet")
@@ -41,3 +66,51 @@ class Wallet(models.Model):
 
     def __str__(self):
         return f"{self.user}'s Wallet: {self.balance}"
+
+
+class WalletLedgerEntry(models.Model):
+    """
+    One append-only movement of money in or out of a wallet.
+
+    ``Wallet.balance`` is a cache of ``SUM(amount)`` over a user's entries;
+    ``manage.py reconcile_wallets`` checks the two agree. Entries are never
+    updated or deleted; mistakes are corrected with an ADJUSTMENT entry.
+    """
+
+    DEPOSIT = "deposit"
+    STAKE = "stake"
+    PAYOUT = "payout"
+    REFUND = "refund"
+    ADJUSTMENT = "adjustment"
+    KIND_CHOICES = [
+        (DEPOSIT, "Deposit"),
+        (STAKE, "Stake"),
+        (PAYOUT, "Payout"),
+        (REFUND, "Refund"),
+        (ADJUSTMENT, "Adjustment"),
+    ]
+
+    user = models.ForeignKey("User", on_delete=models.PROTECT, related_name="ledger_entries")
+    # Signed: debits are negative, credits positive.
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    # Idempotency key, e.g. "stake:<bet_id>:<user_id>"; a retried operation
+    # cannot book the same movement twice.
+    reference = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="ledger_user_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only.")
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} (user {self.user_id})"
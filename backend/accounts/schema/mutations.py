@@ -2,12 +2,12 @@ import logging
 import graphene
 import re
 from graphene_django.types import DjangoObjectType
-from accounts.models import Wallet
+from accounts import hashing
+from accounts.wallet import open_wallet
 from .types import UserType, WalletType
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.core.validators import validate_email
-from django.contrib.auth import authenticate
 from graphql_jwt.shortcuts import get_token
 
 User = get_user_model()
@@ -60,11 +60,15 @@ class CreateUser(graphene.Mutation):
                     last_name=last_name,
                     password=password
                 )
-                Wallet.objects.create(user=user)
+                open_wallet(user.pk)
 
             debug_logger.debug("User and wallet created: user_id=%s", user.id)
             return CreateUser(user=user, success=True, message="User created successfully.")
 
+        except hashing.HashingPoolFull:
+            logger.warning("Password hashing pool full; rejected signup for phone=%s", phone)
+            return CreateUser(success=False, message="Too many requests. Please try again shortly.")
+
         except Exception as e:
             logger.error("Error creating user: %s", str(e), exc_info=True)
             return CreateUser(success=False, message="Server error. Please try again.")
@@ -87,15 +91,24 @@ class PhoneLogin(graphene.Mutation):
         if not re.match(phone_pattern, phone):
             return PhoneLogin(success=False, message="Invalid phone number format.")
 
-        user = User.objects.get(phone=phone)
+        # One query: the password is checked on the row already loaded rather
+        # than through authenticate(), which would fetch it again.
+        user = User.objects.filter(phone=phone).first()
 
-        if not user.is_active:
-            return PhoneLogin(success=False, message="Account is inactive.")
+        try:
+            if user is None:
+                # Hash anyway, so unknown phones take as long as wrong passwords.
+                hashing.make_password(password)
+                return PhoneLogin(success=False, message="Invalid credentials.")
 
-        user = authenticate(username=phone, password=password)
+            if not user.is_active:
+                return PhoneLogin(success=False, message="Account is inactive.")
 
-        if user is None:
-            return PhoneLogin(success=False, message="Invalid credentials.") 
+            if not hashing.check_password(user, password):
+                return PhoneLogin(success=False, message="Invalid credentials.")
+        except hashing.HashingPoolFull:
+            logger.warning("Password hashing pool full; rejected login for phone=%s", phone)
+            return PhoneLogin(success=False, message="Too many login attempts. Please try again shortly.")
 
         token = get_token(user)
         return PhoneLogin(user=user, token=token, success=True)
@@ -125,6 +138,7 @@ class SoftDeleteUser(graphene.Mutation):
 
             user.is_deleted = True
             user.is_active = False
+            user.revoke_tokens()
             user.save()
 
             debug_logger.debug("User %s soft-deleted successfully", id)
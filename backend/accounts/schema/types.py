@@ -5,7 +5,7 @@ from accounts.models import User, Wallet
 class UserType(DjangoObjectType):
     class Meta:
         model = User
-        exclude = ('password',)
+        exclude = ('password', 'token_version')
 
 class WalletType(DjangoObjectType):
     class Meta:
@@ -1,3 +1,194 @@
-from django.test import TestCase
+import json
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import hashers
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import F
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from core.schema import schema
+from core.views import AsyncGraphQLView
+
+from . import hashing
+from .auth import authenticate_token, get_principal_cache
+from .models import User, Wallet, WalletLedgerEntry
+from .wallet import InsufficientFunds, credit, debit, debit_many, open_wallet, unreconciled_wallets
+
+
+def make_user(phone, balance):
+    user = User.objects.create(phone=phone, first_name="Test", last_name="User")
+    Wallet.objects.create(user=user)
+    credit(user.pk, balance, WalletLedgerEntry.DEPOSIT, reference=f"deposit:{user.pk}")
+    return user
+
+
+class DebitTests(TestCase):
+    def setUp(self):
+        self.user = make_user("+15550000001", Decimal("10.00"))
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_debit_books_a_ledger_entry(self):
+        with transaction.atomic():
+            entry = debit(self.user.pk, "4.50", WalletLedgerEntry.STAKE, reference="stake:1:1")
+
+        self.assertEqual(entry.amount, Decimal("-4.50"))
+        self.assertEqual(self.balance(self.user), Decimal("5.50"))
+        self.assertFalse(unreconciled_wallets().exists())
+
+    def test_insufficient_balance_changes_nothing(self):
+        with self.assertRaises(InsufficientFunds):
+            with transaction.atomic():
+                debit(self.user.pk, "10.01", WalletLedgerEntry.STAKE)
+
+        self.assertEqual(self.balance(self.user), Decimal("10.00"))
+        self.assertEqual(WalletLedgerEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_debit_fails_whole_when_one_wallet_is_short(self):
+        other = make_user("+15550000002", Decimal("3.00"))
+
+        with self.assertRaises(InsufficientFunds):
+            with transaction.atomic():
+                debit_many(
+                    [(self.user.pk, Decimal("2.00"), "stake:1:a"), (other.pk, Decimal("3.01"), "stake:1:b")],
+                    WalletLedgerEntry.STAKE,
+                )
+
+        self.assertEqual(self.balance(self.user), Decimal("10.00"))
+        self.assertEqual(self.balance(other), Decimal("3.00"))
+        self.assertFalse(WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.STAKE).exists())
+
+    def test_ledger_entries_are_append_only(self):
+        entry = WalletLedgerEntry.objects.get(user=self.user)
+
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+
+class FundingTests(TestCase):
+    def test_new_wallet_opens_with_a_deposit(self):
+        user = User.objects.create(phone="+15550000001", first_name="Test", last_name="User")
+
+        with override_settings(ACCOUNTS_WALLETS={"OPENING_BALANCE": "25.00"}):
+            wallet = open_wallet(user.pk)
+
+        self.assertEqual(wallet.balance, Decimal("25.00"))
+        entry = WalletLedgerEntry.objects.get(user=user)
+        self.assertEqual((entry.kind, entry.amount), (WalletLedgerEntry.DEPOSIT, Decimal("25.00")))
+        self.assertFalse(unreconciled_wallets().exists())
+
+    def test_zero_opening_balance_books_nothing(self):
+        user = User.objects.create(phone="+15550000001", first_name="Test", last_name="User")
+
+        with override_settings(ACCOUNTS_WALLETS={"OPENING_BALANCE": "0"}):
+            open_wallet(user.pk)
+
+        self.assertFalse(WalletLedgerEntry.objects.filter(user=user).exists())
+
+    def test_deposit_command_credits_once_per_reference(self):
+        user = make_user("+15550000001", Decimal("10.00"))
+
+        call_command("deposit", user.phone, "5.25", reference="topup:1", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("deposit", user.phone, "5.25", reference="topup:1", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("deposit", user.phone, "-1", stdout=StringIO())
+
+        self.assertEqual(Wallet.objects.get(user=user).balance, Decimal("15.25"))
+        self.assertFalse(unreconciled_wallets().exists())
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    ACCOUNTS_PASSWORD_HASHING={"ITERATIONS": 1000},
+)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        get_principal_cache().clear()
+        self.user = User.objects.create_user(
+            phone="0911000001", first_name="Test", last_name="User", password="correct horse",
+        )
+        self.token = get_token(self.user)
+        # Verified once, so the principal is also cached in this process.
+        self.assertIsNotNone(authenticate_token(self.token))
+
+    def test_soft_delete_revokes_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/graphql/", {
+                "query": 'mutation { User_Delete_Soft(phone: "0911000001") { success } }',
+            }, content_type="application/json")
+
+        self.assertTrue(response.json()["data"]["User_Delete_Soft"]["success"])
+        self.assertIsNone(authenticate_token(self.token))
+
+    def test_password_change_revokes_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("battery staple")
+            self.user.save()
+
+        self.assertIsNone(authenticate_token(self.token))
+        self.assertIsNotNone(authenticate_token(get_token(self.user)))
+
+    def test_transparent_rehash_keeps_tokens_valid(self):
+        User.objects.filter(pk=self.user.pk).update(
+            password=hashers.make_password("correct horse", hasher="pbkdf2_sha1"),
+        )
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(hashing.check_password(user, "correct horse"))
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(user.token_version, self.user.token_version)
+        self.assertIsNotNone(authenticate_token(self.token))
+
+    def test_missing_record_falls_back_to_the_database(self):
+        caches["default"].clear()
+        get_principal_cache().clear()
+
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(authenticate_token(self.token))
+        get_principal_cache().clear()
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(authenticate_token(self.token))
+
+        # A revocation whose cache record was lost is still read from the row.
+        User.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+        caches["default"].clear()
+        get_principal_cache().clear()
+        self.assertIsNone(authenticate_token(self.token))
+
+
+class AsyncLoginTests(TestCase):
+    async def test_login_waits_for_its_hash_off_the_shared_sync_thread(self):
+        shared_thread = await sync_to_async(threading.get_ident)()
+        hashed_on = []
+
+        def make_password(raw_password):
+            hashed_on.append(threading.get_ident())
+            return "!"
+
+        request = AsyncRequestFactory().post("/graphql/", {
+            "query": 'mutation { User_Login(phone: "0911000009", password: "x") { success message } }',
+        }, content_type="application/json")
+        request.user = AnonymousUser()
+        with mock.patch("accounts.hashing.make_password", side_effect=make_password):
+            response = await AsyncGraphQLView.as_view(schema=schema)(request)
+
+        self.assertEqual(json.loads(response.content)["data"]["User_Login"]["message"], "Invalid credentials.")
+        self.assertEqual(len(hashed_on), 1)
+        self.assertNotEqual(hashed_on[0], shared_thread)
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import Wallet, WalletLedgerEntry
+
+DEFAULT_SETTINGS = {
+    "OPENING_BALANCE": "100.00",
+}
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "ACCOUNTS_WALLETS", {})}
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def debit(user_id, amount, kind, reference=None):
+    """
+    Take ``amount`` out of the user's wallet and record it in the ledger.
+
+    The balance check and the decrement are one conditional UPDATE
+    (``... SET balance = balance - amount WHERE balance >= amount``), so
+    concurrent debits can never overdraw a wallet and no row is read into
+    Python first. Must run inside the caller's transaction so the debit is
+    rolled back with whatever it pays for.
+    """
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError("Debit amount must be positive.")
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("debit() must be called inside transaction.atomic().")
+
+    updated = Wallet.objects.filter(user_id=user_id, balance__gte=amount).update(
+        balance=F("balance") - amount
+    )
+    if not updated:
+        raise InsufficientFunds(f"Insufficient balance for user {user_id}.")
+    return WalletLedgerEntry.objects.create(user_id=user_id, amount=-amount, kind=kind, reference=reference)
+
+
+def lock_balances(user_ids):
+    """
+    Lock the wallets of ``user_ids`` (in id order, so concurrent batches
+    cannot deadlock) and return ``{user_id: balance}``. Users without a
+    wallet are missing from the result.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("lock_balances() must be called inside transaction.atomic().")
+    return dict(
+        Wallet.objects.select_for_update()
+        .filter(user_id__in=user_ids)
+        .order_by("user_id")
+        .values_list("user_id", "balance")
+    )
+
+
+def debit_many(debits, kind):
+    """
+    ``debit`` for a batch of ``(user_id, amount, reference)``: one wallet
+    UPDATE and one ledger INSERT whatever the batch size.
+
+    Callers check balances under ``lock_balances`` first; the UPDATE still
+    only matches wallets that can cover their total, and if any cannot the
+    whole batch raises ``InsufficientFunds``.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("debit_many() must be called inside transaction.atomic().")
+    totals = defaultdict(Decimal)
+    for user_id, amount, _ in debits:
+        if amount <= 0:
+            raise ValueError("Debit amount must be positive.")
+        totals[user_id] += amount
+    if not totals:
+        return []
+
+    covered = reduce(or_, (Q(user_id=user_id, balance__gte=total) for user_id, total in totals.items()))
+    updated = Wallet.objects.filter(covered).update(
+        balance=F("balance") - Case(
+            *[When(user_id=user_id, then=Value(total)) for user_id, total in totals.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+    if updated != len(totals):
+        raise InsufficientFunds("Insufficient balance in a batch debit.")
+    return WalletLedgerEntry.objects.bulk_create([
+        WalletLedgerEntry(user_id=user_id, amount=-amount, kind=kind, reference=reference)
+        for user_id, amount, reference in debits
+    ])
+
+
+def credit(user_id, amount, kind, reference=None):
+    """Add ``amount`` to the user's wallet and record it in the ledger."""
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError("Credit amount must be positive.")
+
+    with transaction.atomic():
+        updated = Wallet.objects.filter(user_id=user_id).update(balance=F("balance") + amount)
+        if not updated:
+            raise Wallet.DoesNotExist(f"No wallet for user {user_id}.")
+        return WalletLedgerEntry.objects.create(user_id=user_id, amount=amount, kind=kind, reference=reference)
+
+
+def open_wallet(user_id):
+    """
+    Create the user's wallet holding ``ACCOUNTS_WALLETS["OPENING_BALANCE"]``,
+    booked as a DEPOSIT so the wallet reconciles with its ledger.
+    """
+    amount = Decimal(_settings()["OPENING_BALANCE"])
+    with transaction.atomic():
+        wallet = Wallet.objects.create(user_id=user_id, balance=amount)
+        if amount > 0:
+            WalletLedgerEntry.objects.create(
+                user_id=user_id, amount=amount, kind=WalletLedgerEntry.DEPOSIT, reference=f"opening:{user_id}",
+            )
+    return wallet
+
+
+def _ledger_sum():
+    return (
+        WalletLedgerEntry.objects.filter(user_id=OuterRef("user_id"))
+        .order_by()
+        .values("user_id")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+
+
+def ledger_balances():
+    """Wallets annotated with ``ledger_balance``, the sum of their ledger entries."""
+    return Wallet.objects.annotate(
+        ledger_balance=Coalesce(
+            Subquery(_ledger_sum()),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+def unreconciled_wallets():
+    """Wallets whose cached balance disagrees with their ledger."""
+    return ledger_balances().exclude(balance=F("ledger_balance"))
+
+
+def reconcile(wallet_ids=None):
+    """
+    Reset cached balances to the ledger sum. Returns how many wallets changed.
+
+    Touches only wallets that disagree, in one UPDATE.
+    """
+    wallets = unreconciled_wallets()
+    if wallet_ids is not None:
+        wallets = wallets.filter(pk__in=wallet_ids)
+    return Wallet.objects.filter(pk__in=wallets.values("pk")).update(
+        balance=Coalesce(Subquery(_ledger_sum()), Value(Decimal("0.00")))
+    )
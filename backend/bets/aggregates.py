@@ -0,0 +1,107 @@
+"""
+Per-option and per-bet pool aggregates.
+
+``BetOption.total_staked``/``participant_count`` and the same pair on
+``Bet`` are denormalized copies of ``SUM(stake)``/``COUNT(*)`` over
+``BetParticipant``. They are bumped with F() expressions in the same
+transaction that inserts the participant, so odds are read in O(1) per
+option. ``manage.py rebuild_pool_aggregates`` recomputes or verifies them
+in bulk.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Bet, BetOption, BetParticipant
+
+
+def record_stakes(bet_id, option_id, stake, count=1):
+    """Add ``count`` participants staking ``stake`` in total to an option's pool."""
+    BetOption.objects.filter(pk=option_id).update(
+        total_staked=F("total_staked") + stake,
+        participant_count=F("participant_count") + count,
+    )
+    Bet.objects.filter(pk=bet_id).update(
+        total_staked=F("total_staked") + stake,
+        participant_count=F("participant_count") + count,
+    )
+
+
+def record_stakes_many(stakes):
+    """
+    ``record_stakes`` for a batch of ``(bet_id, option_id, stake)`` triples,
+    in one UPDATE per table whatever the batch size.
+    """
+    by_option, by_bet = defaultdict(lambda: [Decimal("0"), 0]), defaultdict(lambda: [Decimal("0"), 0])
+    for bet_id, option_id, stake in stakes:
+        for totals in (by_option[option_id], by_bet[bet_id]):
+            totals[0] += stake
+            totals[1] += 1
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    for model, totals in ((BetOption, by_option), (Bet, by_bet)):
+        if not totals:
+            continue
+        model.objects.filter(pk__in=list(totals)).update(
+            total_staked=F("total_staked") + Case(
+                *[When(pk=pk, then=Value(total)) for pk, (total, _) in totals.items()],
+                default=Value(Decimal("0")),
+                output_field=money,
+            ),
+            participant_count=F("participant_count") + Case(
+                *[When(pk=pk, then=Value(count)) for pk, (_, count) in totals.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+
+
+def odds(option_total, pool_total):
+    """Decimal odds of an option (payout per unit staked), or None while it has no stakes."""
+    if not option_total:
+        return None
+    return (Decimal(pool_total) / Decimal(option_total)).quantize(Decimal("0.0001"))
+
+
+def _sums(field):
+    money = DecimalField(max_digits=14, decimal_places=2)
+    grouped = BetParticipant.objects.filter(**{field: OuterRef("pk")}).order_by().values(field)
+    total = Subquery(grouped.annotate(total=Sum("stake")).values("total"), output_field=money)
+    count = Subquery(grouped.annotate(count=Count("pk")).values("count"), output_field=IntegerField())
+    return (
+        Coalesce(total, Value(Decimal("0")), output_field=money),
+        Coalesce(count, Value(0), output_field=IntegerField()),
+    )
+
+
+def _stale(model, field):
+    total, count = _sums(field)
+    return (
+        model.objects.annotate(actual_total=total, actual_count=count)
+        .filter(~Q(total_staked=F("actual_total")) | ~Q(participant_count=F("actual_count")))
+    )
+
+
+def stale_options():
+    return _stale(BetOption, "chosen_option_id")
+
+
+def stale_bets():
+    return _stale(Bet, "bet_id")
+
+
+def rebuild(bet_ids=None):
+    """Recompute every aggregate (or those of ``bet_ids``) with one UPDATE per table."""
+    options = BetOption.objects.all()
+    bets = Bet.objects.all()
+    if bet_ids is not None:
+        options = options.filter(bet_id__in=bet_ids)
+        bets = bets.filter(pk__in=bet_ids)
+
+    total, count = _sums("chosen_option_id")
+    updated_options = options.update(total_staked=total, participant_count=count)
+    total, count = _sums("bet_id")
+    updated_bets = bets.update(total_staked=total, participant_count=count)
+    return updated_options, updated_bets
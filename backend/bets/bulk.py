@@ -0,0 +1,281 @@
+"""
+Set-based batch operations on bets.
+
+``place_stakes`` validates a whole batch of stakes with a handful of
+queries and writes it in one transaction: one bet lock, one wallet lock,
+one wallet UPDATE, one ledger INSERT, one participant INSERT, one UPDATE
+per pool aggregate table and the user statistics (``bets.stats``),
+however many stakes the batch holds. ``create_bets`` does the same for
+new bets: one user lookup, one bet INSERT and one option
+INSERT per batch. Every item gets its own result; invalid items are
+skipped without failing the rest.
+"""
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import WalletLedgerEntry
+from accounts.wallet import debit_many, lock_balances
+from . import stats
+from .aggregates import record_stakes_many
+from .models import Bet, BetOption, BetParticipant
+from .signals import notify_bet_changed
+
+User = get_user_model()
+
+MAX_BATCH_SIZE = 1000
+
+ItemResult = namedtuple("ItemResult", ["index", "success", "message", "instance"])
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _failed(index, message):
+    return ItemResult(index, False, message, None)
+
+
+def _clean_options(options):
+    # Same rules as Bet_Create: trimmed, non-empty, case-insensitively unique.
+    cleaned = []
+    seen = set()
+    for option in options or []:
+        option = str(option).strip()
+        if option and option.lower() not in seen:
+            seen.add(option.lower())
+            cleaned.append(option)
+    return cleaned
+
+
+def _parse_expiry(value):
+    """Return ``(expires_at, error message)``."""
+    if isinstance(value, str):
+        try:
+            value = parse_datetime(value.strip())
+        except ValueError:
+            return None, "Invalid datetime."
+    if not isinstance(value, datetime):
+        return None, "Invalid datetime format. Use ISO 8601 format like '2025-04-25T15:30:00Z'."
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    if value <= timezone.now():
+        return None, "Expiry date must be in the future."
+    return value, None
+
+
+def create_bets(bets):
+    """
+    Create a batch of bets, each a dict with ``creator_id``, ``judge_id``,
+    ``title``, ``description``, ``options`` (a list of strings) and
+    ``expires_at`` (an ISO 8601 string or a datetime), under the same rules
+    as ``Bet_Create``. Returns one ``ItemResult`` per bet, in input order.
+    """
+    if len(bets) > MAX_BATCH_SIZE:
+        raise BatchTooLarge(f"At most {MAX_BATCH_SIZE} bets per batch.")
+
+    results = [None] * len(bets)
+    items = []
+    for index, data in enumerate(bets):
+        creator_id = _int_or_none(data.get("creator_id"))
+        judge_id = _int_or_none(data.get("judge_id"))
+        expires_at, message = _parse_expiry(data.get("expires_at"))
+        title = (data.get("title") or "").strip()
+        description = (data.get("description") or "").strip()
+        options = _clean_options(data.get("options"))
+        if creator_id is None or judge_id is None:
+            message = "User Not Found."
+        elif message is not None:
+            pass
+        elif not title:
+            message = "Title cannot be empty."
+        elif not description:
+            message = "Description cannot be empty."
+        elif len(options) < 2:
+            message = "At least two options are required."
+        else:
+            bet = Bet(
+                creator_id=creator_id,
+                judge_id=judge_id,
+                title=title,
+                description=description,
+                expires_at=expires_at,
+            )
+            items.append((index, bet, options))
+            continue
+        results[index] = _failed(index, message)
+
+    users = set(
+        User.objects.filter(
+            pk__in={bet.creator_id for _, bet, _ in items} | {bet.judge_id for _, bet, _ in items}
+        ).values_list("pk", flat=True)
+    )
+    valid = []
+    for index, bet, options in items:
+        if bet.creator_id in users and bet.judge_id in users:
+            valid.append((index, bet, options))
+        else:
+            results[index] = _failed(index, "User Not Found.")
+
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        new_bets = [bet for _, bet, _ in valid]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Bet.objects.bulk_create(new_bets)
+        else:
+            # The options need the bets' primary keys.
+            for bet in new_bets:
+                bet.save()
+        BetOption.objects.bulk_create([
+            BetOption(bet=bet, text=text) for _, bet, options in valid for text in options
+        ])
+        for index, bet, _ in valid:
+            results[index] = ItemResult(index, True, None, bet)
+            notify_bet_changed(bet.id, created=True)
+
+    return results
+
+
+def replace_options(bet_id, options):
+    """
+    Make the options of a bet exactly ``options`` (a cleaned list of texts).
+    Options whose text is unchanged keep their row and primary key; the
+    others are removed with one DELETE and added with one INSERT, whatever
+    the number of options. Returns ``(added, removed)`` texts.
+    """
+    current = dict(BetOption.objects.filter(bet_id=bet_id).values_list("text", "pk"))
+    wanted = set(options)
+    added = [text for text in options if text not in current]
+    removed = [text for text in current if text not in wanted]
+    with transaction.atomic():
+        if removed:
+            BetOption.objects.filter(pk__in=[current[text] for text in removed]).delete()
+        if added:
+            BetOption.objects.bulk_create([BetOption(bet_id=bet_id, text=text) for text in added])
+    return added, removed
+
+
+def place_stakes(stakes):
+    """
+    Place a batch of stakes, each a dict with ``user_id``, ``bet_id``,
+    ``bet_option_id`` and ``stake``, under the same rules as a single
+    participation. Returns one ``ItemResult`` per stake, in input order.
+    """
+    if len(stakes) > MAX_BATCH_SIZE:
+        raise BatchTooLarge(f"At most {MAX_BATCH_SIZE} stakes per batch.")
+
+    results = [None] * len(stakes)
+    items = []
+    for index, stake in enumerate(stakes):
+        user_id = _int_or_none(stake.get("user_id"))
+        bet_id = _int_or_none(stake.get("bet_id"))
+        option_id = _int_or_none(stake.get("bet_option_id"))
+        try:
+            amount = Decimal(stake.get("stake"))
+        except (TypeError, InvalidOperation):
+            amount = None
+        if user_id is None:
+            results[index] = _failed(index, "User not found.")
+        elif bet_id is None:
+            results[index] = _failed(index, "Bet not found.")
+        elif option_id is None:
+            results[index] = _failed(index, "BetOption not found.")
+        elif amount is None or amount <= 0:
+            results[index] = _failed(index, "Stake must be greater than 0.")
+        else:
+            items.append((index, user_id, bet_id, option_id, amount))
+
+    users = set(User.objects.filter(pk__in={item[1] for item in items}).values_list("pk", flat=True))
+
+    accepted = []
+    with transaction.atomic():
+        # Bets are locked before wallets, in primary key order, as a single
+        # stake, a resolution and an option update lock them: none of those
+        # can change a bet between the checks below and the inserts.
+        bets = {
+            bet["id"]: bet
+            for bet in Bet.objects.select_for_update()
+            .filter(pk__in={item[2] for item in items})
+            .order_by("pk")
+            .values("id", "judge_id", "is_resolved", "status", "expires_at")
+        }
+        option_bets = dict(
+            BetOption.objects.filter(pk__in={item[3] for item in items}).values_list("pk", "bet_id")
+        )
+
+        now = timezone.now()
+        valid = []
+        seen = set()
+        for index, user_id, bet_id, option_id, amount in items:
+            bet = bets.get(bet_id)
+            if user_id not in users:
+                message = "User not found."
+            elif bet is None:
+                message = "Bet not found."
+            elif option_id not in option_bets:
+                message = "BetOption not found."
+            elif bet["judge_id"] == user_id:
+                message = "The judge cannot participate in the bet."
+            elif bet["is_resolved"]:
+                message = "This bet has already been resolved."
+            elif (bet_id, user_id) in seen:
+                message = "User has already participated in this bet."
+            elif bet["status"] != Bet.OPEN or bet["expires_at"] < now:
+                message = "This bet has expired."
+            elif option_bets[option_id] != bet_id:
+                message = "This option does not belong to the selected bet."
+            else:
+                seen.add((bet_id, user_id))
+                valid.append((index, user_id, bet_id, option_id, amount))
+                continue
+            results[index] = _failed(index, message)
+
+        # Every participation debits its user's wallet, so once the wallets
+        # are locked no concurrent stake by these users can slip in between
+        # the checks below and the inserts.
+        balances = lock_balances({item[1] for item in valid})
+        existing = set(
+            BetParticipant.objects.filter(
+                bet_id__in={item[2] for item in valid},
+                user_id__in={item[1] for item in valid},
+            ).values_list("bet_id", "user_id")
+        )
+        for index, user_id, bet_id, option_id, amount in valid:
+            if (bet_id, user_id) in existing:
+                results[index] = _failed(index, "User has already participated in this bet.")
+            elif balances.get(user_id, Decimal("0")) < amount:
+                results[index] = _failed(index, "Insufficient wallet balance.")
+            else:
+                balances[user_id] -= amount
+                accepted.append((index, user_id, bet_id, option_id, amount))
+
+        if accepted:
+            debit_many(
+                [(user_id, amount, f"stake:{bet_id}:{user_id}") for _, user_id, bet_id, _, amount in accepted],
+                WalletLedgerEntry.STAKE,
+            )
+            participants = BetParticipant.objects.bulk_create([
+                BetParticipant(user_id=user_id, bet_id=bet_id, chosen_option_id=option_id, stake=amount)
+                for _, user_id, bet_id, option_id, amount in accepted
+            ])
+            record_stakes_many((bet_id, option_id, amount) for _, _, bet_id, option_id, amount in accepted)
+            stats.record_stakes((user_id, amount) for _, user_id, _, _, amount in accepted)
+            for (index, user_id, bet_id, _, _), participant in zip(accepted, participants):
+                results[index] = ItemResult(index, True, None, participant)
+                notify_bet_changed(bet_id, participant_id=user_id)
+
+    return results
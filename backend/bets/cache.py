@@ -0,0 +1,236 @@
+"""
+Cross-request read-through cache for bet read models.
+
+A cached read model is a fully loaded ``Bet`` with its creator, judge and
+winner option joined and its options (with their pool aggregates)
+prefetched. Entries are retired when a mutation, settlement or the expiry
+scheduler changes the bet (see ``bets.signals.bet_changed``), and expire
+after a TTL as a safety net.
+
+Invalidation replaces the bet's generation token, and an entry is only
+served while the token it was loaded under is current. A miss that loaded
+the bet before a concurrent invalidation therefore stores an entry nobody
+will read, instead of resurrecting the old row.
+
+The backend is pluggable through ``settings.BETS_READ_CACHE``::
+
+    BETS_READ_CACHE = {
+        "BACKEND": "bets.cache.DjangoCacheBackend",   # or bets.cache.LocMemLRUBackend
+        "TTL": 30,
+        "OPTIONS": {"alias": "default"},              # backend keyword arguments
+    }
+
+The default stores entries in a Django cache. When that cache is shared
+(Redis), invalidations from the expiry scheduler and ``settle_bets``, which
+run as their own processes, reach the web workers. ``LocMemLRUBackend`` is
+faster but only sees invalidations made in its own process.
+
+Cached instances are shared between requests and must be treated as
+read-only.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from core import metrics
+from .models import Bet
+
+DEFAULT_SETTINGS = {
+    "BACKEND": "bets.cache.DjangoCacheBackend",
+    "TTL": 30,
+    "OPTIONS": {},
+}
+
+# Generation tokens outlive the entries of their TTL by this many seconds,
+# longer than any load, so a stale entry expires before its token does.
+GENERATION_GRACE = 60
+
+_MISSING = object()
+
+
+class LocMemLRUBackend:
+    """In-process LRU with per-entry TTL. Fastest, but every worker has its own copy."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        found = {key: self.get(key) for key in keys}
+        return {key: value for key, value in found.items() if value is not _MISSING}
+
+    async def aget_many(self, keys):
+        return self.get_many(keys)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    async def aset(self, key, value, ttl):
+        self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """Any configured Django cache (e.g. Redis/Memcached), shared by all workers."""
+
+    def __init__(self, alias="default", key_prefix="bets:read:"):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key, _MISSING)
+
+    def get_many(self, keys):
+        found = self.cache.get_many([self.key_prefix + key for key in keys])
+        return {key[len(self.key_prefix):]: value for key, value in found.items()}
+
+    async def aget_many(self, keys):
+        found = await self.cache.aget_many([self.key_prefix + key for key in keys])
+        return {key[len(self.key_prefix):]: value for key, value in found.items()}
+
+    def set(self, key, value, ttl):
+        self.cache.set(self.key_prefix + key, value, ttl)
+
+    async def aset(self, key, value, ttl):
+        await self.cache.aset(self.key_prefix + key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class BetReadCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(bet_id):
+        return f"bet:{bet_id}"
+
+    @staticmethod
+    def generation_key(bet_id):
+        return f"bet:{bet_id}:generation"
+
+    @staticmethod
+    def load(bet_id):
+        return (
+            Bet.objects.select_related("creator", "judge", "winner_option")
+            .prefetch_related("options")
+            .get(pk=bet_id)
+        )
+
+    @staticmethod
+    async def aload(bet_id):
+        return await (
+            Bet.objects.select_related("creator", "judge", "winner_option")
+            .prefetch_related("options")
+            .aget(pk=bet_id)
+        )
+
+    def _hit(self, bet_id, found):
+        """The cached bet in ``found`` if it belongs to the current generation, else ``_MISSING``."""
+        entry = found.get(self.key(bet_id))
+        hit = entry is not None and entry[0] == found.get(self.generation_key(bet_id))
+        self._count("hits" if hit else "misses")
+        metrics.record_cache("bet_read", hit)
+        return entry[1] if hit else _MISSING
+
+    def get_bet(self, bet_id):
+        """Return the bet read model, loading and caching it on a miss."""
+        found = self.backend.get_many([self.key(bet_id), self.generation_key(bet_id)])
+        bet = self._hit(bet_id, found)
+        if bet is _MISSING:
+            bet = self.load(bet_id)
+            # Tagged with the generation read before loading.
+            self.backend.set(self.key(bet_id), (found.get(self.generation_key(bet_id)), bet), self.ttl)
+        return bet
+
+    async def aget_bet(self, bet_id):
+        """``get_bet`` for async resolvers."""
+        found = await self.backend.aget_many([self.key(bet_id), self.generation_key(bet_id)])
+        bet = self._hit(bet_id, found)
+        if bet is _MISSING:
+            bet = await self.aload(bet_id)
+            await self.backend.aset(self.key(bet_id), (found.get(self.generation_key(bet_id)), bet), self.ttl)
+        return bet
+
+    def invalidate(self, bet_id):
+        self._count("invalidations")
+        self.backend.set(self.generation_key(bet_id), uuid.uuid4().hex, self.ttl + GENERATION_GRACE)
+        self.backend.delete(self.key(bet_id))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+_bet_cache = None
+_bet_cache_lock = threading.Lock()
+
+
+def get_bet_cache():
+    """The process-wide cache configured by ``settings.BETS_READ_CACHE``."""
+    global _bet_cache
+    if _bet_cache is None:
+        with _bet_cache_lock:
+            if _bet_cache is None:
+                config = {**DEFAULT_SETTINGS, **getattr(settings, "BETS_READ_CACHE", {})}
+                backend = import_string(config["BACKEND"])(**config["OPTIONS"])
+                _bet_cache = BetReadCache(backend, config["TTL"])
+    return _bet_cache
+
+
+def invalidate_bets(bet_ids):
+    cache = get_bet_cache()
+    for bet_id in bet_ids:
+        cache.invalidate(bet_id)
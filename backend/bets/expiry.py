@@ -0,0 +1,123 @@
+"""
+Background expiry of open bets.
+
+The scheduler keeps a min-heap of ``(expires_at, bet_id)`` for the open bets
+that expire within the next ``horizon``. It refills the heap from the
+partial ``bet_open_expiry_idx`` index (open bets only, ordered by expiry),
+pops whatever is due and closes it in batches with one UPDATE each. After
+every batch it sends ``bets.signals.bets_expired``.
+
+Heap entries can go stale if a bet is resolved or its expiry is moved. The
+closing UPDATE re-checks ``status`` and ``expires_at`` in the database, so
+a stale entry is simply dropped. A moved expiry is queued again by the
+next refill under its new time, and the entry for the old time is
+skipped when it is popped. Due bets that a concurrent transaction holds
+locked are queued again and retried on the next tick.
+"""
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Bet
+from .signals import bets_expired
+
+logger = logging.getLogger("django")
+
+
+class ExpiryScheduler:
+    def __init__(self, horizon=timedelta(minutes=5), batch_size=500, refill_interval=timedelta(seconds=30)):
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.refill_interval = refill_interval
+        self._heap = []
+        # bet_id -> the expiry it is queued under; other heap entries are stale.
+        self._queued = {}
+        self._retry = []
+        self._next_refill = None
+
+    def refill(self, now):
+        """Queue every open bet expiring before ``now + horizon`` that is not queued at that time yet."""
+        upcoming = (
+            Bet.objects.filter(status=Bet.OPEN, expires_at__lte=now + self.horizon)
+            .order_by("expires_at")
+            .values_list("expires_at", "pk")
+        )
+        for expires_at, bet_id in upcoming.iterator(chunk_size=self.batch_size):
+            if self._queued.get(bet_id) != expires_at:
+                self._push(expires_at, bet_id)
+        self._next_refill = now + self.refill_interval
+
+    def _push(self, expires_at, bet_id):
+        self._queued[bet_id] = expires_at
+        heapq.heappush(self._heap, (expires_at, bet_id))
+
+    def pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            expires_at, bet_id = heapq.heappop(self._heap)
+            if self._queued.get(bet_id) != expires_at:
+                continue
+            del self._queued[bet_id]
+            due.append(bet_id)
+        return due
+
+    def close(self, bet_ids, now):
+        """
+        Close the given bets if they are still open and due. Returns the ids
+        closed; bets skipped because they were locked are queued for a retry.
+        """
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        with transaction.atomic():
+            candidates = Bet.objects.filter(pk__in=bet_ids, status=Bet.OPEN, expires_at__lte=now)
+            if skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            closed = list(candidates.values_list("pk", flat=True))
+            if closed:
+                Bet.objects.filter(pk__in=closed).update(status=Bet.CLOSED, updated_at=now)
+        if skip_locked and len(closed) < len(bet_ids):
+            # Locked by a concurrent resolution or update; still open and due
+            # unless that transaction changed them.
+            skipped = set(bet_ids).difference(closed)
+            self._retry.extend(
+                Bet.objects.filter(pk__in=skipped, status=Bet.OPEN, expires_at__lte=now)
+                .values_list("expires_at", "pk")
+            )
+        if closed:
+            bets_expired.send(sender=Bet, bet_ids=closed, closed_at=now)
+        return closed
+
+    def tick(self, now=None):
+        """Refill if due, then close every bet that has expired. Returns the ids closed."""
+        now = now or timezone.now()
+        if self._next_refill is None or now >= self._next_refill:
+            self.refill(now)
+
+        closed = []
+        while True:
+            due = self.pop_due(now)
+            if not due:
+                break
+            closed.extend(self.close(due, now))
+        # Re-queued only now, so a bet that stays locked is not retried in a loop.
+        for expires_at, bet_id in self._retry:
+            self._push(expires_at, bet_id)
+        self._retry.clear()
+        if closed:
+            logger.info("Expiry scheduler closed %s bet(s)", len(closed))
+        return closed
+
+    def seconds_until_next(self, now, max_sleep):
+        """How long the worker can sleep before something needs doing."""
+        wake = [now + timedelta(seconds=max_sleep), self._next_refill]
+        if self._heap:
+            wake.append(self._heap[0][0])
+        return max(0.0, (min(w for w in wake if w is not None) - now).total_seconds())
+
+    def run_forever(self, max_sleep=1.0, should_stop=lambda: False):
+        while not should_stop():
+            self.tick()
+            time.sleep(self.seconds_until_next(timezone.now(), max_sleep))
@@ -0,0 +1,67 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bets.models import Bet, BetOption, BetParticipant
+
+# A full scan in each backend's EXPLAIN output. SQLite reports index walks
+# as "SCAN t USING [COVERING] INDEX i", which is fine; a bare "SCAN t" is not.
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (?!.*\bUSING\b.*\bINDEX\b)\S+"),
+    "postgresql": re.compile(r"\bSeq Scan on\b"),
+    "mysql": re.compile(r"\btype: ALL\b|'type': 'ALL'"),
+}
+
+
+def hot_query_shapes():
+    """The query shapes the GraphQL API runs on every request, by name."""
+    now = timezone.now()
+    return {
+        "feed": Bet.objects.order_by("-created_at", "-id")[:21],
+        "feed_after_cursor": Bet.objects.filter(created_at__lt=now).order_by("-created_at", "-id")[:21],
+        "open_feed": Bet.objects.filter(status=Bet.OPEN, expires_at__gt=now).order_by("-created_at", "-id")[:21],
+        "resolved_feed": Bet.objects.filter(status=Bet.RESOLVED).order_by("-created_at", "-id")[:21],
+        "expiry_scheduler_refill": Bet.objects.filter(status=Bet.OPEN, expires_at__lte=now).order_by("expires_at"),
+        "bets_by_creator": Bet.objects.filter(creator_id=1).order_by("-created_at", "-id")[:21],
+        "bets_by_judge": Bet.objects.filter(judge_id=1).order_by("-created_at", "-id")[:21],
+        "options_by_bet": BetOption.objects.filter(bet_id__in=[1, 2, 3]),
+        "participants_by_bet": BetParticipant.objects.filter(bet_id__in=[1, 2, 3]),
+        "participants_by_option": BetParticipant.objects.filter(chosen_option_id__in=[1, 2, 3]),
+        "participants_by_user": BetParticipant.objects.filter(user_id__in=[1, 2, 3]),
+        "prior_participation": BetParticipant.objects.filter(bet_id=1, user_id=1),
+    }
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot bet query shapes and fail if any of them needs a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every query plan.")
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"No query plan check for database vendor '{connection.vendor}'.")
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Small tables make the planner prefer seq scans regardless of
+                # indexes; we only want to know whether an index is usable.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, queryset in hot_query_shapes().items():
+                plan = queryset.explain()
+                if options["verbose_plans"]:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                if pattern.search(plan):
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}"))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"ok         {name}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} query shape(s) fall back to a full table scan: {', '.join(failures)}")
@@ -0,0 +1,97 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.bulk import MAX_BATCH_SIZE, create_bets
+
+User = get_user_model()
+
+FORMATS = ("csv", "jsonl")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import bets and their options from a CSV or JSON Lines file, in chunks. "
+        "Each row has title, description, expires_at, options, and the creator and judge "
+        "as creator_id/judge_id or creator_phone/judge_phone. In CSV the options are one "
+        "column separated by --option-separator; in JSONL they are a list."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=500, help=f"Bets per transaction (at most {MAX_BATCH_SIZE}).")
+        parser.add_argument("--option-separator", default="|")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or path.rsplit(".", 1)[-1].lower()
+        if format not in FORMATS:
+            raise CommandError(f"Unknown format {format!r}; pass --format csv or --format jsonl.")
+        chunk_size = options["chunk_size"]
+        if not 0 < chunk_size <= MAX_BATCH_SIZE:
+            raise CommandError(f"--chunk-size must be between 1 and {MAX_BATCH_SIZE}.")
+
+        created = failed = 0
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            rows = self.read_csv(stream, options["option_separator"]) if format == "csv" else self.read_jsonl(stream)
+            while True:
+                # Only one chunk of rows is held in memory at a time.
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self.resolve_phones(chunk)
+                for (line, _), result in zip(chunk, create_bets([row for _, row in chunk])):
+                    if result.success:
+                        created += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f"line {line}: {result.message}")
+                self.stdout.write(f"{created} bet(s) imported, {failed} rejected")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} bet(s); {failed} row(s) rejected."))
+
+    @staticmethod
+    def read_csv(stream, separator):
+        """Yield ``(line number, row)``."""
+        reader = csv.DictReader(stream)
+        for row in reader:
+            row["options"] = (row.get("options") or "").split(separator)
+            yield reader.line_num, row
+
+    @staticmethod
+    def read_jsonl(stream):
+        """Yield ``(line number, row)``."""
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                raise CommandError(f"line {line}: invalid JSON ({e}).")
+            if not isinstance(row, dict):
+                raise CommandError(f"line {line}: expected a JSON object.")
+            yield line, row
+
+    @staticmethod
+    def resolve_phones(chunk):
+        """Turn creator_phone/judge_phone into user ids, with one lookup per chunk."""
+        phones = {
+            row[field] for _, row in chunk for field in ("creator_phone", "judge_phone") if row.get(field)
+        }
+        if not phones:
+            return
+        users = dict(User.objects.filter(phone__in=phones).values_list("phone", "pk"))
+        for _, row in chunk:
+            for field in ("creator", "judge"):
+                phone = row.get(f"{field}_phone")
+                if phone and not row.get(f"{field}_id"):
+                    row[f"{field}_id"] = users.get(phone)
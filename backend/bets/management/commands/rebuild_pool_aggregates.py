@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.aggregates import rebuild, stale_bets, stale_options
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized pool totals and participant counts of bets and options."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report aggregates that disagree with BetParticipant; fail if any do.",
+        )
+        parser.add_argument("--bet-id", type=int, action="append", help="Limit to this bet (repeatable).")
+
+    def handle(self, *args, **options):
+        bet_ids = options["bet_id"]
+
+        if options["verify"]:
+            bad_options = stale_options()
+            bad_bets = stale_bets()
+            if bet_ids:
+                bad_options = bad_options.filter(bet_id__in=bet_ids)
+                bad_bets = bad_bets.filter(pk__in=bet_ids)
+
+            stale = 0
+            for label, rows in (("option", bad_options), ("bet", bad_bets)):
+                for row in rows.values("pk", "total_staked", "actual_total", "participant_count", "actual_count"):
+                    stale += 1
+                    self.stdout.write(
+                        f"{label} {row['pk']}: staked {row['total_staked']} (actual {row['actual_total']}), "
+                        f"participants {row['participant_count']} (actual {row['actual_count']})"
+                    )
+            if stale:
+                raise CommandError(f"{stale} pool aggregate(s) are stale; run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS("All pool aggregates are up to date."))
+            return
+
+        updated_options, updated_bets = rebuild(bet_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt aggregates for {updated_options} option(s) and {updated_bets} bet(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bets.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's betting statistics and daily buckets from their participations."
+
+    def handle(self, *args, **options):
+        users, buckets = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics of {users} user(s) in {buckets} daily bucket(s)."))
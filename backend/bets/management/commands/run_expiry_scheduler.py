@@ -0,0 +1,43 @@
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from bets.expiry import ExpiryScheduler
+
+
+class Command(BaseCommand):
+    """
+    Runs as its own process. Its ``bets_expired`` signal invalidates the
+    shared caches, but not betUpdates subscriptions: the in-memory pubsub
+    only reaches subscribers of the publishing process, so subscriptions
+    time the expiry of their bet themselves (see bets/subscriptions.py).
+    """
+
+    help = "Close open bets as they expire. Runs until interrupted unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Close whatever is due now and exit.")
+        parser.add_argument("--horizon", type=int, default=300, help="Seconds of upcoming expiries to keep in memory.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Bets closed per UPDATE.")
+        parser.add_argument("--refill-interval", type=int, default=30, help="Seconds between index scans for new bets.")
+        parser.add_argument("--max-sleep", type=float, default=1.0, help="Longest idle sleep in seconds.")
+
+    def handle(self, *args, **options):
+        scheduler = ExpiryScheduler(
+            horizon=timedelta(seconds=options["horizon"]),
+            batch_size=options["batch_size"],
+            refill_interval=timedelta(seconds=options["refill_interval"]),
+        )
+
+        if options["once"]:
+            closed = scheduler.tick()
+            self.stdout.write(f"Closed {len(closed)} bet(s).")
+            return
+
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+        self.stdout.write("Expiry scheduler running.")
+        scheduler.run_forever(max_sleep=options["max_sleep"], should_stop=lambda: bool(stopping))
+        self.stdout.write("Expiry scheduler stopped.")
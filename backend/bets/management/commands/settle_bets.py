@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from bets.settlement import CHUNK_SIZE, settle_bet, unsettled_bets
+
+
+class Command(BaseCommand):
+    help = "Pay out resolved bets that are not fully settled yet (resumes interrupted settlements)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bet-id", type=int, action="append", help="Only settle this bet (repeatable).")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        bet_ids = options["bet_id"] or list(unsettled_bets().values_list("pk", flat=True))
+        for bet_id in bet_ids:
+            result = settle_bet(bet_id, chunk_size=options["chunk_size"])
+            self.stdout.write(f"bet {result.bet_id}: {result.settled} participant(s) settled, {result.paid} paid")
@@ -0,0 +1,76 @@
+# Generated by Django 5.2 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField()),
+                ('is_resolved', models.BooleanField(default=False)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('creator', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='created_bets', to=settings.AUTH_USER_MODEL)),
+                ('judge', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='judged_bets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BetOption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=100)),
+                ('bet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='options', to='bets.bet')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='winner_option',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='winning_bets', to='bets.betoption'),
+        ),
+        migrations.CreateModel(
+            name='BetParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stake', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('bet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='participants', to='bets.bet')),
+                ('chosen_option', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='participants', to='bets.betoption')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='joined_bets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['-created_at', '-id'], name='bet_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='bet_creator_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['judge', '-created_at', '-id'], name='bet_judge_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['expires_at'], name='bet_open_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='betparticipant',
+            constraint=models.UniqueConstraint(fields=('bet', 'user'), name='unique_bet_participant'),
+        ),
+    ]
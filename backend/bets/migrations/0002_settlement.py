@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-17 00:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def skip_legacy_bets(apps, schema_editor):
+    """
+    Bets resolved before stakes went through the wallet ledger never debited
+    anyone, so paying them out now would mint money. Mark them settled.
+    """
+    Bet = apps.get_model("bets", "Bet")
+    BetParticipant = apps.get_model("bets", "BetParticipant")
+    resolved_at = Bet.objects.filter(pk=OuterRef("bet_id")).values("resolved_at")
+    BetParticipant.objects.filter(bet__is_resolved=True).update(settled_at=Subquery(resolved_at))
+    Bet.objects.filter(is_resolved=True).update(settled_at=F("resolved_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='betparticipant',
+            name='payout',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='betparticipant',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='betparticipant',
+            index=models.Index(condition=models.Q(('settled_at__isnull', True)), fields=['bet', 'id'], name='participant_unsettled_idx'),
+        ),
+        migrations.RunPython(skip_legacy_bets, migrations.RunPython.noop),
+    ]
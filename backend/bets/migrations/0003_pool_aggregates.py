@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-17 00:33
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Bet = apps.get_model("bets", "Bet")
+    BetOption = apps.get_model("bets", "BetOption")
+    BetParticipant = apps.get_model("bets", "BetParticipant")
+    money = models.DecimalField(max_digits=14, decimal_places=2)
+
+    for model, field in ((BetOption, "chosen_option_id"), (Bet, "bet_id")):
+        grouped = BetParticipant.objects.filter(**{field: OuterRef("pk")}).order_by().values(field)
+        model.objects.update(
+            total_staked=Coalesce(
+                Subquery(grouped.annotate(total=Sum("stake")).values("total"), output_field=money),
+                Value(Decimal("0")),
+                output_field=money,
+            ),
+            participant_count=Coalesce(
+                Subquery(grouped.annotate(count=Count("pk")).values("count"), output_field=models.IntegerField()),
+                Value(0),
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0002_settlement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='total_staked',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='betoption',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='betoption',
+            name='total_staked',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
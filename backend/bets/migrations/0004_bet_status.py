@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-17 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_status(apps, schema_editor):
+    Bet = apps.get_model("bets", "Bet")
+    Bet.objects.filter(is_resolved=True).update(status="resolved")
+    Bet.objects.filter(is_resolved=False, expires_at__lte=timezone.now()).update(status="closed")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0003_pool_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bet',
+            name='bet_open_expiry_idx',
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('closed', 'Closed'), ('resolved', 'Resolved')], default='open', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['expires_at'], name='bet_open_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='bet_status_feed_idx'),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2 on 2026-10-17 01:09
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+COUNTERS = ("bets", "volume", "settled", "won", "net_profit")
+
+
+def backfill(apps, schema_editor):
+    """Same as bets.stats.rebuild(), against the historical models."""
+    BetParticipant = apps.get_model("bets", "BetParticipant")
+    UserStats = apps.get_model("bets", "UserStats")
+    UserStatsDaily = apps.get_model("bets", "UserStatsDaily")
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    daily = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    participants = BetParticipant.objects.values_list(
+        "user_id", "stake", "joined_at", "settled_at", "payout", "chosen_option_id", "bet__winner_option_id",
+    )
+    for user_id, stake, joined_at, settled_at, payout, option_id, winner_id in participants.iterator(chunk_size=2000):
+        for counters in (totals[user_id], daily[(user_id, timezone.localdate(joined_at))]):
+            counters["bets"] += 1
+            counters["volume"] += stake
+        won = option_id == winner_id
+        if settled_at is None or payout is None or (not won and payout):
+            continue
+        for counters in (totals[user_id], daily[(user_id, timezone.localdate(settled_at))]):
+            counters["settled"] += 1
+            counters["won"] += int(won)
+            counters["net_profit"] += payout - stake
+
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=user_id, win_rate=c["won"] / c["settled"] if c["settled"] else 0, **c)
+            for user_id, c in totals.items()
+        ],
+        batch_size=1000,
+    )
+    UserStatsDaily.objects.bulk_create(
+        [UserStatsDaily(user_id=user_id, day=day, **c) for (user_id, day), c in daily.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_token_version'),
+        ('bets', '0004_bet_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('bets', models.PositiveIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('settled', models.PositiveIntegerField(default=0)),
+                ('won', models.PositiveIntegerField(default=0)),
+                ('win_rate', models.FloatField(default=0)),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-net_profit', 'user'], name='stats_net_profit_idx'), models.Index(fields=['-win_rate', 'user'], name='stats_win_rate_idx'), models.Index(fields=['-volume', 'user'], name='stats_volume_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStatsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bets', models.PositiveIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('settled', models.PositiveIntegerField(default=0)),
+                ('won', models.PositiveIntegerField(default=0)),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='stats_daily_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_user_stats_day')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
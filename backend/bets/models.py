@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -6,18 +7,35 @@ from django.utils import timezone
 User = get_user_model()
 
 class Bet(models.Model):
+    OPEN = "open"
+    CLOSED = "closed"
+    RESOLVED = "resolved"
+    STATUS_CHOICES = [
+        (OPEN, "Open"),
+        (CLOSED, "Closed"),
+        (RESOLVED, "Resolved"),
+    ]
+
     creator = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name="created_bets"
+        related_name="created_bets",
+        db_index=False  # covered by bet_creator_feed_idx
     )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField()
+    # open -> closed by the expiry scheduler (bets.expiry) -> resolved by the judge
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
     is_resolved = models.BooleanField(default=False)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    # Set once every participant has been paid (see bets.settlement)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    # Pool aggregates, maintained by bets.aggregates
+    total_staked = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    participant_count = models.PositiveIntegerField(default=0)
     winner_option = models.ForeignKey(
         'BetOption',
         on_delete=models.SET_NULL,
@@ -28,9 +46,26 @@ class Bet(models.Model):
     judge = models.ForeignKey(
         User,
         on_delete=models.PROTECT,
-        related_name='judged_bets'
+        related_name='judged_bets',
+        db_index=False  # covered by bet_judge_feed_idx
     )
 
+    class Meta:
+        indexes = [
+            # allBets feed: newest first, id breaks ties (keyset cursor order)
+            models.Index(fields=["-created_at", "-id"], name="bet_feed_idx"),
+            models.Index(fields=["creator", "-created_at", "-id"], name="bet_creator_feed_idx"),
+            models.Index(fields=["judge", "-created_at", "-id"], name="bet_judge_feed_idx"),
+            # Only open bets, by expiry: what the expiry scheduler scans
+            models.Index(
+                fields=["expires_at"],
+                condition=Q(status="open"),
+                name="bet_open_expiry_idx",
+            ),
+            # Feed filtered by status (open/closed/resolved listings)
+            models.Index(fields=["status", "-created_at", "-id"], name="bet_status_feed_idx"),
+        ]
+
     def resolve(self, winner_option):
         if self.is_resolved:
             raise ValidationError("Bet is already resolved.")
@@ -38,6 +73,7 @@ class Bet(models.Model):
             raise ValidationError("Winner option must belong to this bet.")
 
         self.winner_option = winner_option
+        self.status = Bet.RESOLVED
         self.is_resolved = True
         self.resolved_at = timezone.now()
         self.save()
@@ -50,7 +86,7 @@ class Bet(models.Model):
             raise ValidationError("Bet options must be unique.")
 
     def __str__(self):
-        return f"{self.title} ({self.creator.username})"
+        return f"{self.title} (#{self.pk})"
 
 class BetOption(models.Model):
     bet = models.ForeignKey(
@@ -59,6 +95,9 @@ class BetOption(models.Model):
         related_name='options'
     )
     text = models.CharField(max_length=100)
+    # Pool aggregates, maintained by bets.aggregates
+    total_staked = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    participant_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.text} (Bet: {self.bet.title})"
@@ -73,7 +112,8 @@ class BetParticipant(models.Model):
     bet = models.ForeignKey(
         Bet,
         on_delete=models.PROTECT,
-        related_name="participants"
+        related_name="participants",
+        db_index=False  # covered by unique_bet_participant
     )
     stake = models.DecimalField(max_digits=10, decimal_places=2)
     chosen_option = models.ForeignKey(
@@ -82,9 +122,22 @@ class BetParticipant(models.Model):
         related_name="participants"
     )
     joined_at = models.DateTimeField(auto_now_add=True)
+    payout = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        unique_together = ('user', 'bet')
+        constraints = [
+            # Leads with bet so it also serves "participants of a bet"
+            models.UniqueConstraint(fields=["bet", "user"], name="unique_bet_participant"),
+        ]
+        indexes = [
+            # Settlement walks the still-unpaid participants of a bet by id
+            models.Index(
+                fields=["bet", "id"],
+                condition=Q(settled_at__isnull=True),
+                name="participant_unsettled_idx",
+            ),
+        ]
 
     def clean(self):
         if self.chosen_option.bet_id != self.bet_id:
@@ -95,6 +148,61 @@ class BetParticipant(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.user.username} chose {self.chosen_option.text} for ${self.stake} on {self.bet.title}"
+        return f"User #{self.user_id} chose option #{self.chosen_option_id} for ${self.stake} on bet #{self.bet_id}"
+
+
+class UserStats(models.Model):
+    """
+    A user's betting totals, maintained by ``bets.stats`` in the transactions
+    that place stakes and settle bets, so leaderboards read indexed rows
+    instead of aggregating every ``BetParticipant``.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    bets = models.PositiveIntegerField(default=0)
+    volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Stakes settled against a winning option; refunds count towards neither
+    settled = models.PositiveIntegerField(default=0)
+    won = models.PositiveIntegerField(default=0)
+    win_rate = models.FloatField(default=0)
+    net_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # One per leaderboard order; the user id breaks ties
+            models.Index(fields=["-net_profit", "user"], name="stats_net_profit_idx"),
+            models.Index(fields=["-win_rate", "user"], name="stats_win_rate_idx"),
+            models.Index(fields=["-volume", "user"], name="stats_volume_idx"),
+        ]
+
+    def __str__(self):
+        return f"Stats of user #{self.user_id}"
+
+
+class UserStatsDaily(models.Model):
+    """One day of a user's ``UserStats`` deltas; rolling-window leaderboards sum these."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        db_index=False  # covered by unique_user_stats_day
+    )
+    # Stakes count on the day they were placed, results on the day they settled
+    day = models.DateField()
+    bets = models.PositiveIntegerField(default=0)
+    volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    settled = models.PositiveIntegerField(default=0)
+    won = models.PositiveIntegerField(default=0)
+    net_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="unique_user_stats_day"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="stats_daily_day_idx"),
+        ]
 
+    def __str__(self):
+        return f"Stats of user #{self.user_id} on {self.day}"
@@ -0,0 +1,39 @@
+from django.dispatch import receiver
+
+from . import subscriptions
+from .cache import invalidate_bets
+from .signals import bet_changed, bets_expired
+
+
+@receiver(bet_changed, dispatch_uid="bets.cache.bet_changed")
+def drop_cached_bet(sender, bet_id, **kwargs):
+    invalidate_bets([bet_id])
+
+
+@receiver(bets_expired, dispatch_uid="bets.cache.bets_expired")
+def drop_cached_expired_bets(sender, bet_ids, **kwargs):
+    invalidate_bets(bet_ids)
+
+
+@receiver(bet_changed, dispatch_uid="bets.subscriptions.bet_changed")
+def publish_bet_update(sender, bet_id, created=False, deleted=False, status_changed=False,
+                       participant_id=None, **kwargs):
+    # Nobody can be subscribed to a bet that did not exist yet.
+    if created:
+        return
+    if deleted:
+        event = subscriptions.DELETED
+    elif participant_id is not None:
+        event = subscriptions.JOINED
+    elif status_changed:
+        event = subscriptions.STATUS_CHANGED
+    else:
+        event = subscriptions.UPDATED
+    subscriptions.get_coalescer().mark(bet_id, event)
+
+
+@receiver(bets_expired, dispatch_uid="bets.subscriptions.bets_expired")
+def publish_expired_bets(sender, bet_ids, **kwargs):
+    coalescer = subscriptions.get_coalescer()
+    for bet_id in bet_ids:
+        coalescer.mark(bet_id, subscriptions.EXPIRED)
@@ -0,0 +1,339 @@
+import asyncio
+import inspect
+from collections import defaultdict
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from ..models import Bet, BetOption, BetParticipant, UserStats
+
+User = get_user_model()
+
+
+class BatchLoader:
+    """
+    Per-request DataLoader.
+
+    Under synchronous execution graphql-core resolves list items depth-first,
+    so a resolver only ever sees one parent at a time. To batch anyway, every
+    loader is told about keys it is *likely* to be asked for (``prime_keys``)
+    as soon as their parent rows are loaded. The first ``load`` that misses
+    the cache then fetches all pending keys in a single query.
+
+    With ``is_async`` a cache miss returns an awaitable instead. Misses from
+    sibling resolvers are collected until the event loop comes round again
+    and then fetched together in one query, off the event loop.
+    """
+
+    def __init__(self, batch_fn, default=None, is_async=False):
+        self.batch_fn = batch_fn
+        self.default = default
+        self.is_async = is_async
+        self._cache = {}
+        self._pending = set()
+        # Async mode: the batch waiting to be dispatched, and the in-flight
+        # batch of every key being fetched.
+        self._next_batch = None
+        self._batches = {}
+
+    def prime_keys(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._pending.add(key)
+
+    def prime(self, key, value):
+        self._cache[key] = value
+        self._pending.discard(key)
+
+    def load(self, key):
+        if key is None:
+            return self.default() if callable(self.default) else self.default
+        if key in self._cache:
+            return self._cache[key]
+        if self.is_async:
+            return self._load_async(key)
+        self._pending.add(key)
+        self._dispatch()
+        return self._cache[key]
+
+    def get_cached(self, key, default=None):
+        return self._cache.get(key, default)
+
+    def load_many(self, keys):
+        self.prime_keys(keys)
+        if self.is_async:
+            return asyncio.gather(*(self._load_async(key) for key in keys))
+        return [self.load(key) for key in keys]
+
+    def clear(self):
+        self._cache.clear()
+        self._pending.clear()
+
+    def _dispatch(self):
+        keys, self._pending = list(self._pending), set()
+        self._fetch(keys)
+
+    def _fetch(self, keys):
+        results = self.batch_fn(keys)
+        for key in keys:
+            if key in results:
+                self._cache[key] = results[key]
+            else:
+                self._cache[key] = self.default() if callable(self.default) else self.default
+
+    async def _load_async(self, key):
+        if key not in self._cache:
+            batch = self._batches.get(key)
+            if batch is None:
+                self._pending.add(key)
+                batch = self._schedule_dispatch()
+            await batch
+        return self._cache[key]
+
+    def _schedule_dispatch(self):
+        if self._next_batch is None:
+            loop = asyncio.get_running_loop()
+            self._next_batch = loop.create_future()
+            loop.call_soon(lambda: loop.create_task(self._dispatch_async()))
+        return self._next_batch
+
+    async def _dispatch_async(self):
+        batch, self._next_batch = self._next_batch, None
+        keys, self._pending = list(self._pending), set()
+        for key in keys:
+            self._batches[key] = batch
+        try:
+            await sync_to_async(self._fetch)(keys)
+        except Exception as e:
+            batch.set_exception(e)
+        else:
+            batch.set_result(None)
+        finally:
+            for key in keys:
+                self._batches.pop(key, None)
+
+
+class BetLoaders:
+    """
+    The set of loaders used by one GraphQL request.
+
+    Every row loaded, or handed in by a root resolver, goes through one of the
+    ``seen_*`` methods: it is cached by primary key and the keys of its own
+    relations are primed before any child resolver runs.
+    """
+
+    def __init__(self, is_async=False):
+        self.is_async = is_async
+        loader = partial(BatchLoader, is_async=is_async)
+
+        self.users = loader(self._load_users)
+        self.bets = loader(self._load_bets)
+        self.options = loader(self._load_options)
+        self.participants = loader(self._load_participants)
+        self.pool_totals = loader(self._load_pool_totals)
+        self.user_stats = loader(self._load_user_stats)
+
+        self.options_by_bet = loader(self._load_options_by_bet, default=list)
+        self.participants_by_bet = loader(self._load_participants_by_bet, default=list)
+        self.participants_by_option = loader(self._load_participants_by_option, default=list)
+        self.participants_by_user = loader(self._load_participants_by_user, default=list)
+        self.created_bets_by_user = loader(self._load_created_bets_by_user, default=list)
+        self.judged_bets_by_user = loader(self._load_judged_bets_by_user, default=list)
+        self.winning_bets_by_option = loader(self._load_winning_bets_by_option, default=list)
+
+        # id() -> row; holding the row keeps its id() from being reused
+        self._registered = {}
+        self._seen_by_model = {
+            User: self.seen_users,
+            Bet: self.seen_bets,
+            BetOption: self.seen_options,
+            BetParticipant: self.seen_participants,
+        }
+
+    def clear(self):
+        for loader in vars(self).values():
+            if isinstance(loader, BatchLoader):
+                loader.clear()
+        self._registered.clear()
+
+    # Priming
+
+    def seen_users(self, users):
+        ids = [user.pk for user in users]
+        for user in users:
+            _prime_complete(self.users, user)
+        self.participants_by_user.prime_keys(ids)
+        self.created_bets_by_user.prime_keys(ids)
+        self.judged_bets_by_user.prime_keys(ids)
+        self.user_stats.prime_keys(ids)
+        self._seen_attached(users)
+
+    def seen_bets(self, bets):
+        ids = [bet.pk for bet in bets]
+        for bet in bets:
+            _prime_complete(self.bets, bet)
+            if _loaded(bet, "total_staked") is not None:
+                self.pool_totals.prime(bet.pk, bet.total_staked)
+        self.users.prime_keys(_loaded(bet, "creator_id") for bet in bets)
+        self.users.prime_keys(_loaded(bet, "judge_id") for bet in bets)
+        self.options.prime_keys(_loaded(bet, "winner_option_id") for bet in bets)
+        self.options_by_bet.prime_keys(ids)
+        self.participants_by_bet.prime_keys(ids)
+        self._seen_attached(bets)
+
+    def seen_options(self, options):
+        ids = [option.pk for option in options]
+        for option in options:
+            _prime_complete(self.options, option)
+        self.bets.prime_keys(_loaded(option, "bet_id") for option in options)
+        self.pool_totals.prime_keys(_loaded(option, "bet_id") for option in options)
+        self.participants_by_option.prime_keys(ids)
+        self.winning_bets_by_option.prime_keys(ids)
+        self._seen_attached(options)
+
+    def seen_participants(self, participants):
+        for participant in participants:
+            _prime_complete(self.participants, participant)
+        self.users.prime_keys(_loaded(p, "user_id") for p in participants)
+        self.bets.prime_keys(_loaded(p, "bet_id") for p in participants)
+        self.options.prime_keys(_loaded(p, "chosen_option_id") for p in participants)
+        self._seen_attached(participants)
+
+    def _seen_attached(self, rows):
+        """
+        Register rows that select_related/prefetch_related attached to
+        ``rows``, so their own relations are primed before the first child
+        resolver runs. Rows already registered are skipped, which also
+        stops the walk on back-references such as option.bet.
+        """
+        nested = defaultdict(list)
+        for row in rows:
+            attached = list(row._state.fields_cache.values())
+            for related in getattr(row, "_prefetched_objects_cache", {}).values():
+                attached.extend(related)
+            for related in attached:
+                if related is not None and id(related) not in self._registered:
+                    self._registered[id(related)] = related
+                    nested[type(related)].append(related)
+        for model, related in nested.items():
+            seen = self._seen_by_model.get(model)
+            if seen is not None:
+                seen(related)
+
+    # Batch functions
+
+    def _by_pk(self, model, keys, seen):
+        rows = list(model._default_manager.filter(pk__in=keys))
+        seen(rows)
+        return {row.pk: row for row in rows}
+
+    def _grouped(self, model, field, keys, seen):
+        rows = list(model._default_manager.filter(**{f"{field}__in": keys}).order_by("pk"))
+        seen(rows)
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[getattr(row, field)].append(row)
+        return grouped
+
+    def _load_users(self, keys):
+        return self._by_pk(User, keys, self.seen_users)
+
+    def _load_bets(self, keys):
+        return self._by_pk(Bet, keys, self.seen_bets)
+
+    def _load_options(self, keys):
+        return self._by_pk(BetOption, keys, self.seen_options)
+
+    def _load_participants(self, keys):
+        return self._by_pk(BetParticipant, keys, self.seen_participants)
+
+    def _load_pool_totals(self, keys):
+        return dict(Bet.objects.filter(pk__in=keys).values_list("pk", "total_staked"))
+
+    def _load_user_stats(self, keys):
+        # Users who never staked have no row and resolve to None.
+        return {stats.user_id: stats for stats in UserStats.objects.filter(user_id__in=keys)}
+
+    def _load_options_by_bet(self, keys):
+        return self._grouped(BetOption, "bet_id", keys, self.seen_options)
+
+    def _load_participants_by_bet(self, keys):
+        return self._grouped(BetParticipant, "bet_id", keys, self.seen_participants)
+
+    def _load_participants_by_option(self, keys):
+        return self._grouped(BetParticipant, "chosen_option_id", keys, self.seen_participants)
+
+    def _load_participants_by_user(self, keys):
+        return self._grouped(BetParticipant, "user_id", keys, self.seen_participants)
+
+    def _load_created_bets_by_user(self, keys):
+        return self._grouped(Bet, "creator_id", keys, self.seen_bets)
+
+    def _load_judged_bets_by_user(self, keys):
+        return self._grouped(Bet, "judge_id", keys, self.seen_bets)
+
+    def _load_winning_bets_by_option(self, keys):
+        return self._grouped(Bet, "winner_option_id", keys, self.seen_bets)
+
+
+def _loaded(instance, attname):
+    # Read a column without triggering a query if only() deferred it.
+    return instance.__dict__.get(attname)
+
+
+def _prime_complete(loader, instance):
+    # Only fully loaded rows may be served by pk; an only() row would fetch
+    # its missing columns one query at a time.
+    if not instance.get_deferred_fields():
+        loader.prime(instance.pk, instance)
+
+
+def load_related(root, name, loader, key):
+    """
+    Resolve relation ``name`` of ``root``, preferring rows that the queryset
+    optimizer already fetched (``select_related``/``prefetch_related``) and
+    falling back to ``loader.load(key)``.
+    """
+    prefetched = getattr(root, "_prefetched_objects_cache", {})
+    if name in prefetched:
+        return list(prefetched[name])
+    field = root._meta.get_field(name)
+    if field.many_to_one and field.is_cached(root):
+        return getattr(root, name)
+    return loader.load(key)
+
+
+def then(value, callback):
+    """
+    Apply ``callback`` to a loader result, which is a plain value under
+    synchronous execution and may be an awaitable under async execution.
+    """
+    if inspect.isawaitable(value):
+        async def chained():
+            return callback(await value)
+        return chained()
+    return callback(value)
+
+
+def get_loaders(info):
+    """
+    Return the loaders bound to the current request, creating them on first use.
+
+    Loaders live on ``info.context`` (the Django request under GraphQLView);
+    without a context every call gets a fresh, unbatched set. Requests marked
+    ``graphql_async`` by the async view get async loaders.
+    """
+    context = info.context
+    if context is None:
+        return BetLoaders()
+    loaders = getattr(context, "bet_loaders", None)
+    if loaders is None:
+        loaders = BetLoaders(is_async=getattr(context, "graphql_async", False))
+        context.bet_loaders = loaders
+    return loaders
+
+
+def clear_loaders(info):
+    """Drop everything cached for this request, e.g. after a mutation wrote."""
+    loaders = getattr(info.context, "bet_loaders", None)
+    if loaders is not None:
+        loaders.clear()
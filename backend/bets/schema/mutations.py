@@ -1,12 +1,22 @@
 import graphene
 from .types import BetType, BetParticipantType
+from .loaders import clear_loaders, get_loaders
 from django.contrib.auth import get_user_model
 from ..models import Bet, BetOption, BetParticipant
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from decimal import Decimal
 import logging
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.db.transaction import TransactionManagementError
+from accounts.models import WalletLedgerEntry
+from accounts.wallet import debit, InsufficientFunds
+from ..settlement import settle_in_background
+from ..aggregates import record_stakes
+from ..stats import record_stakes as record_user_stakes
+from ..bulk import BatchTooLarge, create_bets, place_stakes, replace_options
+from ..signals import notify_bet_changed
+from ..validation import resolution_target, stake_target
 
 # Set up loggers for debugging and error tracking
 debug_logger = logging.getLogger("debugger")
@@ -30,15 +40,15 @@ class CreateBetMutation(graphene.Mutation):
     @classmethod
     def mutate(cls, root, info, *args, **kwargs):
         try:
-            debug_logger.debug(f"CreateBet called with data: {kwargs}")
+            debug_logger.debug("CreateBet called with data: %s", kwargs)
 
             # get the creator user
             user = User.objects.get(pk=kwargs.get('creator_id'))
-            debug_logger.debug(f"User found: {user.username}")
+            debug_logger.debug("User found: user_id=%s", user.id)
 
             # get the judge user
             judge = User.objects.get(pk=kwargs.get('judge_id'))
-            debug_logger.debug(f"Judge found: {judge.username}")
+            debug_logger.debug("Judge found: user_id=%s", judge.id)
 
             # Parse and validate the datetime
             try:
@@ -91,24 +101,69 @@ class CreateBetMutation(graphene.Mutation):
                 description=description,
                 expires_at=expires_at_dt
             )
-            debug_logger.debug(f"Bet created: {bet}")
+            debug_logger.debug("Bet created: bet_id=%s", bet.id, extra={"bet_id": bet.id})
 
             # Create associated bet options
             BetOption.objects.bulk_create([
                 BetOption(bet=bet, text=option_text) for option_text in options
             ])
-            debug_logger.debug(f"BetOptions created: {options}")
+            debug_logger.debug("BetOptions created: %s", options)
+            clear_loaders(info)
+            notify_bet_changed(bet.id, created=True)
 
             return CreateBetMutation(bet=bet, success=True, message=None)
 
         except User.DoesNotExist:
-            logger.error(f"User or Judge not found with id {kwargs.get('creator_id')} or {kwargs.get('judge_id')}")
+            logger.error("User or Judge not found with id %s or %s", kwargs.get("creator_id"), kwargs.get("judge_id"))
             return CreateBetMutation(bet=None, success=False, message="User Not Found.")
 
         except Exception as e:
-            logger.error(f"Unexpected Error while creating a Bet: {str(e)}", exc_info=True)
+            logger.error("Unexpected Error while creating a Bet: %s", e, exc_info=True)
             return CreateBetMutation(bet=None, success=False, message="Unexpected error occurred.")
 
+class BetInput(graphene.InputObjectType):
+    creator_id = graphene.ID(required=True)
+    title = graphene.String(required=True)
+    description = graphene.String(required=True)
+    options = graphene.List(graphene.String, required=True)
+    expires_at = graphene.String(required=True)
+    judge_id = graphene.ID(required=True)
+
+class BetResult(graphene.ObjectType):
+    index = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+    bet = graphene.Field(BetType)
+
+class CreateBetsBulk(graphene.Mutation):
+    class Arguments:
+        bets = graphene.List(graphene.NonNull(BetInput), required=True)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+    created = graphene.Int()
+    results = graphene.List(BetResult)
+
+    @classmethod
+    def mutate(cls, root, info, bets):
+        try:
+            results = create_bets(bets)
+        except BatchTooLarge as e:
+            return CreateBetsBulk(success=False, message=str(e), created=0, results=[])
+        except Exception as e:
+            logger.error("Unexpected error while creating bets in bulk: %s", e, exc_info=True)
+            return CreateBetsBulk(success=False, message="Unexpected error occurred.", created=0, results=[])
+
+        clear_loaders(info)
+        created = sum(1 for result in results if result.success)
+        debug_logger.debug("Bulk bet creation: %s of %s bets created", created, len(results))
+        return CreateBetsBulk(
+            success=True,
+            message=None,
+            created=created,
+            results=[BetResult(index=r.index, success=r.success, message=r.message, bet=r.instance) for r in results],
+        )
+
 class UpdateBetMutation(graphene.Mutation):
     class Arguments:
         bet_id = graphene.ID(required=True)
@@ -124,81 +179,88 @@ class UpdateBetMutation(graphene.Mutation):
     @classmethod
     def mutate(cls, root, info, *args, **kwargs):
         try:
-            debug_logger.debug(f"UpdateBet called with data: {kwargs}")
-            bet = Bet.objects.get(pk=kwargs.get('bet_id'))
-            updated_fields = []
-
-            # Prevent updating options if bets have been placed
-            if kwargs.get("options") and BetParticipant.objects.filter(bet=bet).exists():
-                logger.error(f"Attempt to change options after participation: Bet ID {bet.id}")
-                return UpdateBetMutation(
-                    success=False,
-                    message="Cannot update options because a user has already placed a bet.",
-                    bet=None
-                )
-
-            # Update title if provided
-            if kwargs.get("title"):
-                bet.title = kwargs.get("title").strip()
-                updated_fields.append("title")
-
-            # Update description if provided
-            if kwargs.get("description"):
-                bet.description = kwargs.get('description').strip()
-                updated_fields.append("description")
-
-            # Update expiration if provided
-            if kwargs.get("expires_at"):
-                try:
-                    expires_at_dt = parse_datetime(kwargs.get("expires_at"))
-                except ValueError:
-                    logger.error("Invalid datetime received while updating bet.")
-                    return UpdateBetMutation(success=False, message="Invalid datetime format. Use ISO 8601 format like '2025-04-25T15:30:00Z'.", bet=None)
-
-                if not expires_at_dt:
-                    logger.error("Datetime parsing failed while updating bet.")
-                    return UpdateBetMutation(success=False, message="Invalid datetime format.", bet=None)
-
-                if timezone.is_naive(expires_at_dt):
-                    expires_at_dt = timezone.make_aware(expires_at_dt)
-                if expires_at_dt <= timezone.now():
-                    return UpdateBetMutation(success=False, message="Expiry date must be in the future.", bet=None)
-
-                bet.expires_at = expires_at_dt
-                updated_fields.append("expires_at")
-
-            # Update options if provided and valid
-            if kwargs.get("options"):
-                options = kwargs.get("options", [])
-                options = [opt.strip() for opt in options if opt.strip()]
-                seen = set()
-                unique_options = []
-                for opt in options:
-                    normalized = opt.lower()
-                    if normalized not in seen:
-                        seen.add(normalized)
-                        unique_options.append(opt)
-                options = unique_options
-
-                if len(options) < 2:
-                    return UpdateBetMutation(success=False, message="At least two options are required.", bet=None)
-
-                # Replace old options
-                bet.options.all().delete()
-                for option_text in options:
-                    BetOption.objects.create(bet=bet, text=option_text)
-                debug_logger.debug(f"Updated options for Bet ID {bet.id}: {options}")
-
-            bet.save(update_fields=updated_fields)
-            debug_logger.debug(f"Bet Updated Successfully: {bet}")
+            debug_logger.debug("UpdateBet called with data: %s", kwargs)
+            with transaction.atomic():
+                # The bet row stays locked until the options and fields are written, so
+                # no participation can slip in between the check below and the update
+                bet = Bet.objects.select_for_update().get(pk=kwargs.get('bet_id'))
+                updated_fields = []
+
+                # Prevent updating options if bets have been placed
+                if kwargs.get("options") and BetParticipant.objects.filter(bet=bet).exists():
+                    logger.error("Attempt to change options after participation: Bet ID %s", bet.id, extra={"bet_id": bet.id})
+                    return UpdateBetMutation(
+                        success=False,
+                        message="Cannot update options because a user has already placed a bet.",
+                        bet=None
+                    )
+
+                # Update title if provided
+                if kwargs.get("title"):
+                    bet.title = kwargs.get("title").strip()
+                    updated_fields.append("title")
+
+                # Update description if provided
+                if kwargs.get("description"):
+                    bet.description = kwargs.get('description').strip()
+                    updated_fields.append("description")
+
+                # Update expiration if provided
+                if kwargs.get("expires_at"):
+                    try:
+                        expires_at_dt = parse_datetime(kwargs.get("expires_at"))
+                    except ValueError:
+                        logger.error("Invalid datetime received while updating bet.")
+                        return UpdateBetMutation(success=False, message="Invalid datetime format. Use ISO 8601 format like '2025-04-25T15:30:00Z'.", bet=None)
+
+                    if not expires_at_dt:
+                        logger.error("Datetime parsing failed while updating bet.")
+                        return UpdateBetMutation(success=False, message="Invalid datetime format.", bet=None)
+
+                    if timezone.is_naive(expires_at_dt):
+                        expires_at_dt = timezone.make_aware(expires_at_dt)
+                    if expires_at_dt <= timezone.now():
+                        return UpdateBetMutation(success=False, message="Expiry date must be in the future.", bet=None)
+
+                    bet.expires_at = expires_at_dt
+                    updated_fields.append("expires_at")
+                    # Moving the expiry of a closed, unresolved bet into the future reopens it
+                    if bet.status == Bet.CLOSED:
+                        bet.status = Bet.OPEN
+                        updated_fields.append("status")
+
+                # Update options if provided and valid
+                if kwargs.get("options"):
+                    options = kwargs.get("options", [])
+                    options = [opt.strip() for opt in options if opt.strip()]
+                    seen = set()
+                    unique_options = []
+                    for opt in options:
+                        normalized = opt.lower()
+                        if normalized not in seen:
+                            seen.add(normalized)
+                            unique_options.append(opt)
+                    options = unique_options
+
+                    if len(options) < 2:
+                        return UpdateBetMutation(success=False, message="At least two options are required.", bet=None)
+
+                    # Keep unchanged options, insert new ones and delete dropped ones
+                    added, removed = replace_options(bet.id, options)
+                    debug_logger.debug("Updated options for Bet ID %s: added %s, removed %s", bet.id, added, removed)
+
+                bet.save(update_fields=updated_fields)
+            clear_loaders(info)
+            notify_bet_changed(bet.id, status_changed="status" in updated_fields)
+            debug_logger.debug("Bet Updated Successfully: bet_id=%s fields=%s", bet.id, updated_fields, extra={"bet_id": bet.id})
             return UpdateBetMutation(success=True, message="Bet updated successfully.", bet=bet)
 
         except Bet.DoesNotExist:
-            logger.error(f"Bet not found with ID: {kwargs.get('bet_id')}")
+            logger.error("Bet not found with ID: %s", kwargs.get("bet_id"))
             return UpdateBetMutation(success=False, message="Bet Not Found.", bet=None)
 
         except Exception as e:
-            logger.error(f"Unexpected Error while updating Bet ID {kwargs.get('bet_id')}: {str(e)}", exc_info=True)
+            logger.error("Unexpected Error while updating Bet ID %s: %s", kwargs.get("bet_id"), e, exc_info=True)
             return UpdateBetMutation(success=False, message="Unexpected error occurred.", bet=None)
 
 class DeleteBetMutation(graphene.Mutation):
@@ -211,16 +273,18 @@ class DeleteBetMutation(graphene.Mutation):
     @classmethod
     def mutate(cls, root, info, bet_id):
         try:
-            debug_logger.debug(f"DeleteBet called with ID: {bet_id}")
+            debug_logger.debug("DeleteBet called with ID: %s", bet_id)
             bet = Bet.objects.get(pk=bet_id)
             bet.delete()
-            debug_logger.debug(f"Bet Deleted Successfully: {bet}")
+            clear_loaders(info)
+            notify_bet_changed(bet_id, deleted=True)
+            debug_logger.debug("Bet Deleted Successfully: bet_id=%s", bet_id, extra={"bet_id": bet_id})
             return DeleteBetMutation(success=True, message="Bet deleted successfully.")
         except Bet.DoesNotExist:
-            logger.error(f"Delete failed. Bet not found: {bet_id}")
+            logger.error("Delete failed. Bet not found: %s", bet_id)
             return DeleteBetMutation(success=False, message="Bet not found.")
         except Exception as e:
-            logger.error(f"Unexpected error while deleting Bet ID {bet_id}: {str(e)}", exc_info=True)
+            logger.error("Unexpected error while deleting Bet ID %s: %s", bet_id, e, exc_info=True)
             return DeleteBetMutation(success=False, message="Unexpected error occurred.")
 
 class CreateBetParticipant(graphene.Mutation):
@@ -237,67 +301,122 @@ class CreateBetParticipant(graphene.Mutation):
     @classmethod
     def mutate(cls, root, info, user_id, bet_id, stake, bet_option_id):
         try:
-            user = User.objects.get(pk=user_id)
-            bet = Bet.objects.get(pk=bet_id)
-            betOption = BetOption.objects.get(pk=bet_option_id)
-
-            # Check if user is not the judge
-            if bet.judge_id == user.id:
-                return CreateBetParticipant(
-                    success=False,
-                    message="The judge cannot participate in the bet.",
-                    bet_participant=None
-                )
-            # Check if the bet is resolved
-            if bet.is_resolved:
-                return CreateBetParticipant(success=False, message="This bet has already been resolved.", bet_participant=None)
-
-            if BetParticipant.objects.filter(bet=bet, user=user).exists():
-                return CreateBetParticipant(success=False, message="User has already participated in this bet.", bet_participant=None)
-
-            # Check if it's expired
-            if bet.expires_at < timezone.now():
-                return CreateBetParticipant(success=False, message="This bet has expired.", bet_participant=None)
-
-            # Check if the option belongs to the right bet
-            if betOption.bet_id != bet.id:
-                return CreateBetParticipant(success=False, message="This option does not belong to the selected bet.", bet_participant=None)
-
-            # Check if stake is valid
-            stake = Decimal(stake)
-            if stake <= 0:
-                return CreateBetParticipant(success=False, message="Stake must be greater than 0.", bet_participant=None)
-
+            # The bet stays locked from the checks to the inserts, so it cannot
+            # be resolved or closed in between
             with transaction.atomic():
-                betparticipant = BetParticipant.objects.create(
-                    user=user,
-                    bet=bet,
-                    chosen_option=betOption,
-                    stake=stake
-                )
-            debug_logger.debug("Bet Participant Created Successfully")
+                bet = stake_target(user_id, bet_id, bet_option_id)
+
+                # Check if user is not the judge
+                if bet.judge_id == int(user_id):
+                    return CreateBetParticipant(
+                        success=False,
+                        message="The judge cannot participate in the bet.",
+                        bet_participant=None
+                    )
+                # Check if the bet is resolved
+                if bet.is_resolved:
+                    return CreateBetParticipant(success=False, message="This bet has already been resolved.", bet_participant=None)
+
+                if bet.already_joined:
+                    return CreateBetParticipant(success=False, message="User has already participated in this bet.", bet_participant=None)
+
+                # Check if it's expired (the scheduler may not have closed it yet)
+                if bet.status == Bet.CLOSED or bet.expires_at < timezone.now():
+                    return CreateBetParticipant(success=False, message="This bet has expired.", bet_participant=None)
+
+                # Check if the option belongs to the right bet
+                if bet.option_bet_id != bet.id:
+                    return CreateBetParticipant(success=False, message="This option does not belong to the selected bet.", bet_participant=None)
+
+                # Check if stake is valid
+                stake = Decimal(stake)
+                if stake <= 0:
+                    return CreateBetParticipant(success=False, message="Stake must be greater than 0.", bet_participant=None)
+
+                # The stake debit and the participation commit or roll back together
+                debit(user_id, stake, WalletLedgerEntry.STAKE, reference=f"stake:{bet.id}:{user_id}")
+                # bulk_create skips save()'s clean(), which would fetch the option
+                # again; stake_target already checked it belongs to the bet
+                betparticipant, = BetParticipant.objects.bulk_create([
+                    BetParticipant(user_id=user_id, bet=bet, chosen_option_id=bet_option_id, stake=stake)
+                ])
+                record_stakes(bet.id, bet_option_id, stake)
+                record_user_stakes([(int(user_id), stake)])
+            debug_logger.debug(
+                "Bet Participant Created Successfully: bet_id=%s user_id=%s stake=%s", bet.id, user_id, stake,
+                extra={"bet_id": bet.id, "user_id": user_id},
+            )
+            clear_loaders(info)
+            notify_bet_changed(bet.id, participant_id=int(user_id))
 
             return CreateBetParticipant(success=True, message=None, bet_participant=betparticipant)
 
         except User.DoesNotExist:
-            logger.error(f"CreateBetParticipant: user not found: {user_id}, bet_id: {bet_id}")
+            logger.error("CreateBetParticipant: user not found: %s, bet_id: %s", user_id, bet_id)
             return CreateBetParticipant(success=False, message="User not found.", bet_participant=None)
         except Bet.DoesNotExist:
-            logger.error(f"CreateBetParticipant: bet not found: {bet_id}")
+            logger.error("CreateBetParticipant: bet not found: %s", bet_id)
             return CreateBetParticipant(success=False, message="Bet not found.", bet_participant=None)
         except BetOption.DoesNotExist:
-            logger.error(f"CreateBetParticipant: betOption not found: {bet_option_id}")
+            logger.error("CreateBetParticipant: betOption not found: %s", bet_option_id)
             return CreateBetParticipant(success=False, message="BetOption not found.", bet_participant=None)
+        except InsufficientFunds:
+            return CreateBetParticipant(success=False, message="Insufficient wallet balance.", bet_participant=None)
         except IntegrityError:
-            logger.error(f"Integrity error while creating BetParticipant")
+            logger.error("Integrity error while creating BetParticipant")
             return CreateBetParticipant(success=False, message="Database integrity error.", bet_participant=None)
         except TransactionManagementError:
-            logger.error(f"Error managing transaction while creating BetParticipant")
+            logger.error("Error managing transaction while creating BetParticipant")
             return CreateBetParticipant(success=False, message="Transaction management error.", bet_participant=None)
         except Exception as e:
-            logger.error(f"Unexpected error while creating a bet Participant: {str(e)}", exc_info=True)
+            logger.error("Unexpected error while creating a bet Participant: %s", e, exc_info=True)
             return CreateBetParticipant(success=False, message="Unexpected error occurred.", bet_participant=None)
 
+class StakeInput(graphene.InputObjectType):
+    user_id = graphene.ID(required=True)
+    bet_id = graphene.ID(required=True)
+    stake = graphene.Decimal(required=True)
+    bet_option_id = graphene.ID(required=True)
+
+class StakeResult(graphene.ObjectType):
+    index = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+    bet_participant = graphene.Field(BetParticipantType)
+
+class CreateBetParticipantsBulk(graphene.Mutation):
+    class Arguments:
+        stakes = graphene.List(graphene.NonNull(StakeInput), required=True)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+    created = graphene.Int()
+    results = graphene.List(StakeResult)
+
+    @classmethod
+    def mutate(cls, root, info, stakes):
+        try:
+            results = place_stakes(stakes)
+        except BatchTooLarge as e:
+            return CreateBetParticipantsBulk(success=False, message=str(e), created=0, results=[])
+        except Exception as e:
+            logger.error("Unexpected error while creating bet participants in bulk: %s", e, exc_info=True)
+            return CreateBetParticipantsBulk(success=False, message="Unexpected error occurred.", created=0, results=[])
+
+        clear_loaders(info)
+        created = [result.instance for result in results if result.success]
+        get_loaders(info).seen_participants(created)
+        debug_logger.debug("Bulk participation: %s of %s stakes placed", len(created), len(results))
+        return CreateBetParticipantsBulk(
+            success=True,
+            message=None,
+            created=len(created),
+            results=[
+                StakeResult(index=r.index, success=r.success, message=r.message, bet_participant=r.instance)
+                for r in results
+            ],
+        )
+
 
 class ResolveBetMutation(graphene.Mutation):
     class Arguments:
@@ -312,48 +431,57 @@ class ResolveBetMutation(graphene.Mutation):
     @classmethod
     def mutate(cls, root, info, judge_id, bet_id, winning_option_id):
         try:
-            judge = User.objects.get(pk=judge_id)
-            bet = Bet.objects.get(pk=bet_id)
-            winning_option = BetOption.objects.get(pk=winning_option_id)
+            # Locked until the resolution is written: no stake can be placed on
+            # the bet while it is being resolved
+            with transaction.atomic():
+                bet = resolution_target(judge_id, bet_id, winning_option_id)
+
+                if bet.judge_id != int(judge_id):
+                    debug_logger.debug("User %s attempted to resolve bet %s but is not the judge.", judge_id, bet.id)
+                    return ResolveBetMutation(success=False, message="Only the judge can resolve this bet.", bet=None)
 
-            if bet.judge_id != judge.id:
-                debug_logger.debug(f"User {judge.id} attempted to resolve bet {bet.id} but is not the judge.")
-                return ResolveBetMutation(success=False, message="Only the judge can resolve this bet.", bet=None)
+                if bet.is_resolved:
+                    debug_logger.debug("Bet %s already resolved.", bet.id)
+                    return ResolveBetMutation(success=False, message="This bet is already resolved.", bet=None)
 
-            if bet.is_resolved:
-                debug_logger.debug(f"Bet {bet.id} already resolved.")
-                return ResolveBetMutation(success=False, message="This bet is already resolved.", bet=None)
+                if bet.option_bet_id != bet.id:
+                    debug_logger.debug("Option %s does not belong to Bet %s.", winning_option_id, bet.id)
+                    return ResolveBetMutation(success=False, message="Selected option does not belong to this bet.", bet=None)
 
-            if winning_option.bet_id != bet.id:
-                debug_logger.debug(f"Option {winning_option.id} does not belong to Bet {bet.id}.")
-                return ResolveBetMutation(success=False, message="Selected option does not belong to this bet.", bet=None)
+                bet.is_resolved = True
+                bet.status = Bet.RESOLVED
+                bet.winner_option_id = int(winning_option_id)
+                bet.resolved_at = timezone.now()
+                bet.save(update_fields=["is_resolved", "status", "winner_option", "resolved_at"])
+                # Payouts run after commit on the settlement worker;
+                # `manage.py settle_bets` resumes any that fail
+                settle_in_background(bet.id)
 
-            bet.is_resolved = True
-            bet.winner_option = winning_option
-            bet.resolved_at = timezone.now()
-            bet.save(update_fields=["is_resolved", "winner_option", "resolved_at"])
+            clear_loaders(info)
+            notify_bet_changed(bet.id, status_changed=True)
 
             debug_logger.debug(
-                f"Bet {bet.id} resolved successfully by judge {judge.username}. "
-                f"Winning option: {winning_option.id} - '{winning_option.text}'"
+                "Bet %s resolved successfully by judge %s. Winning option: %s - '%s'",
+                bet.id, judge_id, winning_option_id, bet.option_text,
+                extra={"bet_id": bet.id, "winning_option_id": winning_option_id},
             )
 
-            return ResolveBetMutation(success=True, message="Bet resolved successfully.", bet=bet)
+            return ResolveBetMutation(success=True, message="Bet resolved; payouts are being settled.", bet=bet)
 
         except User.DoesNotExist:
-            logger.warning(f"Judge with ID {judge_id} not found while resolving bet {bet_id}.")
+            logger.warning("Judge with ID %s not found while resolving bet %s.", judge_id, bet_id)
             return ResolveBetMutation(success=False, message="Judge not found.", bet=None)
 
         except Bet.DoesNotExist:
-            logger.warning(f"Bet with ID {bet_id} not found.")
+            logger.warning("Bet with ID %s not found.", bet_id)
             return ResolveBetMutation(success=False, message="Bet not found.", bet=None)
 
         except BetOption.DoesNotExist:
-            logger.warning(f"Option with ID {winning_option_id} not found while resolving bet {bet_id}.")
+            logger.warning("Option with ID %s not found while resolving bet %s.", winning_option_id, bet_id)
             return ResolveBetMutation(success=False, message="Winning option not found.", bet=None)
 
         except Exception as e:
-            logger.error(f"Unexpected error while resolving bet {bet_id}: {str(e)}", exc_info=True)
+            logger.error("Unexpected error while resolving bet %s: %s", bet_id, e, exc_info=True)
             return ResolveBetMutation(success=False, message="Unexpected error occurred.", bet=None)
 
 
@@ -361,7 +489,9 @@ class ResolveBetMutation(graphene.Mutation):
 # Register mutations in the schema
 class Mutation(graphene.ObjectType):
     create_bet = CreateBetMutation.Field(name="Bet_Create")
+    create_bets_bulk = CreateBetsBulk.Field(name="Bet_Bulk_Create")
     update_bet = UpdateBetMutation.Field(name="Bet_Update")
     delete_bet = DeleteBetMutation.Field(name="Bet_Delete")
     create_bet_participant = CreateBetParticipant.Field(name="Bet_Participant_Create")
+    create_bet_participants_bulk = CreateBetParticipantsBulk.Field(name="Bet_Participant_Bulk_Create")
     resolve_bet = ResolveBetMutation.Field(name="Bet_Resolve")
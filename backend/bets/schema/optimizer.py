@@ -0,0 +1,125 @@
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def collect_fields(info, selection_sets):
+    """
+    Merge the given selection sets into ``{field_name: [sub selection sets]}``.
+
+    Aliases, fragment spreads and inline fragments are flattened so that the
+    same field requested twice is only planned once.
+    """
+    fields = {}
+    stack = [s for s in selection_sets if s is not None]
+    while stack:
+        selection_set = stack.pop()
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                stack.append(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = info.fragments.get(selection.name.value)
+                if fragment is not None:
+                    stack.append(fragment.selection_set)
+    return fields
+
+
+def field_selections(info, field_nodes=None):
+    """Selection sets of the field currently being resolved."""
+    field_nodes = info.field_nodes if field_nodes is None else field_nodes
+    return [node.selection_set for node in field_nodes]
+
+
+def descend(info, selection_sets, *path):
+    """
+    Follow ``path`` (GraphQL field names) down from ``selection_sets``.
+
+    Used by wrappers such as connections, where the model's fields live
+    under ``edges { node { ... } }``.
+    """
+    for name in path:
+        selection_sets = [s for s in collect_fields(info, selection_sets).get(name, []) if s]
+    return selection_sets
+
+
+class QueryPlan:
+    """Columns, joins and prefetches needed to serve one selection set."""
+
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.prefetch = []
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        return queryset.only(*sorted(self.only))
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except Exception:
+        return None
+
+
+def _plan(info, model, fields, plan, prefix="", required=()):
+    opts = model._meta
+    plan.only.add(prefix + opts.pk.name)
+    for name in required:
+        plan.only.add(prefix + name)
+
+    for graphql_name, sub_selections in fields.items():
+        if graphql_name.startswith("__"):
+            continue
+        field = _model_field(model, to_snake_case(graphql_name))
+
+        if field is None:
+            # A computed field: we cannot tell which columns it reads, so
+            # load the whole row at this level.
+            plan.only.update(prefix + f.name for f in opts.concrete_fields)
+            continue
+
+        if not field.is_relation:
+            plan.only.add(prefix + field.name)
+            continue
+
+        sub_fields = collect_fields(info, sub_selections)
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            path = prefix + field.name
+            plan.only.add(path)
+            plan.select_related.add(path)
+            _plan(info, field.related_model, sub_fields, plan, prefix=path + "__")
+            continue
+
+        # Reverse relations and many-to-many: prefetch with their own plan.
+        sub_plan = QueryPlan()
+        back_reference = ()
+        if field.one_to_many or field.one_to_one:
+            back_reference = (field.field.name,)
+        _plan(info, field.related_model, sub_fields, sub_plan, required=back_reference)
+        queryset = sub_plan.apply(field.related_model._default_manager.order_by("pk"))
+        accessor = field.get_accessor_name() if field.auto_created else field.name
+        plan.prefetch.append(Prefetch(prefix + accessor, queryset=queryset))
+
+
+def optimize_queryset(queryset, info, selection_sets=None, required=()):
+    """
+    Shape ``queryset`` after the GraphQL selection being resolved.
+
+    Selected columns become ``only()``, forward foreign keys become
+    ``select_related`` joins and reverse relations become ``Prefetch``
+    objects, recursively. ``selection_sets`` defaults to the current field's
+    own selection. ``required`` names extra columns the caller reads itself,
+    such as pagination keys.
+    """
+    if selection_sets is None:
+        selection_sets = field_selections(info)
+    plan = QueryPlan()
+    _plan(info, queryset.model, collect_fields(info, selection_sets), plan, required=required)
+    return plan.apply(queryset)
@@ -0,0 +1,126 @@
+import base64
+import graphene
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def encode_cursor(instance, keys):
+    values = []
+    for key in keys:
+        value = getattr(instance, key)
+        values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+    return base64.urlsafe_b64encode("|".join(values).encode()).decode()
+
+
+def decode_cursor(cursor, keys):
+    try:
+        values = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    except Exception:
+        raise GraphQLError("Invalid cursor.")
+    if len(values) != len(keys):
+        raise GraphQLError("Invalid cursor.")
+
+    decoded = []
+    for key, value in zip(keys, values):
+        try:
+            if key.endswith("_at"):
+                # Well-formed but out of range (month 13) raises ValueError.
+                value = parse_datetime(value)
+            elif key == "id":
+                # isdigit() alone accepts digits such as "²" that int() rejects.
+                value = int(value) if value.isascii() and value.isdigit() else None
+        except ValueError:
+            value = None
+        if value is None:
+            raise GraphQLError("Invalid cursor.")
+        decoded.append(value)
+    return decoded
+
+
+def _seek(keys, values, direction):
+    """
+    Row-value comparison ``(k1, k2) < (v1, v2)`` spelled out for the ORM:
+    ``k1 <= v1 AND (k1 < v1 OR (k1 = v1 AND k2 < v2))``. Planners rarely
+    turn the OR alone into one index seek; the redundant bound on the
+    leading key gives them a range to start the index scan at, and the OR
+    then only filters the rows that share ``k1`` with the cursor.
+    """
+    condition = Q()
+    equal = {}
+    for key, value in zip(keys, values):
+        condition |= Q(**equal, **{f"{key}__{direction}": value})
+        equal[key] = value
+    return Q(**{f"{keys[0]}__{direction}e": values[0]}) & condition
+
+
+def _page_queryset(queryset, keys, first, after, last, before):
+    """Return ``(queryset, limit, backward)`` for one page, before it is evaluated."""
+    if first is not None and last is not None:
+        raise GraphQLError("Pass either 'first' or 'last', not both.")
+
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    limit = first if first is not None else last
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if limit < 0:
+        raise GraphQLError("Page size must not be negative.")
+    limit = min(limit, max_limit)
+
+    backward = last is not None or (before is not None and first is None)
+    descending = [f"-{key}" for key in keys]
+    ascending = list(keys)
+
+    if after is not None:
+        queryset = queryset.filter(_seek(keys, decode_cursor(after, keys), "lt"))
+    if before is not None:
+        queryset = queryset.filter(_seek(keys, decode_cursor(before, keys), "gt"))
+
+    queryset = queryset.order_by(*(ascending if backward else descending))
+    return queryset[:limit + 1], limit, backward
+
+
+def _page(rows, limit, backward, keys, after, before):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    page_info = graphene.relay.PageInfo(
+        has_next_page=has_more if not backward else before is not None,
+        has_previous_page=has_more if backward else after is not None,
+        start_cursor=encode_cursor(rows[0], keys) if rows else None,
+        end_cursor=encode_cursor(rows[-1], keys) if rows else None,
+    )
+    return rows, page_info
+
+
+def paginate_keyset(queryset, keys, first=None, after=None, last=None, before=None):
+    """
+    Return ``(rows, page_info)`` for one page of ``queryset`` ordered by
+    ``keys`` descending (newest first).
+
+    ``first``/``after`` walk forward and ``last``/``before`` walk backward.
+    One extra row is fetched to tell whether another page exists.
+    """
+    queryset, limit, backward = _page_queryset(queryset, keys, first, after, last, before)
+    return _page(list(queryset), limit, backward, keys, after, before)
+
+
+async def apaginate_keyset(queryset, keys, first=None, after=None, last=None, before=None):
+    """``paginate_keyset`` for async resolvers, fetching the page with async iteration."""
+    queryset, limit, backward = _page_queryset(queryset, keys, first, after, last, before)
+    return _page([row async for row in queryset], limit, backward, keys, after, before)
+
+
+def build_connection(connection_type, rows, page_info, keys):
+    return connection_type(
+        edges=[
+            connection_type.Edge(node=row, cursor=encode_cursor(row, keys))
+            for row in rows
+        ],
+        page_info=page_info,
+    )
@@ -1,17 +1,113 @@
 import graphene
-from .types import BetType
-from ..models import Bet
+from .types import BetType, BetConnection, BetStatus, LeaderboardEntry, LeaderboardMetric, LeaderboardWindow
+from .loaders import get_loaders
+from .optimizer import optimize_queryset, field_selections, descend
+from .pagination import apaginate_keyset, paginate_keyset, build_connection
+from .. import stats
+from ..cache import get_bet_cache
+from ..models import Bet, BetParticipant
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
 from graphql import GraphQLError
 
+# Feed order and cursor keys for allBets: newest first, id breaks ties.
+BET_CURSOR_KEYS = ("created_at", "id")
+
+def filter_bets(queryset, status=None, creator_id=None, judge_id=None, participant_id=None):
+    # The expiry scheduler closes bets in the background; until it gets to
+    # one, a bet past its expiry still counts as expired, not open.
+    if status == BetStatus.OPEN.value:
+        queryset = queryset.filter(status=Bet.OPEN, expires_at__gt=timezone.now())
+    elif status == BetStatus.EXPIRED.value:
+        queryset = queryset.filter(Q(status=Bet.CLOSED) | Q(status=Bet.OPEN, expires_at__lte=timezone.now()))
+    elif status == BetStatus.RESOLVED.value:
+        queryset = queryset.filter(status=Bet.RESOLVED)
+
+    if creator_id is not None:
+        queryset = queryset.filter(creator_id=creator_id)
+    if judge_id is not None:
+        queryset = queryset.filter(judge_id=judge_id)
+    if participant_id is not None:
+        queryset = queryset.filter(Exists(
+            BetParticipant.objects.filter(bet=OuterRef("pk"), user_id=participant_id)
+        ))
+    return queryset
+
 class Query(graphene.ObjectType):
-    all_bets = graphene.List(BetType)
+    all_bets = graphene.relay.ConnectionField(
+        BetConnection,
+        status=BetStatus(),
+        creator_id=graphene.ID(),
+        judge_id=graphene.ID(),
+        participant_id=graphene.ID(),
+    )
     bet_get = graphene.Field(BetType, id=graphene.ID(required=True))
+    leaderboard = graphene.List(
+        graphene.NonNull(LeaderboardEntry),
+        required=True,
+        metric=LeaderboardMetric(default_value=stats.NET_PROFIT),
+        window=LeaderboardWindow(default_value="all_time"),
+        first=graphene.Int(default_value=20),
+    )
+    leaderboard_rank = graphene.Field(
+        LeaderboardEntry,
+        user_id=graphene.ID(required=True),
+        metric=LeaderboardMetric(default_value=stats.NET_PROFIT),
+        window=LeaderboardWindow(default_value="all_time"),
+    )
 
-    def resolve_all_bets(root, info):
-    	return Bet.objects.all()
+    def resolve_all_bets(root, info, first=None, after=None, last=None, before=None, **filters):
+        queryset = filter_bets(Bet.objects.all(), **filters)
+        queryset = optimize_queryset(
+            queryset,
+            info,
+            descend(info, field_selections(info), "edges", "node"),
+            required=BET_CURSOR_KEYS,
+        )
+        loaders = get_loaders(info)
+        if loaders.is_async:
+            return _all_bets_async(loaders, queryset, first, after, last, before)
+        bets, page_info = paginate_keyset(queryset, BET_CURSOR_KEYS, first, after, last, before)
+        loaders.seen_bets(bets)
+        return build_connection(BetConnection, bets, page_info, BET_CURSOR_KEYS)
 
     def resolve_bet_get(root, info, id):
+        # This request's loaders first, then the shared read cache, then the database
+        loaders = get_loaders(info)
+        if loaders.is_async:
+            return _bet_get_async(loaders, id)
         try:
-            return Bet.objects.get(pk=id)
-        except Bet.DoesNotExist:
-            raise GraphQLError("Bet Not Found")
\ No newline at end of file
+            bet = loaders.bets.get_cached(int(id)) or get_bet_cache().get_bet(int(id))
+        except (ValueError, Bet.DoesNotExist):
+            raise GraphQLError("Bet Not Found")
+        loaders.seen_bets([bet])
+        return bet
+
+    def resolve_leaderboard(root, info, metric, window, first):
+        # Served from the indexed UserStats rows (see bets/stats.py).
+        entries = stats.leaderboard(_enum_value(metric), _enum_value(window), first)
+        get_loaders(info).users.prime_keys(entry["user_id"] for entry in entries)
+        return entries
+
+    def resolve_leaderboard_rank(root, info, user_id, metric, window):
+        try:
+            user_id = int(user_id)
+        except ValueError:
+            raise GraphQLError("User Not Found")
+        return stats.rank(user_id, _enum_value(metric), _enum_value(window))
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+async def _all_bets_async(loaders, queryset, first, after, last, before):
+    bets, page_info = await apaginate_keyset(queryset, BET_CURSOR_KEYS, first, after, last, before)
+    loaders.seen_bets(bets)
+    return build_connection(BetConnection, bets, page_info, BET_CURSOR_KEYS)
+
+async def _bet_get_async(loaders, id):
+    try:
+        bet = loaders.bets.get_cached(int(id)) or await get_bet_cache().aget_bet(int(id))
+    except (ValueError, Bet.DoesNotExist):
+        raise GraphQLError("Bet Not Found")
+    loaders.seen_bets([bet])
+    return bet
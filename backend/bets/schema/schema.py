@@ -1,6 +1,7 @@
 import graphene
 from .queries import Query
 from .mutations import Mutation
+from .subscriptions import Subscription
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
\ No newline at end of file
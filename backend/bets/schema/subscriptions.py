@@ -0,0 +1,80 @@
+import asyncio
+import graphene
+from asgiref.sync import sync_to_async
+from graphql import GraphQLError
+from core.pubsub import get_pubsub
+from .types import BetStatus
+from .. import subscriptions
+
+
+class BetUpdateEvent(graphene.Enum):
+    JOINED = subscriptions.JOINED
+    UPDATED = subscriptions.UPDATED
+    STATUS_CHANGED = subscriptions.STATUS_CHANGED
+    EXPIRED = subscriptions.EXPIRED
+    DELETED = subscriptions.DELETED
+
+
+class OptionPoolType(graphene.ObjectType):
+    id = graphene.ID()
+    total_staked = graphene.Decimal()
+    participant_count = graphene.Int()
+    odds = graphene.Decimal()
+
+
+class BetUpdateType(graphene.ObjectType):
+    bet_id = graphene.ID()
+    status = BetStatus()
+    total_staked = graphene.Decimal()
+    participant_count = graphene.Int()
+    winner_option_id = graphene.ID()
+    options = graphene.List(OptionPoolType)
+    events = graphene.List(BetUpdateEvent, description="What happened since the previous update; empty on the first one.")
+
+
+class Subscription(graphene.ObjectType):
+    bet_updates = graphene.Field(
+        BetUpdateType,
+        bet_id=graphene.ID(required=True),
+        description=(
+            "Pool, odds and status of a bet: now, then after every change (coalesced). "
+            "Expiry is detected by the subscription itself, at the bet's expiry time."
+        ),
+    )
+
+    async def subscribe_bet_updates(root, info, bet_id):
+        try:
+            bet_id = int(bet_id)
+        except ValueError:
+            raise GraphQLError("Bet Not Found")
+
+        # Subscribe before reading the snapshot so no change falls in between.
+        updates = get_pubsub().subscribe(subscriptions.bet_topic(bet_id))
+        try:
+            snapshot = (await sync_to_async(subscriptions.load_snapshots)([bet_id])).get(bet_id)
+            if snapshot is None:
+                raise GraphQLError("Bet Not Found")
+            yield snapshot
+            expires_in = subscriptions.seconds_until_expiry(snapshot)
+            while True:
+                try:
+                    update = await asyncio.wait_for(anext(updates), expires_in)
+                except asyncio.TimeoutError:
+                    # The expiry scheduler runs in its own process, out of reach of
+                    # the in-memory pubsub, so the expiry is noticed here instead
+                    update = (await sync_to_async(subscriptions.load_snapshots)([bet_id])).get(bet_id)
+                    if update is None:
+                        update = {"bet_id": bet_id, "status": None, "options": [], "events": [subscriptions.DELETED]}
+                    elif update["status"] == "open":
+                        # Woke up a moment early
+                        expires_in = subscriptions.seconds_until_expiry(update)
+                        continue
+                    else:
+                        expired = update["status"] == "expired"
+                        update["events"] = [subscriptions.EXPIRED if expired else subscriptions.STATUS_CHANGED]
+                yield update
+                if subscriptions.DELETED in update["events"]:
+                    return
+                expires_in = subscriptions.seconds_until_expiry(update)
+        finally:
+            await updates.close()
@@ -1,6 +1,8 @@
 import graphene
 from graphene_django import DjangoObjectType
-from ..models import Bet, BetParticipant, BetOption
+from ..models import Bet, BetParticipant, BetOption, UserStats
+from .loaders import get_loaders, load_related, then
+from ..aggregates import odds
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -8,19 +10,111 @@ User = get_user_model()
 class UserType(DjangoObjectType):
 	class Meta:
 		model = User
-		fields = "__all__"
+		exclude = ("password", "token_version")
+
+	def resolve_created_bets(root, info):
+		return load_related(root, "created_bets", get_loaders(info).created_bets_by_user, root.pk)
+
+	def resolve_judged_bets(root, info):
+		return load_related(root, "judged_bets", get_loaders(info).judged_bets_by_user, root.pk)
+
+	def resolve_joined_bets(root, info):
+		return load_related(root, "joined_bets", get_loaders(info).participants_by_user, root.pk)
+
+	def resolve_stats(root, info):
+		field = User._meta.get_field("stats")
+		if field.is_cached(root):
+			return field.get_cached_value(root)
+		return get_loaders(info).user_stats.load(root.pk)
+
+class UserStatsType(DjangoObjectType):
+	class Meta:
+		model = UserStats
+		fields = ("bets", "volume", "settled", "won", "win_rate", "net_profit")
 
 class BetOptionType(DjangoObjectType):
+	odds = graphene.Decimal(description="Payout per unit staked if this option wins; null until someone backs it.")
+
 	class Meta:
 		model=BetOption
 		fields = "__all__"
 
+	def resolve_odds(root, info):
+		pool_total = get_loaders(info).pool_totals.load(root.bet_id)
+		return then(pool_total, lambda total: odds(root.total_staked, total))
+
+	def resolve_bet(root, info):
+		return load_related(root, "bet", get_loaders(info).bets, root.bet_id)
+
+	def resolve_participants(root, info):
+		return load_related(root, "participants", get_loaders(info).participants_by_option, root.pk)
+
+	def resolve_winning_bets(root, info):
+		return load_related(root, "winning_bets", get_loaders(info).winning_bets_by_option, root.pk)
+
 class BetParticipantType(DjangoObjectType):
 	class Meta:
 		model = BetParticipant
 		fields = "__all__"
 
+	def resolve_user(root, info):
+		return load_related(root, "user", get_loaders(info).users, root.user_id)
+
+	def resolve_bet(root, info):
+		return load_related(root, "bet", get_loaders(info).bets, root.bet_id)
+
+	def resolve_chosen_option(root, info):
+		return load_related(root, "chosen_option", get_loaders(info).options, root.chosen_option_id)
+
 class BetType(DjangoObjectType):
 	class Meta:
 		model = Bet
-		fields = "__all__"
\ No newline at end of file
+		fields = "__all__"
+
+	def resolve_creator(root, info):
+		return load_related(root, "creator", get_loaders(info).users, root.creator_id)
+
+	def resolve_judge(root, info):
+		return load_related(root, "judge", get_loaders(info).users, root.judge_id)
+
+	def resolve_winner_option(root, info):
+		return load_related(root, "winner_option", get_loaders(info).options, root.winner_option_id)
+
+	def resolve_options(root, info):
+		return load_related(root, "options", get_loaders(info).options_by_bet, root.pk)
+
+	def resolve_participants(root, info):
+		return load_related(root, "participants", get_loaders(info).participants_by_bet, root.pk)
+
+class BetConnection(graphene.relay.Connection):
+	class Meta:
+		node = BetType
+
+class BetStatus(graphene.Enum):
+	OPEN = "open"
+	EXPIRED = "expired"
+	RESOLVED = "resolved"
+
+class LeaderboardMetric(graphene.Enum):
+	NET_PROFIT = "net_profit"
+	WIN_RATE = "win_rate"
+	VOLUME = "volume"
+
+class LeaderboardWindow(graphene.Enum):
+	ALL_TIME = "all_time"
+	DAY = "day"
+	WEEK = "week"
+	MONTH = "month"
+
+class LeaderboardEntry(graphene.ObjectType):
+	rank = graphene.Int(required=True)
+	user = graphene.Field(UserType, required=True)
+	bets = graphene.Int(required=True)
+	volume = graphene.Decimal(required=True)
+	settled = graphene.Int(required=True)
+	won = graphene.Int(required=True)
+	win_rate = graphene.Float(required=True)
+	net_profit = graphene.Decimal(required=True)
+
+	def resolve_user(root, info):
+		return get_loaders(info).users.load(root["user_id"])
@@ -0,0 +1,188 @@
+"""
+Pari-mutuel settlement of resolved bets.
+
+Every stake on a bet goes into one pool. When the judge picks the winning
+option, the winners share the whole pool in proportion to their stakes:
+
+    payout = stake * total_pool / winning_pool
+
+rounded down to the cent (the leftover cents stay with the house). If nobody
+backed the winning option, every stake is refunded.
+
+Participants are settled in chunks, each in its own short transaction:
+one read of the chunk, one bulk ledger insert, one wallet UPDATE, one
+participant UPDATE and the user statistics (``bets.stats``), whatever the
+chunk size. A participant is marked with
+``settled_at`` in the same transaction that pays them, and every payout
+has a unique ledger reference, so an interrupted or repeated run picks up
+where the last one stopped and never pays anyone twice.
+
+Resolving a bet hands settlement to a background worker once the resolution
+has committed (``settle_in_background``), so the judge's request does not
+wait for every chunk. Bets whose settlement failed or was cut short by a
+restart stay in ``unsettled_bets()`` for ``manage.py settle_bets``.
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_DOWN
+
+from django.db import close_old_connections, transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from accounts.models import Wallet, WalletLedgerEntry
+from . import stats
+from .models import Bet, BetParticipant
+from .signals import notify_bet_changed
+
+logger = logging.getLogger("django")
+
+CHUNK_SIZE = 500
+CENT = Decimal("0.01")
+
+SettlementResult = namedtuple("SettlementResult", ["bet_id", "settled", "paid"])
+
+
+class SettlementError(Exception):
+    pass
+
+
+def _pools(bet):
+    totals = BetParticipant.objects.filter(bet_id=bet.pk).aggregate(
+        total=Sum("stake"),
+        winning=Sum("stake", filter=Q(chosen_option_id=bet.winner_option_id)),
+    )
+    return totals["total"] or Decimal("0"), totals["winning"] or Decimal("0")
+
+
+def payout_for(stake, total_pool, winning_pool):
+    if winning_pool <= 0:
+        return stake
+    return (stake * total_pool / winning_pool).quantize(CENT, rounding=ROUND_DOWN)
+
+
+def _settle_chunk(bet, total_pool, winning_pool, chunk_size):
+    """Pay the next chunk of unsettled participants. Returns (count, paid)."""
+    refund = winning_pool <= 0
+    kind = WalletLedgerEntry.REFUND if refund else WalletLedgerEntry.PAYOUT
+
+    with transaction.atomic():
+        rows = list(
+            BetParticipant.objects.select_for_update()
+            .filter(bet_id=bet.pk, settled_at__isnull=True)
+            .order_by("id")
+            .values_list("id", "user_id", "stake", "chosen_option_id")[:chunk_size]
+        )
+        if not rows:
+            return 0, Decimal("0")
+
+        payouts = {}
+        for participant_id, user_id, stake, option_id in rows:
+            if refund or option_id == bet.winner_option_id:
+                payouts[participant_id] = (user_id, payout_for(stake, total_pool, winning_pool))
+
+        WalletLedgerEntry.objects.bulk_create([
+            WalletLedgerEntry(
+                user_id=user_id,
+                amount=amount,
+                kind=kind,
+                reference=f"{kind}:{participant_id}",
+            )
+            for participant_id, (user_id, amount) in payouts.items()
+            if amount > 0
+        ])
+
+        money = DecimalField(max_digits=12, decimal_places=2)
+        if payouts:
+            # (bet, user) is unique, so each user appears at most once per chunk.
+            Wallet.objects.filter(user_id__in=[user_id for user_id, _ in payouts.values()]).update(
+                balance=F("balance") + Case(
+                    *[When(user_id=user_id, then=Value(amount)) for user_id, amount in payouts.values()],
+                    default=Value(Decimal("0")),
+                    output_field=money,
+                )
+            )
+
+        BetParticipant.objects.filter(id__in=[row[0] for row in rows]).update(
+            settled_at=timezone.now(),
+            payout=Case(
+                *[When(id=participant_id, then=Value(amount)) for participant_id, (_, amount) in payouts.items()],
+                default=Value(Decimal("0")),
+                output_field=money,
+            ),
+        )
+
+        if not refund:
+            stats.record_settlements(
+                (user_id, stake, payouts[participant_id][1] if participant_id in payouts else Decimal("0"),
+                 option_id == bet.winner_option_id)
+                for participant_id, user_id, stake, option_id in rows
+            )
+
+    return len(rows), sum((amount for _, amount in payouts.values()), Decimal("0"))
+
+
+def settle_bet(bet_id, chunk_size=CHUNK_SIZE):
+    """
+    Pay out every unsettled participant of a resolved bet.
+
+    Safe to call again after a crash or concurrently with itself: each chunk
+    commits on its own and already-settled participants are skipped.
+    """
+    bet = Bet.objects.only("id", "is_resolved", "winner_option_id", "settled_at").get(pk=bet_id)
+    if not bet.is_resolved:
+        raise SettlementError(f"Bet {bet_id} is not resolved.")
+    if bet.settled_at is not None:
+        return SettlementResult(bet_id, 0, Decimal("0"))
+
+    total_pool, winning_pool = _pools(bet)
+    settled, paid = 0, Decimal("0")
+    while True:
+        count, amount = _settle_chunk(bet, total_pool, winning_pool, chunk_size)
+        if not count:
+            break
+        settled += count
+        paid += amount
+
+    Bet.objects.filter(pk=bet_id, settled_at__isnull=True).update(settled_at=timezone.now())
+    notify_bet_changed(bet_id)
+    logger.info("Settled bet %s: %s participants, %s paid", bet_id, settled, paid)
+    return SettlementResult(bet_id, settled, paid)
+
+
+def unsettled_bets():
+    return Bet.objects.filter(is_resolved=True, settled_at__isnull=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide worker that runs background settlements one at a time."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="settlement")
+    return _executor
+
+
+def _settle_logged(bet_id):
+    close_old_connections()
+    try:
+        settle_bet(bet_id)
+    except Exception as e:
+        logger.error(
+            "Settlement of bet %s failed; manage.py settle_bets will resume it: %s", bet_id, e,
+            exc_info=True, extra={"bet_id": bet_id},
+        )
+    finally:
+        close_old_connections()
+
+
+def settle_in_background(bet_id):
+    """Settle the bet on the background worker once the current transaction commits."""
+    transaction.on_commit(lambda: get_executor().submit(_settle_logged, bet_id))
@@ -0,0 +1,31 @@
+from functools import partial
+
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent by the expiry scheduler after a batch of bets was closed.
+# Arguments: bet_ids (list of closed bet ids), closed_at (datetime).
+bets_expired = Signal()
+
+# Sent after a transaction that created, changed or deleted a bet (or its
+# options, participants or payouts) has committed.
+# Arguments: bet_id, created (bool), deleted (bool), status_changed (bool),
+# participant_id (user id of a new participant, or None).
+bet_changed = Signal()
+
+
+def notify_bet_changed(bet_id, created=False, deleted=False, status_changed=False, participant_id=None):
+    """Send ``bet_changed`` once the current transaction commits (or now, outside one)."""
+    from .models import Bet
+
+    transaction.on_commit(
+        partial(
+            bet_changed.send,
+            sender=Bet,
+            bet_id=bet_id,
+            created=created,
+            deleted=deleted,
+            status_changed=status_changed,
+            participant_id=participant_id,
+        )
+    )
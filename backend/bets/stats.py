@@ -0,0 +1,199 @@
+"""
+Per-user betting statistics and leaderboards.
+
+``UserStats`` holds each user's all-time totals (stakes, volume, settled
+and won stakes, win rate, net profit) and ``UserStatsDaily`` the same
+deltas bucketed by day. Both are bumped with F() expressions in the
+transaction that places a stake (``record_stakes``) or settles a chunk of
+participants (``record_settlements``): two UPDATEs and two
+conflict-ignoring INSERTs per call, whatever the batch size. Refunded
+stakes (nobody backed the winner) count as volume only.
+
+All-time leaderboards walk one index per metric (``-metric, user``) and
+stop after ``limit`` rows. The rank of a user is a COUNT of the index
+entries ahead of theirs: an index range scan, so it costs O(rank) and
+O(users) for the last place, not the O(log n) of a tree with subtree
+counts (B-tree indexes keep none). Rolling windows sum the daily buckets of the
+window, so their cost grows with the users active in it, not with the
+number of stakes. ``rebuild`` recomputes everything from
+``BetParticipant``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import BetParticipant, UserStats, UserStatsDaily
+
+NET_PROFIT = "net_profit"
+WIN_RATE = "win_rate"
+VOLUME = "volume"
+METRICS = (NET_PROFIT, WIN_RATE, VOLUME)
+
+# Days summed by each rolling window; None is all time.
+WINDOWS = {"all_time": None, "day": 1, "week": 7, "month": 30}
+
+# A 1-for-1 record is not a 100% win rate worth ranking.
+MIN_SETTLED_FOR_WIN_RATE = 5
+MAX_LEADERBOARD_SIZE = 100
+CENT = Decimal("0.01")
+
+COUNTERS = ("bets", "volume", "settled", "won", "net_profit")
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+_FIELD_TYPES = {"bets": IntegerField(), "settled": IntegerField(), "won": IntegerField(), "volume": _MONEY, "net_profit": _MONEY}
+
+
+def _delta(field, deltas):
+    zero = Decimal("0") if isinstance(_FIELD_TYPES[field], DecimalField) else 0
+    return Case(
+        *[When(user_id=user_id, then=Value(counters[field])) for user_id, counters in deltas.items()],
+        default=Value(zero),
+        output_field=_FIELD_TYPES[field],
+    )
+
+
+def _apply(deltas, day):
+    """Add ``{user_id: {counter: delta}}`` to the users' totals and to their bucket for ``day``."""
+    if not deltas:
+        return
+    fields = sorted({field for counters in deltas.values() for field in counters})
+    for counters in deltas.values():
+        for field in fields:
+            counters.setdefault(field, 0)
+
+    UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in deltas], ignore_conflicts=True)
+    UserStatsDaily.objects.bulk_create(
+        [UserStatsDaily(user_id=user_id, day=day) for user_id in deltas], ignore_conflicts=True
+    )
+
+    updates = {field: F(field) + _delta(field, deltas) for field in fields}
+    UserStatsDaily.objects.filter(day=day, user_id__in=list(deltas)).update(**updates)
+    if "settled" in fields:
+        # SET expressions read the values from before the UPDATE.
+        updates[WIN_RATE] = (
+            Cast(F("won") + _delta("won", deltas), FloatField())
+            / Cast(F("settled") + _delta("settled", deltas), FloatField())
+        )
+    UserStats.objects.filter(user_id__in=list(deltas)).update(**updates)
+
+
+def record_stakes(stakes):
+    """Count ``(user_id, stake)`` pairs as placed today. Call inside the staking transaction."""
+    deltas = defaultdict(lambda: {"bets": 0, "volume": Decimal("0")})
+    for user_id, stake in stakes:
+        deltas[user_id]["bets"] += 1
+        deltas[user_id]["volume"] += stake
+    _apply(deltas, timezone.localdate())
+
+
+def record_settlements(settlements):
+    """
+    Count ``(user_id, stake, payout, won)`` results as settled today. Call
+    inside the settling transaction; refunds are left out by the caller.
+    """
+    deltas = defaultdict(lambda: {"settled": 0, "won": 0, "net_profit": Decimal("0")})
+    for user_id, stake, payout, won in settlements:
+        deltas[user_id]["settled"] += 1
+        deltas[user_id]["won"] += int(won)
+        deltas[user_id]["net_profit"] += payout - stake
+    _apply(deltas, timezone.localdate())
+
+
+def _board(metric, window):
+    """``values()`` rows of the users on a leaderboard, in leaderboard order."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown leaderboard metric {metric!r}.")
+    days = WINDOWS[window]
+    if days is None:
+        rows = UserStats.objects.values("user_id", *COUNTERS, WIN_RATE)
+    else:
+        since = timezone.localdate() - timedelta(days=days - 1)
+        # Annotations may not shadow the bucket's columns, hence the prefix.
+        rows = (
+            UserStatsDaily.objects.filter(day__gte=since)
+            .values("user_id")
+            .annotate(**{f"total_{field}": Sum(field) for field in COUNTERS})
+            .annotate(total_win_rate=Case(
+                When(total_settled__gt=0, then=Cast("total_won", FloatField()) / Cast("total_settled", FloatField())),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ))
+        )
+    prefix = "" if days is None else "total_"
+    if metric == WIN_RATE:
+        rows = rows.filter(**{f"{prefix}settled__gte": MIN_SETTLED_FOR_WIN_RATE})
+    return rows.order_by(f"-{prefix}{metric}", "user_id"), prefix
+
+
+def _entry(row, prefix, rank):
+    entry = {field: row[prefix + field] for field in (*COUNTERS, WIN_RATE)}
+    # Sums over the daily buckets come back unscaled on some backends.
+    for field in ("volume", "net_profit"):
+        entry[field] = Decimal(entry[field]).quantize(CENT)
+    entry.update(user_id=row["user_id"], rank=rank)
+    return entry
+
+
+def leaderboard(metric=NET_PROFIT, window="all_time", limit=20):
+    """The top ``limit`` users by ``metric`` over ``window``, with their rank."""
+    rows, prefix = _board(metric, window)
+    limit = max(0, min(limit, MAX_LEADERBOARD_SIZE))
+    return [_entry(row, prefix, rank) for rank, row in enumerate(rows[:limit], start=1)]
+
+
+def rank(user_id, metric=NET_PROFIT, window="all_time"):
+    """
+    The leaderboard entry of ``user_id``, or None when they are not on it.
+    Counting the users ahead costs O(rank) (see the module docstring).
+    """
+    rows, prefix = _board(metric, window)
+    row = rows.filter(user_id=user_id).first()
+    if row is None:
+        return None
+    column = prefix + metric
+    value = row[column]
+    ahead = rows.filter(Q(**{f"{column}__gt": value}) | Q(**{column: value, "user_id__lt": user_id})).count()
+    return _entry(row, prefix, ahead + 1)
+
+
+def rebuild():
+    """Recompute every user's stats and daily buckets from ``BetParticipant``."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    daily = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    participants = BetParticipant.objects.values_list(
+        "user_id", "stake", "joined_at", "settled_at", "payout", "chosen_option_id", "bet__winner_option_id",
+    )
+    for user_id, stake, joined_at, settled_at, payout, option_id, winner_id in participants.iterator(chunk_size=2000):
+        joined = (user_id, timezone.localdate(joined_at))
+        for counters in (totals[user_id], daily[joined]):
+            counters["bets"] += 1
+            counters["volume"] += stake
+        won = option_id == winner_id
+        # Losers are paid 0; anything else off the winning option was a refund.
+        if settled_at is None or payout is None or (not won and payout):
+            continue
+        settled = (user_id, timezone.localdate(settled_at))
+        for counters in (totals[user_id], daily[settled]):
+            counters["settled"] += 1
+            counters["won"] += int(won)
+            counters["net_profit"] += payout - stake
+
+    with transaction.atomic():
+        UserStatsDaily.objects.all().delete()
+        UserStats.objects.all().delete()
+        UserStats.objects.bulk_create(
+            [
+                UserStats(user_id=user_id, win_rate=c["won"] / c["settled"] if c["settled"] else 0, **c)
+                for user_id, c in totals.items()
+            ],
+            batch_size=1000,
+        )
+        UserStatsDaily.objects.bulk_create(
+            [UserStatsDaily(user_id=user_id, day=day, **c) for (user_id, day), c in daily.items()],
+            batch_size=1000,
+        )
+    return len(totals), len(daily)
@@ -0,0 +1,155 @@
+"""
+Coalesced real-time updates of bets for GraphQL subscriptions.
+
+Signal receivers ``mark`` a bet with what happened to it (a participant
+joined, its status changed, it expired ...). Marks are collected for
+``COALESCE_WINDOW`` seconds and then published as one snapshot per bet,
+read for all marked bets in two queries, to the ``bet:<id>`` topic of
+``core.pubsub``. A hot bet with hundreds of joins per second therefore
+pushes a few updates per second, whatever the number of subscribers.
+
+Expiry needs no mark: the scheduler closes bets in its own process, which
+the in-memory pubsub does not reach, so each ``betUpdates`` subscription
+times its bet's expiry itself (``seconds_until_expiry``) and then pushes a
+fresh snapshot.
+
+Configured by ``settings.BETS_SUBSCRIPTIONS``::
+
+    BETS_SUBSCRIPTIONS = {"COALESCE_WINDOW": 0.25}
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from core.pubsub import get_pubsub
+from .aggregates import odds
+from .models import Bet, BetOption
+
+DEFAULT_SETTINGS = {"COALESCE_WINDOW": 0.25}
+
+# What happened to a bet since the last update.
+JOINED = "joined"
+UPDATED = "updated"
+STATUS_CHANGED = "status_changed"
+EXPIRED = "expired"
+DELETED = "deleted"
+
+
+def bet_topic(bet_id):
+    return f"bet:{bet_id}"
+
+
+def _status(bet):
+    # Same vocabulary as the BetStatus enum of the GraphQL schema.
+    if bet["status"] == Bet.RESOLVED:
+        return "resolved"
+    if bet["status"] == Bet.CLOSED or bet["expires_at"] <= timezone.now():
+        return "expired"
+    return "open"
+
+
+def load_snapshots(bet_ids):
+    """Return ``{bet_id: snapshot}`` of the pool state of existing bets, in two queries."""
+    options = defaultdict(list)
+    for option in (
+        BetOption.objects.filter(bet_id__in=bet_ids)
+        .order_by("pk")
+        .values("id", "bet_id", "total_staked", "participant_count")
+    ):
+        options[option["bet_id"]].append(option)
+
+    snapshots = {}
+    for bet in Bet.objects.filter(pk__in=bet_ids).values(
+        "id", "status", "expires_at", "total_staked", "participant_count", "winner_option_id"
+    ):
+        # Decimals as strings so the snapshot can go through a message broker.
+        snapshots[bet["id"]] = {
+            "bet_id": bet["id"],
+            "status": _status(bet),
+            "total_staked": str(bet["total_staked"]),
+            "participant_count": bet["participant_count"],
+            "winner_option_id": bet["winner_option_id"],
+            "expires_at": bet["expires_at"].isoformat(),
+            "options": [
+                {
+                    "id": option["id"],
+                    "total_staked": str(option["total_staked"]),
+                    "participant_count": option["participant_count"],
+                    "odds": _str_or_none(odds(option["total_staked"], bet["total_staked"])),
+                }
+                for option in options[bet["id"]]
+            ],
+            "events": [],
+        }
+    return snapshots
+
+
+def seconds_until_expiry(snapshot):
+    """Seconds until the bet of an open ``snapshot`` expires, or None if it is not open."""
+    if snapshot["status"] != "open":
+        return None
+    expires_at = datetime.fromisoformat(snapshot["expires_at"])
+    return max((expires_at - timezone.now()).total_seconds(), 0)
+
+
+def _str_or_none(value):
+    return None if value is None else str(value)
+
+
+class BetUpdateCoalescer:
+    def __init__(self, window):
+        self.window = window
+        self._pending = defaultdict(set)
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def mark(self, bet_id, event):
+        """Record ``event`` for ``bet_id`` and make sure a flush is scheduled."""
+        if not get_pubsub().has_subscribers(bet_topic(bet_id)):
+            return
+        with self._lock:
+            self._pending[bet_id].add(event)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(set)
+            self._timer = None
+        if not pending:
+            return
+
+        try:
+            snapshots = load_snapshots(list(pending))
+        finally:
+            # Runs on a short-lived timer thread: don't leak its connection.
+            connections.close_all()
+
+        pubsub = get_pubsub()
+        for bet_id, events in pending.items():
+            snapshot = snapshots.get(bet_id)
+            if snapshot is None:
+                snapshot = {"bet_id": bet_id, "status": None, "options": []}
+                events = events | {DELETED}
+            snapshot["events"] = sorted(events)
+            pubsub.publish(bet_topic(bet_id), snapshot)
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                config = {**DEFAULT_SETTINGS, **getattr(settings, "BETS_SUBSCRIPTIONS", {})}
+                _coalescer = BetUpdateCoalescer(config["COALESCE_WINDOW"])
+    return _coalescer
@@ -1,3 +1,616 @@
-from django.test import TestCase
+import asyncio
+import base64
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User, Wallet, WalletLedgerEntry
+from accounts.wallet import credit, debit, unreconciled_wallets
+from core import response_cache
+from core.schema import schema
+from core.views import AsyncGraphQLView
+from .bulk import create_bets, place_stakes, replace_options
+from . import stats
+from .models import Bet, BetOption, BetParticipant, UserStats, UserStatsDaily
+from .schema.loaders import BetLoaders
+from .schema.subscriptions import Subscription
+from .settlement import SettlementError, settle_bet, unsettled_bets
+
+# Keep signal-driven cache writes out of the shared cache.
+LOCAL_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def make_user(phone, balance=Decimal("100.00")):
+    user = User.objects.create(phone=phone, first_name="Test", last_name="User")
+    Wallet.objects.create(user=user)
+    credit(user.pk, balance, WalletLedgerEntry.DEPOSIT, reference=f"deposit:{user.pk}")
+    return user
+
+
+def make_bet(creator, judge, options=("Yes", "No", "Maybe")):
+    bet = Bet.objects.create(
+        creator=creator,
+        judge=judge,
+        title="Will it rain?",
+        description="Tomorrow, downtown.",
+        expires_at=timezone.now() + timedelta(days=1),
+    )
+    return bet, [BetOption.objects.create(bet=bet, text=text) for text in options]
+
+
+def join(user, bet, option, amount):
+    """Stake ``amount`` on ``option`` the way Bet_Participant_Create does."""
+    with transaction.atomic():
+        debit(user.pk, amount, WalletLedgerEntry.STAKE, reference=f"stake:{bet.pk}:{user.pk}")
+        return BetParticipant.objects.create(user=user, bet=bet, chosen_option=option, stake=Decimal(amount))
+
+
+def stake(user, bet, option, amount):
+    return {"user_id": user.pk, "bet_id": bet.pk, "bet_option_id": option.pk, "stake": amount}
+
+
+def balance(user):
+    return Wallet.objects.get(user=user).balance
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SettlementTests(TestCase):
+    def setUp(self):
+        creator = make_user("+15550000001")
+        self.judge = make_user("+15550000002")
+        self.alice = make_user("+15550000003")
+        self.bob = make_user("+15550000004")
+        self.carol = make_user("+15550000005")
+        self.bet, (self.yes, self.no, self.maybe) = make_bet(creator, self.judge)
+        join(self.alice, self.bet, self.yes, "10")
+        join(self.bob, self.bet, self.yes, "20")
+        join(self.carol, self.bet, self.no, "7")
+
+    def payouts(self):
+        return dict(BetParticipant.objects.filter(bet=self.bet).values_list("user_id", "payout"))
+
+    def test_winners_share_the_pool_rounded_down(self):
+        self.bet.resolve(self.yes)
+
+        result = settle_bet(self.bet.pk)
+
+        # Pool 37, winning pool 30: stake * 37 / 30, rounded down to the cent.
+        self.assertEqual(self.payouts(), {
+            self.alice.pk: Decimal("12.33"),
+            self.bob.pk: Decimal("24.66"),
+            self.carol.pk: Decimal("0.00"),
+        })
+        self.assertEqual(result.paid, Decimal("36.99"))
+        self.assertLessEqual(result.paid, Decimal("37"))
+        self.assertEqual(balance(self.alice), Decimal("102.33"))
+        self.assertEqual(balance(self.carol), Decimal("93.00"))
+        self.assertFalse(unreconciled_wallets().exists())
+
+    def test_rerun_pays_nobody_twice(self):
+        self.bet.resolve(self.yes)
+        settle_bet(self.bet.pk)
+        balances = {user.pk: balance(user) for user in (self.alice, self.bob, self.carol)}
+
+        self.assertEqual(settle_bet(self.bet.pk).settled, 0)
+        # As after a crash between the last chunk and marking the bet settled.
+        Bet.objects.filter(pk=self.bet.pk).update(settled_at=None)
+        rerun = settle_bet(self.bet.pk)
+
+        self.assertEqual((rerun.settled, rerun.paid), (0, Decimal("0")))
+        self.assertEqual({user.pk: balance(user) for user in (self.alice, self.bob, self.carol)}, balances)
+        paid = WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.PAYOUT).aggregate(total=Sum("amount"))
+        self.assertLessEqual(paid["total"], Decimal("37"))
+        self.assertEqual(WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.PAYOUT).count(), 2)
+
+    def test_resumes_an_interrupted_run_in_chunks(self):
+        self.bet.resolve(self.yes)
+
+        result = settle_bet(self.bet.pk, chunk_size=1)
+
+        self.assertEqual(result.settled, 3)
+        self.assertEqual(result.paid, Decimal("36.99"))
+        self.assertFalse(BetParticipant.objects.filter(bet=self.bet, settled_at__isnull=True).exists())
+
+    def test_refunds_everyone_when_nobody_backed_the_winner(self):
+        self.bet.resolve(self.maybe)
+
+        result = settle_bet(self.bet.pk)
+
+        self.assertEqual(result.paid, Decimal("37"))
+        self.assertEqual(self.payouts(), {
+            self.alice.pk: Decimal("10.00"),
+            self.bob.pk: Decimal("20.00"),
+            self.carol.pk: Decimal("7.00"),
+        })
+        for user in (self.alice, self.bob, self.carol):
+            self.assertEqual(balance(user), Decimal("100.00"))
+        self.assertEqual(WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.REFUND).count(), 3)
+        self.assertFalse(WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.PAYOUT).exists())
+
+    def test_unresolved_bet_is_not_settled(self):
+        with self.assertRaises(SettlementError):
+            settle_bet(self.bet.pk)
+        self.assertFalse(BetParticipant.objects.filter(settled_at__isnull=False).exists())
+
+    RESOLVE = """
+        mutation($judgeId: ID!, $betId: ID!, $optionId: ID!) {
+            Bet_Resolve(judgeId: $judgeId, betId: $betId, winningOptionId: $optionId) { success message }
+        }
+    """
+
+    def resolve_via_api(self, option):
+        # Run the background worker inline so the test sees its writes.
+        inline = mock.Mock(submit=lambda fn, *args: fn(*args))
+        with mock.patch("bets.settlement.get_executor", return_value=inline):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                response = self.client.post("/graphql/", {
+                    "query": self.RESOLVE,
+                    "variables": {"judgeId": self.judge.pk, "betId": self.bet.pk, "optionId": option.pk},
+                }, content_type="application/json")
+        return response.json()["data"]["Bet_Resolve"], callbacks
+
+    def test_resolution_settles_after_commit(self):
+        with mock.patch("bets.settlement.settle_bet", wraps=settle_bet) as settle:
+            result, callbacks = self.resolve_via_api(self.yes)
+
+        self.assertTrue(result["success"])
+        self.assertTrue(callbacks)
+        settle.assert_called_once_with(self.bet.pk)
+        self.assertEqual(balance(self.bob), Decimal("104.66"))
+        self.assertIsNotNone(Bet.objects.get(pk=self.bet.pk).settled_at)
+
+    def test_failed_settlement_is_left_for_settle_bets(self):
+        with mock.patch("bets.settlement._settle_chunk", side_effect=RuntimeError("connection lost")):
+            with self.assertLogs("django", "ERROR"):
+                result, _ = self.resolve_via_api(self.yes)
+
+        self.assertTrue(result["success"])
+        self.assertTrue(Bet.objects.get(pk=self.bet.pk).is_resolved)
+        self.assertEqual(list(unsettled_bets()), [self.bet])
+
+        call_command("settle_bets", stdout=StringIO())
+
+        self.assertFalse(unsettled_bets().exists())
+        self.assertEqual(balance(self.bob), Decimal("104.66"))
+
+
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CacheInvalidationTests(TestCase):
+    BET = "query($id: ID!) { betGet(id: $id) { title status participants { stake } } }"
+    FEED = "{ allBets(first: 10) { edges { node { id } } } }"
+
+    def setUp(self):
+        caches["default"].clear()
+        # Store responses even though their tags were first bumped moments ago.
+        skew = mock.patch("core.response_cache.CLOCK_SKEW", -60)
+        skew.start()
+        self.addCleanup(skew.stop)
+        self.creator = make_user("+15550000001")
+        self.judge = make_user("+15550000002")
+        self.alice = make_user("+15550000003")
+        self.bet, (self.yes, _, _) = make_bet(self.creator, self.judge)
+
+    def graphql(self, query, **variables):
+        # Commit hooks (signals, invalidation, settlement) run as they would
+        # after a real commit; settlement runs inline.
+        inline = mock.Mock(submit=lambda fn, *args: fn(*args))
+        with mock.patch("bets.settlement.get_executor", return_value=inline):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/graphql/", {"query": query, "variables": variables}, content_type="application/json",
+                )
+        result = response.json()
+        self.assertNotIn("errors", result)
+        return result["data"]
+
+    def bet_get(self):
+        return self.graphql(self.BET, id=self.bet.pk)["betGet"]
+
+    def test_create_shows_in_the_feed(self):
+        before = self.graphql(self.FEED)["allBets"]["edges"]
+
+        created = self.graphql("""
+            mutation($creatorId: ID!, $judgeId: ID!, $expiresAt: String!) {
+                Bet_Create(creatorId: $creatorId, judgeId: $judgeId, title: "New", description: "Bet",
+                           options: ["A", "B"], expiresAt: $expiresAt) { success bet { id } }
+            }
+        """, creatorId=self.creator.pk, judgeId=self.judge.pk,
+            expiresAt=(timezone.now() + timedelta(days=1)).isoformat())["Bet_Create"]
+
+        self.assertTrue(created["success"])
+        after = self.graphql(self.FEED)["allBets"]["edges"]
+        self.assertEqual(len(after), len(before) + 1)
+        self.assertEqual(after[0]["node"]["id"], created["bet"]["id"])
+
+    def test_update_retires_the_cached_bet(self):
+        self.assertEqual(self.bet_get()["title"], "Will it rain?")
+
+        self.graphql(
+            'mutation($betId: ID!) { Bet_Update(betId: $betId, title: "Will it snow?") { success } }',
+            betId=self.bet.pk,
+        )
+
+        self.assertEqual(self.bet_get()["title"], "Will it snow?")
+
+    def test_participation_retires_the_cached_bet(self):
+        self.assertEqual(self.bet_get()["participants"], [])
+
+        self.graphql("""
+            mutation($userId: ID!, $betId: ID!, $optionId: ID!) {
+                Bet_Participant_Create(userId: $userId, betId: $betId, betOptionId: $optionId, stake: "5") { success }
+            }
+        """, userId=self.alice.pk, betId=self.bet.pk, optionId=self.yes.pk)
+
+        self.assertEqual(len(self.bet_get()["participants"]), 1)
+
+    def test_resolution_retires_the_cached_bet(self):
+        self.assertEqual(self.bet_get()["status"], "OPEN")
+
+        self.graphql("""
+            mutation($judgeId: ID!, $betId: ID!, $optionId: ID!) {
+                Bet_Resolve(judgeId: $judgeId, betId: $betId, winningOptionId: $optionId) { success }
+            }
+        """, judgeId=self.judge.pk, betId=self.bet.pk, optionId=self.yes.pk)
+
+        self.assertEqual(self.bet_get()["status"], "RESOLVED")
+
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ResponseCacheTests(TestCase):
+    QUERY = "query($id: ID!) { betGet(id: $id) { title } }"
+
+    def setUp(self):
+        caches["default"].clear()
+        self.bet, _ = make_bet(make_user("+15550000001"), make_user("+15550000002"))
+        # Tags last bumped a minute ago, so fresh responses may be stored.
+        with mock.patch("core.response_cache.time.time", return_value=time.time() - 60):
+            response_cache.invalidate(response_cache.bet_tag(self.bet.pk))
+
+    def fetch(self):
+        response = self.client.post(
+            "/graphql/", {"query": self.QUERY, "variables": {"id": self.bet.pk}}, content_type="application/json",
+        )
+        return response["X-Cache"]
+
+    def test_response_is_served_from_the_cache(self):
+        self.assertEqual([self.fetch(), self.fetch()], ["MISS", "HIT"])
+
+    def test_response_is_not_stored_when_its_bet_changes_mid_execution(self):
+        seen_bets = BetLoaders.seen_bets
+
+        def seen_then_changed(loaders, bets):
+            # As if a mutation on the bet committed while the query ran.
+            seen_bets(loaders, bets)
+            response_cache.invalidate(response_cache.bet_tag(self.bet.pk))
+
+        with mock.patch.object(BetLoaders, "seen_bets", seen_then_changed):
+            self.assertEqual(self.fetch(), "MISS")
+
+        self.assertEqual(self.fetch(), "MISS")
+
+    async def test_async_view_uses_the_async_cache_calls(self):
+        view = AsyncGraphQLView.as_view(schema=schema)
+        blocking = AssertionError("blocking cache call on the event loop")
+
+        async def fetch():
+            request = AsyncRequestFactory().post(
+                "/graphql/", {"query": self.QUERY, "variables": {"id": self.bet.pk}},
+                content_type="application/json",
+            )
+            request.auser = mock.AsyncMock(return_value=AnonymousUser())
+            return (await view(request))["X-Cache"]
+
+        with mock.patch("core.response_cache.lookup", side_effect=blocking), \
+                mock.patch("core.response_cache.store", side_effect=blocking):
+            self.assertEqual([await fetch(), await fetch()], ["MISS", "HIT"])
+
+
+
+class BetUpdatesTests(TestCase):
+    async def test_subscriber_sees_the_expiry_without_the_scheduler(self):
+        bet = await sync_to_async(self.make_bet)(timezone.now() + timedelta(seconds=0.2))
+        updates = Subscription.subscribe_bet_updates(None, None, bet.pk)
+        try:
+            first = await anext(updates)
+            expired = await asyncio.wait_for(anext(updates), 5)
+        finally:
+            await updates.aclose()
+
+        self.assertEqual((first["status"], first["events"]), ("open", []))
+        self.assertEqual((expired["status"], expired["events"]), ("expired", ["expired"]))
+
+    @staticmethod
+    def make_bet(expires_at):
+        bet, _ = make_bet(make_user("+15550000001"), make_user("+15550000002"))
+        Bet.objects.filter(pk=bet.pk).update(expires_at=expires_at)
+        return bet
+
+
+class LoaderTests(TestCase):
+    def test_clear_forgets_attached_rows(self):
+        creator = make_user("+15550000001")
+        bet, _ = make_bet(creator, make_user("+15550000002"))
+        bet = Bet.objects.select_related("creator").get(pk=bet.pk)
+        loaders = BetLoaders()
+
+        loaders.seen_bets([bet])
+        self.assertIs(loaders.users.get_cached(creator.pk), bet.creator)
+        loaders.clear()
+        self.assertIsNone(loaders.users.get_cached(creator.pk))
+        loaders.seen_bets([bet])
+
+        self.assertIs(loaders.users.get_cached(creator.pk), bet.creator)
+
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BulkCreateTests(TestCase):
+    def test_non_string_expiries_fail_per_item(self):
+        creator, judge = make_user("+15550000001"), make_user("+15550000002")
+        expiries = [1767225600, 12.5, ["x"], "tomorrow", timezone.now() + timedelta(days=1)]
+
+        results = create_bets([
+            {"creator_id": creator.pk, "judge_id": judge.pk, "title": "Rain?", "description": "Downtown.",
+             "options": ["Yes", "No"], "expires_at": expires_at}
+            for expires_at in expiries
+        ])
+
+        invalid = "Invalid datetime format. Use ISO 8601 format like '2025-04-25T15:30:00Z'."
+        self.assertEqual([(r.success, r.message) for r in results], [(False, invalid)] * 4 + [(True, None)])
+        self.assertEqual(Bet.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BulkStakeTests(TestCase):
+    def setUp(self):
+        creator = make_user("+15550000001")
+        self.judge = make_user("+15550000002")
+        self.alice = make_user("+15550000003")
+        self.bob = make_user("+15550000004", balance=Decimal("5.00"))
+        self.bet, (self.yes, self.no, self.maybe) = make_bet(creator, self.judge)
+
+    def race(self, action):
+        """Run ``action`` as a concurrent transaction committing just before the batch's own begins."""
+        real_atomic = transaction.atomic
+        pending = [action]
+
+        def atomic(*args, **kwargs):
+            while pending:
+                pending.pop()()
+            return real_atomic(*args, **kwargs)
+
+        return mock.patch("bets.bulk.transaction.atomic", side_effect=atomic)
+
+    def test_items_fail_independently(self):
+        results = place_stakes([
+            stake(self.alice, self.bet, self.yes, "10"),
+            stake(self.bob, self.bet, self.no, "6"),
+            stake(self.judge, self.bet, self.no, "1"),
+            stake(self.alice, self.bet, self.no, "1"),
+        ])
+
+        self.assertEqual([(r.success, r.message) for r in results], [
+            (True, None),
+            (False, "Insufficient wallet balance."),
+            (False, "The judge cannot participate in the bet."),
+            (False, "User has already participated in this bet."),
+        ])
+        self.assertEqual(balance(self.alice), Decimal("90.00"))
+        self.assertEqual(balance(self.bob), Decimal("5.00"))
+        self.assertFalse(unreconciled_wallets().exists())
+
+    def test_stake_racing_a_resolution_is_rejected(self):
+        with self.race(lambda: Bet.objects.get(pk=self.bet.pk).resolve(self.yes)):
+            [result] = place_stakes([stake(self.alice, self.bet, self.yes, "10")])
+
+        self.assertEqual((result.success, result.message), (False, "This bet has already been resolved."))
+        self.assertFalse(BetParticipant.objects.filter(bet=self.bet).exists())
+        self.assertEqual(balance(self.alice), Decimal("100.00"))
+
+        settle_bet(self.bet.pk)
+        self.assertEqual(balance(self.alice), Decimal("100.00"))
+        self.assertFalse(unreconciled_wallets().exists())
+
+    def test_stake_racing_an_expiry_is_rejected(self):
+        with self.race(lambda: Bet.objects.filter(pk=self.bet.pk).update(status=Bet.CLOSED)):
+            [result] = place_stakes([stake(self.alice, self.bet, self.yes, "10")])
+
+        self.assertEqual((result.success, result.message), (False, "This bet has expired."))
+        self.assertEqual(balance(self.alice), Decimal("100.00"))
+
+    def test_stake_on_an_option_removed_meanwhile_fails_alone(self):
+        with self.race(lambda: replace_options(self.bet.pk, ["Yes", "No"])):
+            results = place_stakes([
+                stake(self.alice, self.bet, self.maybe, "10"),
+                stake(self.bob, self.bet, self.yes, "5"),
+            ])
+
+        self.assertEqual([(r.success, r.message) for r in results], [
+            (False, "BetOption not found."),
+            (True, None),
+        ])
+        self.assertEqual(balance(self.alice), Decimal("100.00"))
+
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class StatsTests(TestCase):
+    def setUp(self):
+        creator, judge = make_user("+15550000001"), make_user("+15550000002")
+        self.alice, self.bob, self.carol, self.dave, self.erin = (
+            make_user(f"+1555000001{i}") for i in range(5)
+        )
+        won, (yes, no, _) = make_bet(creator, judge)
+        refunded, (_, no_one, maybe) = make_bet(creator, judge)
+        lost, (heads, tails) = make_bet(creator, judge, options=("Heads", "Tails"))
+        results = place_stakes([
+            stake(self.alice, won, yes, "10"),
+            stake(self.bob, won, yes, "20"),
+            stake(self.carol, won, no, "7"),
+            stake(self.alice, refunded, no_one, "5"),
+            stake(self.dave, refunded, no_one, "5"),
+            stake(self.erin, lost, tails, "7"),
+            stake(self.bob, lost, heads, "3"),
+        ])
+        self.assertTrue(all(result.success for result in results))
+        for bet, winner in ((won, yes), (refunded, maybe), (lost, heads)):
+            bet.resolve(winner)
+            settle_bet(bet.pk)
+
+    def snapshot(self):
+        return {
+            "totals": list(UserStats.objects.order_by("user_id").values()),
+            "daily": list(UserStatsDaily.objects.order_by("user_id", "day").values(
+                "user_id", "day", *stats.COUNTERS,
+            )),
+            "boards": {
+                (metric, window): stats.leaderboard(metric, window)
+                for metric in stats.METRICS for window in stats.WINDOWS
+            },
+            "ranks": {
+                (user.pk, metric, window): stats.rank(user.pk, metric, window)
+                for user in (self.alice, self.bob, self.carol, self.dave, self.erin)
+                for metric in stats.METRICS for window in stats.WINDOWS
+            },
+        }
+
+    def test_incremental_stats_match_a_rebuild(self):
+        incremental = self.snapshot()
+
+        stats.rebuild()
+
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_refunds_are_neither_wins_nor_losses(self):
+        dave = UserStats.objects.get(user=self.dave)
+        alice = UserStats.objects.get(user=self.alice)
+
+        self.assertEqual((dave.bets, dave.volume, dave.settled, dave.won, dave.net_profit), (1, 5, 0, 0, 0))
+        self.assertEqual((alice.bets, alice.volume, alice.settled, alice.won), (2, 15, 1, 1))
+        self.assertEqual(alice.net_profit, Decimal("2.33"))
+
+    def test_ties_rank_by_user_id(self):
+        # Bob 24.66 - 20 + 10 - 3, Alice 2.33, Dave 0, Carol and Erin -7 each.
+        board = [(entry["user_id"], entry["net_profit"]) for entry in stats.leaderboard(window="day")]
+
+        self.assertEqual(board, [
+            (self.bob.pk, Decimal("11.66")),
+            (self.alice.pk, Decimal("2.33")),
+            (self.dave.pk, Decimal("0.00")),
+            (self.carol.pk, Decimal("-7.00")),
+            (self.erin.pk, Decimal("-7.00")),
+        ])
+        self.assertEqual(stats.rank(self.carol.pk, window="day")["rank"], 4)
+        self.assertEqual(stats.rank(self.erin.pk)["rank"], 5)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PaginationTests(TestCase):
+    QUERY = """
+        query($first: Int, $after: String, $last: Int, $before: String, $status: BetStatus,
+              $creatorId: ID, $judgeId: ID, $participantId: ID) {
+            allBets(first: $first, after: $after, last: $last, before: $before, status: $status,
+                    creatorId: $creatorId, judgeId: $judgeId, participantId: $participantId) {
+                edges { node { id } }
+                pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        self.alice = make_user("+15550000001")
+        self.bob = make_user("+15550000002")
+        self.carol = make_user("+15550000003")
+        now = timezone.now()
+        self.bets = []
+        for i in range(7):
+            creator, judge = (self.alice, self.bob) if i % 2 else (self.bob, self.alice)
+            bet, options = make_bet(creator, judge)
+            # Bets 2-4 share a timestamp, so only the id orders them.
+            created_at = now - timedelta(minutes=3) if 2 <= i <= 4 else now - timedelta(minutes=10 - i)
+            Bet.objects.filter(pk=bet.pk).update(created_at=created_at)
+            self.bets.append((bet, options))
+        # Newest first, id breaking ties.
+        self.feed = [bet.pk for bet, _ in sorted(
+            self.bets, key=lambda item: (Bet.objects.get(pk=item[0].pk).created_at, item[0].pk), reverse=True,
+        )]
+
+    def page(self, **variables):
+        response = self.client.post(
+            "/graphql/", {"query": self.QUERY, "variables": variables}, content_type="application/json",
+        )
+        return response.json()
+
+    def ids(self, **variables):
+        result = self.page(**variables)
+        self.assertNotIn("errors", result)
+        connection = result["data"]["allBets"]
+        return [int(edge["node"]["id"]) for edge in connection["edges"]], connection["pageInfo"]
+
+    def test_forward_pages_walk_the_feed_once(self):
+        seen, after = [], None
+        while True:
+            ids, page_info = self.ids(first=2, after=after)
+            seen.extend(ids)
+            if not page_info["hasNextPage"]:
+                break
+            after = page_info["endCursor"]
+
+        self.assertEqual(seen, self.feed)
+
+    def test_backward_pages_walk_the_feed_once(self):
+        seen, before = [], None
+        while True:
+            ids, page_info = self.ids(last=2, before=before)
+            seen[:0] = ids
+            if not page_info["hasPreviousPage"]:
+                break
+            before = page_info["startCursor"]
+
+        self.assertEqual(seen, self.feed)
+
+    def test_page_boundary_inside_a_timestamp_tie(self):
+        first, page_info = self.ids(first=3)
+        rest, _ = self.ids(first=10, after=page_info["endCursor"])
+
+        self.assertEqual(first + rest, self.feed)
+        self.assertEqual(len(set(first) & set(rest)), 0)
+
+    def test_filters(self):
+        expired, _ = self.bets[0]
+        Bet.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        resolved, options = self.bets[1]
+        resolved.resolve(options[0])
+        joined, options = self.bets[2]
+        BetParticipant.objects.create(user=self.carol, bet=joined, chosen_option=options[0], stake=Decimal("1"))
+
+        def page_ids(**filters):
+            return sorted(self.ids(first=10, **filters)[0])
+
+        everyone = {bet.pk for bet, _ in self.bets}
+        self.assertEqual(page_ids(status="EXPIRED"), [expired.pk])
+        self.assertEqual(page_ids(status="RESOLVED"), [resolved.pk])
+        self.assertEqual(page_ids(status="OPEN"), sorted(everyone - {expired.pk, resolved.pk}))
+        self.assertEqual(page_ids(creatorId=self.alice.pk), sorted(bet.pk for bet, _ in self.bets[1::2]))
+        self.assertEqual(page_ids(judgeId=self.alice.pk), sorted(bet.pk for bet, _ in self.bets[0::2]))
+        self.assertEqual(page_ids(participantId=self.carol.pk), [joined.pk])
+
+    def test_malformed_cursors_are_rejected(self):
+        for raw in ("garbage", "2025-13-45T00:00:00|1", "2025-01-01T00:00:00|²", "2025-01-01T00:00:00|1_0"):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            result = self.page(first=2, after=cursor)
+            self.assertEqual([error["message"] for error in result["errors"]], ["Invalid cursor."], raw)
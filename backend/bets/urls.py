@@ -1,7 +1,7 @@
 from django.urls import path
 from .schema.schema import schema
-from graphene_django.views import GraphQLView
+from core.views import PersistedQueryGraphQLView
 
 urlpatterns = [
-    path("graphql/", GraphQLView.as_view(graphiql=True, schema=schema)),
+    path("graphql/", PersistedQueryGraphQLView.as_view(graphiql=True, schema=schema)),
 ]
@@ -0,0 +1,65 @@
+"""
+Single-query validation for the participation and resolution mutations.
+
+Each function fetches the bet row with ``SELECT ... FOR UPDATE``, annotated
+with everything the mutation checks (does the user exist, which bet does
+the option belong to, has the user already joined), so the checks cost
+one round trip. The lock holds until the caller's transaction ends, so a
+bet cannot be resolved, closed or have its options replaced between the
+checks and the writes. Both must run inside ``transaction.atomic()``.
+
+Missing rows raise the model's ``DoesNotExist``, in the order the
+mutations report them: user, then bet, then option.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Subquery
+
+from .models import Bet, BetOption, BetParticipant
+
+User = get_user_model()
+
+
+def _locked_bet(bet_id, user_id, **annotations):
+    bet = (
+        Bet.objects.select_for_update()
+        .annotate(user_exists=Exists(User.objects.filter(pk=user_id)), **annotations)
+        .filter(pk=bet_id)
+        .first()
+    )
+    if bet is None:
+        # Error path only: tell a missing user from a missing bet.
+        if not User.objects.filter(pk=user_id).exists():
+            raise User.DoesNotExist
+        raise Bet.DoesNotExist
+    if not bet.user_exists:
+        raise User.DoesNotExist
+    if bet.option_bet_id is None:
+        raise BetOption.DoesNotExist
+    return bet
+
+
+def stake_target(user_id, bet_id, option_id):
+    """
+    The locked bet a stake goes to, annotated with ``option_bet_id`` (the
+    bet the chosen option belongs to) and ``already_joined``.
+    """
+    return _locked_bet(
+        bet_id,
+        user_id,
+        option_bet_id=Subquery(BetOption.objects.filter(pk=option_id).values("bet_id")),
+        already_joined=Exists(BetParticipant.objects.filter(bet_id=OuterRef("pk"), user_id=user_id)),
+    )
+
+
+def resolution_target(judge_id, bet_id, option_id):
+    """
+    The locked bet to resolve, annotated with ``option_bet_id`` and
+    ``option_text`` of the winning option.
+    """
+    options = BetOption.objects.filter(pk=option_id)
+    return _locked_bet(
+        bet_id,
+        judge_id,
+        option_bet_id=Subquery(options.values("bet_id")),
+        option_text=Subquery(options.values("text")),
+    )
@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 
-# Create your views here.
+from .cache import get_bet_cache
+
+
+@staff_member_required
+def bet_cache_stats(request):
+    """Hit/miss counters of this worker's bet read cache."""
+    return JsonResponse(get_bet_cache().stats())
@@ -12,5 +12,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Serve /graphql/ with the async view (see core/settings.py).
+os.environ.setdefault('GRAPHQL_ASYNC_VIEW', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from .graphql_ws import GraphQLWebSocketApp  # noqa: E402  (needs the app registry)
+from .schema import schema  # noqa: E402
+
+graphql_ws_application = GraphQLWebSocketApp(schema)
+
+
+async def application(scope, receive, send):
+    # WebSockets carry GraphQL subscriptions; everything else is Django.
+    if scope["type"] == "websocket":
+        return await graphql_ws_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,248 @@
+"""
+Latency and SQL benchmarks of the key GraphQL operations.
+
+Each operation is executed through ``core.schema.schema`` against seeded
+data (see ``core.seed``), the way the views run it minus HTTP: wall time
+and the number of SQL queries are recorded per call. ``compare`` checks a
+run against a stored baseline; an operation regresses when its median
+latency grows by more than the tolerance (and by more than
+``MIN_REGRESSION_MS``, so sub-millisecond noise is ignored) or when it
+runs more queries than before.
+
+``manage.py benchmark`` seeds a throwaway test database, runs the suite,
+prints a table and optionally saves or compares a baseline.
+"""
+import json
+import random
+from collections import namedtuple
+from itertools import count
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models import Min
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from bets import settlement
+from bets.models import Bet, BetParticipant
+from .schema import schema
+from .seed import SEED_PASSWORD
+
+User = get_user_model()
+
+PERCENTILES = (50, 90, 95, 99)
+MIN_REGRESSION_MS = 0.5
+
+# ``variables(i)`` returns the variables of the i-th call, or None when the
+# operation has run out of fresh inputs (e.g. bets left to resolve).
+Operation = namedtuple("Operation", ["name", "query", "variables"])
+
+FEED_QUERY = """
+query Feed($first: Int) {
+  allBets(first: $first) {
+    edges { node {
+      id title status expiresAt totalStaked participantCount
+      creator { id firstName lastName }
+      judge { id firstName }
+      options { id text totalStaked participantCount odds }
+    } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+BET_QUERY = """
+query Bet($id: ID!) {
+  betGet(id: $id) {
+    id title description status totalStaked participantCount
+    creator { id firstName }
+    options { id text odds participantCount }
+    participants { id stake user { id firstName } chosenOption { id } }
+  }
+}
+"""
+
+CREATE_BET = """
+mutation CreateBet($creatorId: ID!, $judgeId: ID!, $title: String!, $options: [String]!, $expiresAt: String!) {
+  Bet_Create(creatorId: $creatorId, judgeId: $judgeId, title: $title, description: "Benchmark bet",
+             options: $options, expiresAt: $expiresAt) {
+    success message bet { id }
+  }
+}
+"""
+
+PARTICIPATE = """
+mutation Participate($userId: ID!, $betId: ID!, $optionId: ID!, $stake: Decimal!) {
+  Bet_Participant_Create(userId: $userId, betId: $betId, betOptionId: $optionId, stake: $stake) {
+    success message betParticipant { id }
+  }
+}
+"""
+
+RESOLVE = """
+mutation Resolve($judgeId: ID!, $betId: ID!, $optionId: ID!) {
+  Bet_Resolve(judgeId: $judgeId, betId: $betId, winningOptionId: $optionId) {
+    success message bet { id status }
+  }
+}
+"""
+
+LOGIN = """
+mutation Login($phone: String!, $password: String!) {
+  User_Login(phone: $phone, password: $password) { success message token }
+}
+"""
+
+
+def operations(data, random_seed=0):
+    """The benchmarked operations over a ``core.seed.SeedResult``."""
+    rng = random.Random(random_seed)
+    users = data.user_ids
+    hot_bet = data.viral_bet_ids[0] if data.viral_bet_ids else data.bet_ids[0]
+    hot_bet_row = Bet.objects.values("judge_id").get(pk=hot_bet)
+    hot_option = Bet.objects.filter(pk=hot_bet).aggregate(option=Min("options"))["option"]
+    joined = set(BetParticipant.objects.filter(bet_id=hot_bet).values_list("user_id", flat=True))
+    newcomers = [user_id for user_id in users if user_id not in joined and user_id != hot_bet_row["judge_id"]]
+
+    viral = set(data.viral_bet_ids)
+    to_resolve = list(
+        Bet.objects.filter(pk__in=[bet_id for bet_id in data.bet_ids if bet_id not in viral], participant_count__gt=0)
+        .annotate(first_option=Min("options"))
+        .order_by("pk")
+        .values_list("pk", "judge_id", "first_option")
+    )
+    phones = list(User.objects.filter(pk__in=users[:100]).values_list("phone", flat=True))
+    titles = count()
+
+    def pick(values, i):
+        return values[i] if i < len(values) else None
+
+    def bet_create(i):
+        creator_id, judge_id = rng.sample(users, 2)
+        return {
+            "creatorId": creator_id,
+            "judgeId": judge_id,
+            "title": f"Benchmark bet {next(titles)}",
+            "options": ["Yes", "No", "Draw"],
+            "expiresAt": "2099-01-01T00:00:00Z",
+        }
+
+    def participate(i):
+        user_id = pick(newcomers, i)
+        if user_id is None:
+            return None
+        return {"userId": user_id, "betId": hot_bet, "optionId": hot_option, "stake": "5"}
+
+    def resolve(i):
+        bet = pick(to_resolve, i)
+        if bet is None:
+            return None
+        bet_id, judge_id, option_id = bet
+        return {"judgeId": judge_id, "betId": bet_id, "optionId": option_id}
+
+    return [
+        Operation("allBets", FEED_QUERY, lambda i: {"first": 20}),
+        Operation("betGet", BET_QUERY, lambda i: {"id": rng.choice(data.viral_bet_ids or data.bet_ids)}),
+        Operation("Bet_Create", CREATE_BET, bet_create),
+        Operation("Bet_Participant_Create", PARTICIPATE, participate),
+        Operation("Bet_Resolve", RESOLVE, resolve),
+        Operation("User_Login", LOGIN, lambda i: {"phone": rng.choice(phones), "password": SEED_PASSWORD}),
+    ]
+
+
+def _context():
+    request = RequestFactory().post("/graphql/")
+    request.user = AnonymousUser()
+    return request
+
+
+def _failed(result):
+    if result.errors:
+        return True
+    # Mutations report failures in their payload.
+    return any(isinstance(payload, dict) and payload.get("success") is False for payload in (result.data or {}).values())
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-q * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run_operation(operation, iterations, warmup=0):
+    """Run ``operation`` ``warmup`` + ``iterations`` times; return its statistics."""
+    timings = []
+    queries = []
+    errors = 0
+    for i in range(warmup + iterations):
+        variables = operation.variables(i)
+        if variables is None:
+            break
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            result = schema.execute(operation.query, variable_values=variables, context_value=_context())
+            elapsed = perf_counter() - start
+        # Resolutions queue their settlement; let it finish outside the timing
+        # so it neither overlaps the next call nor locks the database under it.
+        settlement.get_executor().submit(lambda: None).result()
+        if i < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+        errors += _failed(result)
+    return summarize(timings, queries, errors)
+
+
+def summarize(timings, queries, errors=0):
+    timings = sorted(timings)
+    queries = sorted(queries)
+    stats = {"iterations": len(timings), "errors": errors}
+    if timings:
+        stats.update({f"p{q}_ms": round(percentile(timings, q), 3) for q in PERCENTILES})
+        stats["mean_ms"] = round(sum(timings) / len(timings), 3)
+        stats["max_ms"] = round(timings[-1], 3)
+        stats["queries"] = percentile(queries, 50)
+        stats["max_queries"] = queries[-1]
+    return stats
+
+
+def run(data, iterations=50, warmup=5, only=None, random_seed=0):
+    """``{operation name: statistics}`` for the suite, or the ``only`` operations."""
+    results = {}
+    for operation in operations(data, random_seed):
+        if only and operation.name not in only:
+            continue
+        results[operation.name] = run_operation(operation, iterations, warmup)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not stats.get("iterations"):
+            continue
+        if stats["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {stats['errors']} error(s), baseline {base.get('errors', 0)}")
+        p50, base_p50 = stats["p50_ms"], base.get("p50_ms")
+        if base_p50 is not None and p50 > base_p50 * (1 + tolerance) and p50 - base_p50 > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: p50 {p50:.3f} ms, baseline {base_p50:.3f} ms (+{p50 / base_p50 - 1:.0%})")
+        if base.get("max_queries") is not None and stats["max_queries"] > base["max_queries"]:
+            regressions.append(f"{name}: {stats['max_queries']} SQL queries, baseline {base['max_queries']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["operations"]
+
+
+def save_baseline(path, results, scale):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"scale": scale, "operations": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
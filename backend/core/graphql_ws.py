@@ -0,0 +1,178 @@
+"""
+GraphQL subscriptions over WebSockets (``graphql-transport-ws`` protocol).
+
+A plain ASGI application mounted next to Django in ``core/asgi.py``. Each
+``subscribe`` message starts one subscription task on the connection; its
+results are sent as ``next`` messages until the source ends or the client
+sends ``complete``. Only subscription operations are accepted; queries and
+mutations go to the HTTP endpoint.
+
+Protocol: https://github.com/enisdenjo/graphql-ws/blob/master/PROTOCOL.md
+"""
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+from graphql import ExecutionResult, GraphQLError, OperationType, get_operation_ast, subscribe
+
+from . import persisted_queries
+
+logger = logging.getLogger("django")
+
+SUBPROTOCOL = "graphql-transport-ws"
+CONNECTION_INIT_TIMEOUT = 10
+
+
+class GraphQLWebSocketApp:
+    def __init__(self, schema, path="/graphql/"):
+        self.schema = schema
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        if scope["path"] != self.path:
+            await send({"type": "websocket.close", "code": 4404})
+            return
+        if SUBPROTOCOL not in scope.get("subprotocols", []):
+            await send({"type": "websocket.close", "code": 4406})
+            return
+        await send({"type": "websocket.accept", "subprotocol": SUBPROTOCOL})
+        await _Connection(self.schema, scope, receive, send).run()
+
+
+class _Close(Exception):
+    def __init__(self, code, reason):
+        self.code = code
+        self.reason = reason
+
+
+class _Connection:
+    def __init__(self, schema, scope, receive, send):
+        self.schema = schema
+        self.scope = scope
+        self._receive = receive
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.acknowledged = False
+        self.timed_out = False
+        self.subscriptions = {}
+
+    async def send(self, message):
+        async with self._send_lock:
+            await self._send({"type": "websocket.send", "text": json.dumps(message)})
+
+    async def run(self):
+        runner = asyncio.current_task()
+        init_timeout = asyncio.get_running_loop().call_later(
+            CONNECTION_INIT_TIMEOUT, self._init_timed_out, runner
+        )
+        try:
+            while True:
+                event = await self._receive()
+                if event["type"] == "websocket.disconnect":
+                    return
+                if event["type"] != "websocket.receive":
+                    continue
+                await self.handle(event.get("text") or event.get("bytes") or "")
+                if self.acknowledged:
+                    init_timeout.cancel()
+        except _Close as e:
+            await self._send({"type": "websocket.close", "code": e.code, "reason": e.reason})
+        except asyncio.CancelledError:
+            if not self.timed_out:
+                raise
+            await self._send({"type": "websocket.close", "code": 4408, "reason": "Connection initialisation timeout"})
+        finally:
+            init_timeout.cancel()
+            for task in self.subscriptions.values():
+                task.cancel()
+
+    def _init_timed_out(self, runner):
+        if not self.acknowledged:
+            self.timed_out = True
+            runner.cancel()
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (ValueError, TypeError, KeyError):
+            raise _Close(4400, "Invalid message")
+
+        if kind == "connection_init":
+            if self.acknowledged:
+                raise _Close(4429, "Too many initialisation requests")
+            self.acknowledged = True
+            await self.send({"type": "connection_ack"})
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        elif kind == "pong":
+            pass
+        elif kind == "subscribe":
+            if not self.acknowledged:
+                raise _Close(4401, "Unauthorized")
+            id = message.get("id")
+            payload = message.get("payload")
+            if not isinstance(id, str) or not isinstance(payload, dict):
+                raise _Close(4400, "Invalid message")
+            if id in self.subscriptions:
+                raise _Close(4409, f"Subscriber for {id} already exists")
+            self.subscriptions[id] = asyncio.create_task(self.run_subscription(id, payload))
+        elif kind == "complete":
+            task = self.subscriptions.pop(message.get("id"), None)
+            if task is not None:
+                task.cancel()
+        else:
+            raise _Close(4400, "Invalid message")
+
+    async def run_subscription(self, id, payload):
+        try:
+            result = await self.subscribe(payload)
+            if isinstance(result, ExecutionResult):
+                await self.send({"type": "error", "id": id, "payload": [e.formatted for e in result.errors]})
+                return
+            try:
+                async for item in result:
+                    await self.send({"type": "next", "id": id, "payload": item.formatted})
+            finally:
+                await result.aclose()
+            await self.send({"type": "complete", "id": id})
+        except asyncio.CancelledError:
+            raise
+        except GraphQLError as e:
+            await self.send({"type": "error", "id": id, "payload": [e.formatted]})
+        except Exception:
+            logger.exception("Subscription %s failed", id)
+            await self.send({"type": "error", "id": id, "payload": [{"message": "Internal server error."}]})
+        finally:
+            self.subscriptions.pop(id, None)
+
+    async def subscribe(self, payload):
+        query = payload.get("query")
+        schema = self.schema.graphql_schema
+        try:
+            query, sha256_hash = persisted_queries.resolve_query(query, payload.get("extensions"))
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+        if not query:
+            return ExecutionResult(errors=[GraphQLError("Must provide query string.")])
+
+        document, errors = persisted_queries.get_document_cache().get(schema, None, sha256_hash, query)
+        if errors:
+            return ExecutionResult(errors=errors)
+        operation_name = payload.get("operationName")
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.SUBSCRIPTION:
+            return ExecutionResult(errors=[GraphQLError("Only subscriptions are served over WebSockets.")])
+
+        context = SimpleNamespace(scope=self.scope, graphql_async=True)
+        return await subscribe(
+            schema,
+            document,
+            context_value=context,
+            variable_values=payload.get("variables"),
+            operation_name=operation_name,
+        )
@@ -0,0 +1,78 @@
+"""
+HDR-style latency histogram.
+
+Values (integers, e.g. microseconds) are counted in log-linear buckets:
+every power-of-two range is split into the same number of linear
+sub-buckets, so any recorded value is reproduced within a relative error
+of about ``10 ** -significant_figures`` however large it is. Buckets are
+stored sparsely, so memory depends on the spread of the values, not on
+how many were recorded. Histograms of the same precision merge exactly,
+which lets every load-generating thread keep its own.
+"""
+from collections import defaultdict
+
+
+class Histogram:
+    def __init__(self, significant_figures=3):
+        self.significant_figures = significant_figures
+        # Enough sub-buckets per power of two to tell 10**-sf apart.
+        self.sub_bucket_bits = (2 * 10 ** significant_figures - 1).bit_length()
+        self.counts = defaultdict(int)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _key(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    @staticmethod
+    def _highest_equivalent(key):
+        shift, sub_bucket = key
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        self.counts[self._key(value)] += count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Only histograms of the same precision can be merged.")
+        for key, count in other.counts.items():
+            self.counts[key] += count
+        self.total += other.total
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / self.total if self.total else None
+
+    def percentile(self, q):
+        """The value at or below which ``q`` percent of the recorded values fall."""
+        if not self.total:
+            return None
+        target = max(1, -(-q * self.total // 100))
+        seen = 0
+        for key in sorted(self.counts, key=self._highest_equivalent):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self._highest_equivalent(key), self.max)
+        return self.max
+
+    def distribution(self, percentiles=(50, 75, 90, 95, 99, 99.9, 99.99, 100)):
+        """``[(percentile, value, count at or below)]``, like HdrHistogram's percentile output."""
+        rows = []
+        for q in percentiles:
+            value = self.percentile(q)
+            at_or_below = sum(count for key, count in self.counts.items() if self._key(value) >= key)
+            rows.append((q, value, at_or_below))
+        return rows
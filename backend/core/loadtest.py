@@ -0,0 +1,299 @@
+"""
+Mixed-traffic load generation against a running ``/graphql/`` endpoint.
+
+Virtual users are threads, each with its own keep-alive HTTP connection,
+that send a weighted mix of scenarios back to back (plus optional think
+time): feed reads, bet detail reads, stakes on the hottest open bets and
+resolutions. The server is whatever listens on the URL, so the same run
+works against ``runserver``/gunicorn (WSGI) and uvicorn/daphne (ASGI).
+
+Inputs come from the database the server uses (seed it with
+``manage.py seed_data``): the hot bets are the open bets with the most
+participants, and stakes go to users that have not joined them yet, so
+every stake is a real write that locks a hot ``Bet`` row. Query strings
+are shared with ``core.benchmark``.
+
+Latencies go into per-thread HDR-style histograms (``core.histogram``)
+that are merged at the end. Requests that started during the warm-up are
+not counted. A request fails on a transport error or non-200 status
+("http"), GraphQL errors ("graphql") or a mutation payload with
+``success: false`` ("rejected").
+
+The endpoint is CSRF-protected like any browser client sees it, so ``run``
+first fetches a CSRF cookie from GraphiQL and sends it back as the
+``X-CSRFToken`` header with every request.
+"""
+import http.client
+import json
+import random
+import threading
+from collections import Counter, namedtuple
+from http.cookies import SimpleCookie
+from time import perf_counter, sleep
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.db.models import Min
+from django.utils import timezone
+
+from bets.models import Bet, BetOption, BetParticipant
+from .benchmark import BET_QUERY, FEED_QUERY, PARTICIPATE, RESOLVE
+from .histogram import Histogram
+
+User = get_user_model()
+
+DEFAULT_MIX = {"feed": 60, "bet": 25, "stake": 12, "resolve": 3}
+PERCENTILES = (50, 90, 99, 99.9)
+# Share of bet detail reads that go to a hot bet rather than any bet.
+HOT_READ_SHARE = 0.5
+STAKE = "5"
+
+Request = namedtuple("Request", ["query", "variables"])
+
+
+def parse_mix(value):
+    """``"feed=60,bet=25"`` -> ``{"feed": 60, "bet": 25}``; scenarios left out get no traffic."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}.")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Weight of {name!r} must be a number.") from None
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name!r} must not be negative.")
+    if not any(mix.values()):
+        raise ValueError("At least one scenario needs a positive weight.")
+    return mix
+
+
+class Workload:
+    """Scenario inputs, read once from the database the server uses."""
+
+    def __init__(self, hot_bets=3, bet_sample=1000, random_seed=0):
+        rng = random.Random(random_seed)
+        open_bets = Bet.objects.filter(status=Bet.OPEN, expires_at__gt=timezone.now())
+        hot = list(open_bets.order_by("-participant_count", "pk").values_list("pk", flat=True)[:hot_bets])
+        self.hot_bet_ids = hot
+        self.bet_ids = list(Bet.objects.order_by("-pk").values_list("pk", flat=True)[:bet_sample]) or hot
+
+        # Every stake a newcomer on a hot bet, shuffled so the hot rows are
+        # hit concurrently rather than one after the other.
+        options = {}
+        for bet_id, option_id in BetOption.objects.filter(bet_id__in=hot).values_list("bet_id", "pk"):
+            options.setdefault(bet_id, []).append(option_id)
+        joined = set(BetParticipant.objects.filter(bet_id__in=hot).values_list("bet_id", "user_id"))
+        judges = dict(Bet.objects.filter(pk__in=hot).values_list("pk", "judge_id"))
+        users = list(User.objects.filter(is_active=True, wallet__isnull=False).values_list("pk", flat=True))
+        self._stakes = [
+            (user_id, bet_id, rng.choice(options[bet_id]))
+            for bet_id in hot if bet_id in options
+            for user_id in users
+            if (bet_id, user_id) not in joined and user_id != judges[bet_id]
+        ]
+        rng.shuffle(self._stakes)
+
+        self._resolutions = list(
+            open_bets.exclude(pk__in=hot)
+            .filter(participant_count__gt=0)
+            .annotate(first_option=Min("options"))
+            .values_list("pk", "judge_id", "first_option")
+        )
+        rng.shuffle(self._resolutions)
+        self._lock = threading.Lock()
+
+    def _take(self, items):
+        with self._lock:
+            return items.pop() if items else None
+
+    def request(self, scenario, rng):
+        """The next request of ``scenario``, or None when it has run out of inputs."""
+        if scenario == "feed":
+            return Request(FEED_QUERY, {"first": 20})
+        if scenario == "bet":
+            if not self.bet_ids:
+                return None
+            ids = self.hot_bet_ids if self.hot_bet_ids and rng.random() < HOT_READ_SHARE else self.bet_ids
+            return Request(BET_QUERY, {"id": rng.choice(ids)})
+        if scenario == "stake":
+            stake = self._take(self._stakes)
+            if stake is None:
+                return None
+            user_id, bet_id, option_id = stake
+            return Request(PARTICIPATE, {"userId": user_id, "betId": bet_id, "optionId": option_id, "stake": STAKE})
+        if scenario == "resolve":
+            resolution = self._take(self._resolutions)
+            if resolution is None:
+                return None
+            bet_id, judge_id, option_id = resolution
+            return Request(RESOLVE, {"judgeId": judge_id, "betId": bet_id, "optionId": option_id})
+        raise ValueError(f"Unknown scenario {scenario!r}.")
+
+    def remaining(self):
+        return {"stake": len(self._stakes), "resolve": len(self._resolutions)}
+
+
+class OperationStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = Counter()
+        self.cache_hits = 0
+
+    @property
+    def count(self):
+        return self.latency.total
+
+    def record(self, elapsed, error=None, cache_hit=False):
+        self.latency.record(elapsed * 1_000_000)
+        if error:
+            self.errors[error] += 1
+        self.cache_hits += cache_hit
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.errors.update(other.errors)
+        self.cache_hits += other.cache_hits
+
+    def summary(self, duration):
+        def ms(value):
+            return None if value is None else round(value / 1000, 3)
+
+        return {
+            "requests": self.count,
+            "throughput": round(self.count / duration, 2) if duration else None,
+            "error_rate": round(sum(self.errors.values()) / self.count, 4) if self.count else None,
+            "errors": dict(self.errors),
+            "cache_hits": self.cache_hits,
+            "mean_ms": ms(self.latency.mean),
+            "max_ms": ms(self.latency.max),
+            **{f"p{q:g}_ms": ms(self.latency.percentile(q)) for q in PERCENTILES},
+        }
+
+
+LoadTestResult = namedtuple("LoadTestResult", ["users", "duration", "operations"])
+
+
+def _error(status, body):
+    if status != 200:
+        return "http"
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return "http"
+    if payload.get("errors"):
+        return "graphql"
+    if any(isinstance(value, dict) and value.get("success") is False for value in (payload.get("data") or {}).values()):
+        return "rejected"
+    return None
+
+
+def csrf_headers(url, timeout=30.0):
+    """Cookie and header that pass Django's CSRF check, taken from the GraphiQL page."""
+    client = _Client(url, {"Accept": "text/html"}, timeout)
+    try:
+        client.connection = client.connection_class(client.netloc, timeout=timeout)
+        client.connection.request("GET", client.path, headers=client.headers)
+        response = client.connection.getresponse()
+        response.read()
+        cookie = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            cookie.load(header)
+    finally:
+        client.close()
+    if "csrftoken" not in cookie:
+        return {}
+    token = cookie["csrftoken"].value
+    return {"Cookie": f"csrftoken={token}", "X-CSRFToken": token}
+
+
+class _Client:
+    """One keep-alive connection; reconnects after errors and idle closes."""
+
+    def __init__(self, url, headers, timeout):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.path = parts.path or "/"
+        self.headers = {"Content-Type": "application/json", **headers}
+        self.timeout = timeout
+        self.connection = None
+
+    def post(self, body):
+        reused = self.connection is not None
+        if not reused:
+            self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self.connection.request("POST", self.path, body, self.headers)
+            response = self.connection.getresponse()
+            return response.status, response.getheader("X-Cache"), response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            if reused:
+                # The server may have dropped the idle connection; one retry.
+                return self.post(body)
+            raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _virtual_user(client, workload, mix, rng, measure_from, deadline, think_time, stats):
+    scenarios = [name for name, weight in mix.items() if weight > 0]
+    try:
+        while scenarios and perf_counter() < deadline:
+            scenario = rng.choices(scenarios, [mix[name] for name in scenarios])[0]
+            request = workload.request(scenario, rng)
+            if request is None:
+                scenarios.remove(scenario)
+                continue
+            body = json.dumps({"query": request.query, "variables": request.variables})
+            start = perf_counter()
+            try:
+                status, cache, content = client.post(body)
+            except (OSError, http.client.HTTPException):
+                status, cache, content = None, None, b""
+            elapsed = perf_counter() - start
+            if start >= measure_from:
+                stats.setdefault(scenario, OperationStats()).record(elapsed, _error(status, content), cache == "HIT")
+            if think_time:
+                sleep(rng.expovariate(1 / think_time))
+    finally:
+        client.close()
+
+
+def run(url, workload, users=10, duration=30.0, warmup=5.0, mix=None, think_time=0.0,
+        headers=None, timeout=30.0, random_seed=0):
+    """Drive ``users`` concurrent virtual users for ``warmup`` + ``duration`` seconds."""
+    mix = mix or DEFAULT_MIX
+    headers = {**csrf_headers(url, timeout), **(headers or {})}
+    measure_from = perf_counter() + warmup
+    deadline = measure_from + duration
+    per_user = [{} for _ in range(users)]
+    threads = [
+        threading.Thread(
+            target=_virtual_user,
+            args=(
+                _Client(url, headers, timeout), workload, mix, random.Random(random_seed + i),
+                measure_from, deadline, think_time, per_user[i],
+            ),
+            daemon=True,
+        )
+        for i in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    operations = {}
+    for stats in per_user:
+        for scenario, operation in stats.items():
+            operations.setdefault(scenario, OperationStats()).merge(operation)
+    # Virtual users stop early once every scenario has run out of inputs.
+    measured = max(0.0, min(perf_counter(), deadline) - measure_from)
+    return LoadTestResult(users, measured, {name: operations[name] for name in mix if name in operations})
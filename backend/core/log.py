@@ -0,0 +1,75 @@
+"""
+JSON logging through a non-blocking queue.
+
+``QueueJSONHandler`` only puts records on a bounded in-memory queue; a
+background ``QueueListener`` thread formats them with ``JSONFormatter``
+and writes them out, so a request thread never waits on the terminal or a
+log pipe. When the queue is full the record is dropped rather than making
+the caller wait. Enabled with ``LOG_FORMAT=json`` (see ``core/settings.py``).
+
+Messages are rendered in the calling thread before they are queued, and
+only for records that passed the level check: log calls use %-style
+arguments and ``extra`` fields holding plain values (ids, counts, strings),
+never model instances whose ``__str__`` could hit the database.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueJSONHandler(QueueHandler):
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JSONFormatter())
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, keep the record's fields apart for the
+        # JSON formatter; only the message and traceback are rendered here.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,106 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from core import benchmark
+from core.seed import seed
+
+# The throwaway database gets a cache of its own, so its read models,
+# responses and persisted queries never reach the real database's cache.
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark",
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database, time the key GraphQL operations and report latency "
+        "percentiles and SQL query counts. With --baseline, fail on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--bets", type=int, default=300)
+        parser.add_argument("--viral-bets", type=int, default=3)
+        parser.add_argument("--stakes", type=int, default=10000)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--only", action="append", help="Only run this operation (repeatable).")
+        parser.add_argument("--baseline", help="Compare against this baseline file; fail on regressions.")
+        parser.add_argument("--save-baseline", help="Write the results to this baseline file.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25,
+            help="Allowed relative growth of the median latency (default 0.25).",
+        )
+
+    def handle(self, *args, **options):
+        baseline = benchmark.load_baseline(options["baseline"]) if options["baseline"] else None
+        scale = {key: options[key] for key in ("users", "bets", "viral_bets", "stakes", "seed")}
+
+        # Debug output would be part of every measurement.
+        debug_logger = logging.getLogger("debugger")
+        debug_level = debug_logger.level
+        debug_logger.setLevel(logging.INFO)
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                data = seed(
+                    users=options["users"],
+                    bets=options["bets"],
+                    viral_bets=options["viral_bets"],
+                    stakes=options["stakes"],
+                    random_seed=options["seed"],
+                )
+                self.stdout.write(
+                    f"Seeded {len(data.user_ids)} users, {len(data.bet_ids)} bets, {data.stakes} stakes."
+                )
+                results = benchmark.run(
+                    data,
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    only=options["only"],
+                    random_seed=options["seed"],
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                debug_logger.setLevel(debug_level)
+
+        self.report(results, baseline)
+        if options["save_baseline"]:
+            benchmark.save_baseline(options["save_baseline"], results, scale)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}.")
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, options["tolerance"])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def report(self, results, baseline):
+        columns = ["operation", "n", "err", "p50", "p90", "p95", "p99", "max", "sql"]
+        if baseline is not None:
+            columns.append("base p50")
+        rows = []
+        for name, stats in results.items():
+            if not stats["iterations"]:
+                rows.append([name, "0", "-", "-", "-", "-", "-", "-", "-"] + (["-"] if baseline is not None else []))
+                continue
+            row = [name, str(stats["iterations"]), str(stats["errors"])]
+            row += [f"{stats[key]:.2f}" for key in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")]
+            row.append(str(stats["max_queries"]))
+            if baseline is not None:
+                base = baseline.get(name, {}).get("p50_ms")
+                row.append("-" if base is None else f"{base:.2f}")
+            rows.append(row)
+        widths = [max(len(row[i]) for row in [columns, *rows]) for i in range(len(columns))]
+        self.stdout.write("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+        self.stdout.write("Latencies in ms; sql is the most queries one call ran.")
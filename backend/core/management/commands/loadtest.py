@@ -0,0 +1,110 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of feed reads, bet reads, stakes on hot bets and resolutions against a running "
+        "/graphql/ endpoint (WSGI or ASGI) with concurrent virtual users, and report throughput, "
+        "latency percentiles and error rates per operation. Give several --users values to step "
+        "the concurrency up and find the saturation point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", nargs="?", default="http://127.0.0.1:8000/graphql/")
+        parser.add_argument(
+            "--users", type=int, nargs="+", default=[10],
+            help="Concurrent virtual users; several values run one stage each.",
+        )
+        parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per stage.")
+        parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each stage.")
+        parser.add_argument(
+            "--mix", type=loadtest.parse_mix,
+            default=loadtest.DEFAULT_MIX,
+            help="Scenario weights, default " + ",".join(f"{k}={v}" for k, v in loadtest.DEFAULT_MIX.items()) + ".",
+        )
+        parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between requests, in ms.")
+        parser.add_argument("--hot-bets", type=int, default=3, help="Open bets with the most participants to stake on.")
+        parser.add_argument("--authorization", help="Authorization header to send (bypasses the response cache).")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--distribution", action="store_true", help="Also print each operation's percentile distribution.")
+        parser.add_argument("--json", help="Write the results of every stage to this file.")
+
+    def handle(self, *args, **options):
+        if min(options["users"]) < 1:
+            raise CommandError("--users must be at least 1.")
+        workload = loadtest.Workload(hot_bets=options["hot_bets"], random_seed=options["seed"])
+        if not workload.bet_ids:
+            raise CommandError("No bets to load test against; run manage.py seed_data first.")
+        remaining = workload.remaining()
+        self.stdout.write(
+            f"Hot bets: {', '.join(map(str, workload.hot_bet_ids)) or 'none'}; "
+            f"{remaining['stake']} stake(s) and {remaining['resolve']} resolution(s) available."
+        )
+        headers = {"Authorization": options["authorization"]} if options["authorization"] else {}
+
+        stages = []
+        for users in options["users"]:
+            self.stdout.write(f"\n{users} virtual user(s), {options['warmup']:g}s warm-up, {options['duration']:g}s measured:")
+            result = loadtest.run(
+                options["url"],
+                workload,
+                users=users,
+                duration=options["duration"],
+                warmup=options["warmup"],
+                mix=options["mix"],
+                think_time=options["think_time"] / 1000,
+                headers=headers,
+                timeout=options["timeout"],
+                random_seed=options["seed"],
+            )
+            self.report(result, options["distribution"])
+            stages.append({
+                "users": users,
+                "duration": round(result.duration, 3),
+                "operations": {name: stats.summary(result.duration) for name, stats in result.operations.items()},
+            })
+
+        if options["json"]:
+            with open(options["json"], "w", encoding="utf-8") as f:
+                json.dump({"url": options["url"], "mix": options["mix"], "stages": stages}, f, indent=2)
+                f.write("\n")
+            self.stdout.write(f"\nResults written to {options['json']}.")
+
+    def report(self, result, distribution):
+        columns = ["operation", "n", "req/s", "err%", "p50", "p90", "p99", "p99.9", "max", "errors"]
+        rows = []
+        total = loadtest.OperationStats()
+        for name, stats in [*result.operations.items(), ("total", total)]:
+            if stats is not total:
+                total.merge(stats)
+            summary = stats.summary(result.duration)
+            if not summary["requests"]:
+                continue
+            rows.append([
+                name,
+                str(summary["requests"]),
+                f"{summary['throughput']:.1f}",
+                f"{summary['error_rate']:.2%}",
+                *(f"{summary[key]:.2f}" for key in ("p50_ms", "p90_ms", "p99_ms", "p99.9_ms", "max_ms")),
+                " ".join(f"{kind}:{n}" for kind, n in sorted(summary["errors"].items())) or "-",
+            ])
+        if not rows:
+            self.stdout.write("No requests were measured.")
+            return
+        widths = [max(len(row[i]) for row in [columns, *rows]) for i in range(len(columns))]
+        self.stdout.write("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+        self.stdout.write("Latencies in ms.")
+
+        if distribution:
+            for name, stats in result.operations.items():
+                self.stdout.write(f"\n{name}:")
+                self.stdout.write(f"{'percentile':>12}  {'value (ms)':>12}  {'count':>8}")
+                for q, value, count in stats.latency.distribution():
+                    self.stdout.write(f"{q:>12g}  {value / 1000:>12.3f}  {count:>8}")
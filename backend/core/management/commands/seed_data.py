@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.seed import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, bets and skewed participation "
+        f"(seeded users share the password {SEED_PASSWORD!r})."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--bets", type=int, default=200)
+        parser.add_argument("--viral-bets", type=int, default=3, help="Bets taking half of all stakes.")
+        parser.add_argument("--stakes", type=int, default=5000, help="Participations to spread over the bets.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same data.")
+
+    def handle(self, *args, **options):
+        data = seed(
+            users=options["users"],
+            bets=options["bets"],
+            viral_bets=options["viral_bets"],
+            stakes=options["stakes"],
+            random_seed=options["seed"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(data.user_ids)} user(s), {len(data.bet_ids)} bet(s) and {data.stakes} stake(s); "
+            f"viral bets: {', '.join(map(str, data.viral_bet_ids)) or 'none'}."
+        ))
@@ -0,0 +1,429 @@
+"""
+Per-request performance accounting for GraphQL.
+
+``MetricsMiddleware`` (Django) opens a ``RequestProfile`` for every request.
+SQL is counted and timed by a wrapper installed on each database
+connection (``connection.execute_wrappers``, hooked on
+``connection_created``), so queries run from ``sync_to_async`` workers are
+counted too: the profile travels in a context variable. The GraphQL views
+name the operation; requests that never reach one are not exported.
+
+``ResolverMetricsMiddleware`` (graphene) times every resolver, counts the
+objects it returns and attributes the SQL issued while it runs to its
+``Type.field``. A field that runs the same SQL shape ``N_PLUS_ONE_THRESHOLD``
+times in one request is flagged as an N+1: logged, listed under
+``extensions.metrics.nPlusOne`` and counted in ``graphql_n_plus_one_total``.
+
+Totals are kept per process and exposed in the Prometheus text format by
+``metrics_view``, which needs ``Authorization: Bearer <ENDPOINT_TOKEN>``
+or, without a token, a staff session. The password hashing pool
+(``accounts.hashing``) exports its wait and hashing times there as well.
+
+Configured by ``settings.GRAPHQL_METRICS``::
+
+    GRAPHQL_METRICS = {
+        "ENABLED": True,
+        "EXTENSIONS": DEBUG,         # add extensions.metrics to responses
+        "N_PLUS_ONE_THRESHOLD": 5,   # 0 turns the detector off
+        "ENDPOINT_TOKEN": None,
+    }
+"""
+import inspect
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from graphql import GraphQLObjectType, get_named_type
+
+logger = logging.getLogger("django")
+
+DEFAULT_SETTINGS = {
+    "ENABLED": True,
+    "EXTENSIONS": False,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "ENDPOINT_TOKEN": None,
+}
+
+# Operation names come from clients; past this many, new ones are exported as "other".
+MAX_OPERATION_NAMES = 200
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_profile = ContextVar("graphql_metrics_profile", default=None)
+_field = ContextVar("graphql_metrics_field", default=None)
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "GRAPHQL_METRICS", {})}
+
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def sql_shape(sql):
+    """The SQL with parameter lists and inlined numbers (e.g. LIMIT 21) collapsed."""
+    return _NUMBER.sub("?", _IN_LIST.sub("IN (...)", sql))
+
+
+class RequestProfile:
+    def __init__(self, n_plus_one_threshold=0):
+        self.started = perf_counter()
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.operation_type = None
+        self.operation_name = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.objects = 0
+        self.cache = defaultdict(lambda: {"hits": 0, "misses": 0})
+        # "Type.field" -> [calls, seconds, sql queries, sql seconds]
+        self.resolvers = defaultdict(lambda: [0, 0.0, 0, 0.0])
+        self.shapes = Counter()
+
+    @property
+    def duration(self):
+        return perf_counter() - self.started
+
+    def record_query(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        field = _field.get()
+        if field is not None:
+            stats = self.resolvers[field]
+            stats[2] += 1
+            stats[3] += duration
+            if self.n_plus_one_threshold:
+                self.shapes[field, sql_shape(sql)] += 1
+
+    def record_resolver(self, field, duration):
+        stats = self.resolvers[field]
+        stats[0] += 1
+        stats[1] += duration
+
+    def n_plus_one(self):
+        if not self.n_plus_one_threshold:
+            return []
+        return [
+            {"field": field, "sql": shape, "count": count}
+            for (field, shape), count in self.shapes.items()
+            if count >= self.n_plus_one_threshold
+        ]
+
+    def summary(self):
+        """The ``extensions.metrics`` of a response, slowest resolvers first."""
+        resolvers = sorted(self.resolvers.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "durationMs": _ms(self.duration),
+            "sql": {"count": self.sql_count, "durationMs": _ms(self.sql_time)},
+            "cache": dict(self.cache),
+            "objects": self.objects,
+            "resolvers": [
+                {"field": field, "calls": calls, "durationMs": _ms(seconds), "sqlCount": sql_count, "sqlDurationMs": _ms(sql_time)}
+                for field, (calls, seconds, sql_count, sql_time) in resolvers
+            ],
+            "nPlusOne": self.n_plus_one(),
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def current_profile():
+    return _profile.get()
+
+
+def set_operation(operation_type, operation_name):
+    """Called by the GraphQL views once the operation of the request is known."""
+    profile = _profile.get()
+    if profile is not None:
+        profile.operation_type = operation_type
+        profile.operation_name = operation_name
+
+
+def record_cache(cache, hit):
+    profile = _profile.get()
+    if profile is not None:
+        profile.cache[cache]["hits" if hit else "misses"] += 1
+
+
+def extension():
+    """``extensions.metrics`` for the current request, or None when disabled."""
+    profile = _profile.get()
+    if profile is None or not _settings()["EXTENSIONS"]:
+        return None
+    return profile.summary()
+
+
+@receiver(connection_created, dispatch_uid="core.metrics.connection_created")
+def install_query_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, perf_counter() - start)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = _settings()["ENABLED"]
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profile = RequestProfile(_settings()["N_PLUS_ONE_THRESHOLD"])
+        token = _profile.set(profile)
+        try:
+            return self.get_response(request)
+        finally:
+            _profile.reset(token)
+            registry.observe(profile)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile = RequestProfile(_settings()["N_PLUS_ONE_THRESHOLD"])
+        token = _profile.set(profile)
+        try:
+            return await self.get_response(request)
+        finally:
+            _profile.reset(token)
+            registry.observe(profile)
+
+
+class ResolverMetricsMiddleware:
+    """
+    Graphene middleware timing resolvers and attributing SQL to them. Only
+    installed while a request is being profiled.
+    """
+
+    def resolve(self, next, root, info, **args):
+        profile = _profile.get()
+        field = f"{info.parent_type.name}.{info.field_name}"
+        token = _field.set(field)
+        start = perf_counter()
+        try:
+            result = next(root, info, **args)
+            if inspect.isawaitable(result):
+                return self._resolve_async(profile, field, info, result, start)
+            if isinstance(result, QuerySet):
+                # Run the query now so its SQL counts against this field.
+                try:
+                    len(result)
+                except SynchronousOnlyOperation:
+                    pass
+            profile.objects += _count_objects(info, result)
+            return result
+        finally:
+            _field.reset(token)
+            profile.record_resolver(field, perf_counter() - start)
+
+    @staticmethod
+    async def _resolve_async(profile, field, info, result, start):
+        token = _field.set(field)
+        try:
+            result = await result
+            profile.objects += _count_objects(info, result)
+            return result
+        finally:
+            _field.reset(token)
+            profile.record_resolver(field, perf_counter() - start)
+
+
+def _count_objects(info, result):
+    if result is None or not isinstance(get_named_type(info.return_type), GraphQLObjectType):
+        return 0
+    if isinstance(result, QuerySet):
+        return len(result) if result._result_cache is not None else 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+class _Metric:
+    def __init__(self, name, help, type, labels=()):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labels = labels
+        self.values = defaultdict(float)
+
+    def _label_text(self, values, extra=()):
+        pairs = [*zip(self.labels, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{self._label_text(values)} {_number(value)}")
+        return lines
+
+
+class _Counter(_Metric):
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, "counter", labels)
+
+    def inc(self, labels=(), value=1):
+        self.values[tuple(labels)] += value
+
+
+class _Histogram(_Metric):
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, "histogram", labels)
+        self.buckets = buckets
+        self.observations = {}
+
+    def observe(self, labels, value):
+        labels = tuple(labels)
+        counts, total = self.observations.get(labels, ([0] * len(self.buckets), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.values[labels] += 1
+        self.observations[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, (counts, total) in sorted(self.observations.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._label_text(labels, [('le', bound)])} {count}")
+            count = int(self.values[labels])
+            lines.append(f'{self.name}_bucket{self._label_text(labels, [("le", "+Inf")])} {count}')
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+class MetricsRegistry:
+    """Process-wide totals of the profiled GraphQL requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operation_names = set()
+        operation = ("operation_type", "operation_name")
+        self.requests = _Counter("graphql_requests_total", "GraphQL operations served.", operation)
+        self.duration = _Histogram("graphql_request_duration_seconds", "Wall time of GraphQL requests.", ("operation_type",))
+        self.sql_queries = _Counter("graphql_sql_queries_total", "SQL queries run by GraphQL requests.", operation)
+        self.sql_seconds = _Counter("graphql_sql_duration_seconds_total", "Time spent in SQL by GraphQL requests.", operation)
+        self.objects = _Counter("graphql_objects_total", "Objects resolved into GraphQL responses.", operation)
+        self.cache = _Counter("graphql_cache_lookups_total", "Cache lookups by GraphQL requests.", ("cache", "result"))
+        self.resolver_calls = _Counter("graphql_resolver_calls_total", "Resolver calls.", ("field",))
+        self.resolver_seconds = _Counter("graphql_resolver_duration_seconds_total", "Time spent in resolvers.", ("field",))
+        self.resolver_sql = _Counter("graphql_resolver_sql_queries_total", "SQL queries run by resolvers.", ("field",))
+        self.n_plus_one = _Counter("graphql_n_plus_one_total", "Requests where a resolver repeated the same SQL shape.", ("field",))
+        self.password_hash_duration = _Histogram(
+            "password_hash_duration_seconds", "Time spent hashing or verifying passwords.", ("operation",)
+        )
+        self.password_hash_wait = _Histogram(
+            "password_hash_wait_seconds", "Time password hashes waited for a pool worker.", ("operation",)
+        )
+        self.password_hash_rejected = _Counter(
+            "password_hash_rejected_total", "Password hashes refused because the pool was full.", ("operation",)
+        )
+        self.metrics = [
+            self.requests, self.duration, self.sql_queries, self.sql_seconds, self.objects, self.cache,
+            self.resolver_calls, self.resolver_seconds, self.resolver_sql, self.n_plus_one,
+            self.password_hash_duration, self.password_hash_wait, self.password_hash_rejected,
+        ]
+
+    def observe(self, profile):
+        if profile.operation_type is None:
+            return
+        duration = profile.duration
+        n_plus_one = profile.n_plus_one()
+        for suspect in n_plus_one:
+            logger.warning(
+                "Possible N+1 in %s: %s queries of the same shape in one request: %s",
+                suspect["field"], suspect["count"], suspect["sql"],
+                extra={"field": suspect["field"], "count": suspect["count"]},
+            )
+
+        with self._lock:
+            name = profile.operation_name or ""
+            if name not in self._operation_names:
+                if len(self._operation_names) < MAX_OPERATION_NAMES:
+                    self._operation_names.add(name)
+                else:
+                    name = "other"
+            operation = (profile.operation_type, name)
+            self.requests.inc(operation)
+            self.duration.observe((profile.operation_type,), duration)
+            self.sql_queries.inc(operation, profile.sql_count)
+            self.sql_seconds.inc(operation, profile.sql_time)
+            self.objects.inc(operation, profile.objects)
+            for cache, counts in profile.cache.items():
+                self.cache.inc((cache, "hit"), counts["hits"])
+                self.cache.inc((cache, "miss"), counts["misses"])
+            for field, (calls, seconds, sql_count, _) in profile.resolvers.items():
+                self.resolver_calls.inc((field,), calls)
+                self.resolver_seconds.inc((field,), seconds)
+                self.resolver_sql.inc((field,), sql_count)
+            for suspect in n_plus_one:
+                self.n_plus_one.inc((suspect["field"],))
+
+    def observe_password_hash(self, operation, wait, duration):
+        with self._lock:
+            self.password_hash_wait.observe((operation,), wait)
+            self.password_hash_duration.observe((operation,), duration)
+
+    def reject_password_hash(self, operation):
+        with self._lock:
+            self.password_hash_rejected.inc((operation,))
+
+    def render(self):
+        with self._lock:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this worker's totals."""
+    token = _settings()["ENDPOINT_TOKEN"]
+    if token:
+        allowed = constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}")
+    else:
+        allowed = request.user.is_active and request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
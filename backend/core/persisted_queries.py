@@ -0,0 +1,197 @@
+"""
+Persisted queries and a cache of parsed, validated documents.
+
+Clients may send ``extensions.persistedQuery.sha256Hash`` instead of (or
+along with) the query text, as in Apollo's automatic persisted queries:
+
+* hash only: the query is looked up in the manifest, then in the queries
+  registered at runtime. Unknown hashes get a ``PersistedQueryNotFound``
+  error, and the client retries with the full text.
+* hash and text: the hash is checked against the text and, when
+  registration is allowed, the query is registered so later requests can
+  send the hash alone.
+
+Registration lets any client write to the shared cache, so it is off by
+default; deployments that want automatic persisted queries turn it on and
+rely on ``REGISTRATION_TTL`` and ``MAX_REGISTERED_QUERY_SIZE`` to bound
+what a client can store. Queries in the manifest need no registration.
+
+Whatever way the text arrived, its parsed and validated ``DocumentNode`` is
+kept in an in-process LRU keyed on the hash, so repeated operations skip
+parsing and validation.
+
+Configured by ``settings.GRAPHQL_PERSISTED_QUERIES``::
+
+    GRAPHQL_PERSISTED_QUERIES = {
+        "MANIFEST": BASE_DIR / "persisted_queries.json",  # {hash: query}, optional
+        "ALLOW_REGISTRATION": False,  # accept new hashes sent with their text
+        "REGISTRATION_TTL": 86400,    # seconds a registered query is kept
+        "MAX_REGISTERED_QUERY_SIZE": 10000,  # longer queries run but are not registered
+        "CACHE_ALIAS": "default",     # where runtime registrations live
+        "DOCUMENT_CACHE_SIZE": 1000,
+    }
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError, parse, validate
+from graphene_django.settings import graphene_settings
+
+DEFAULT_SETTINGS = {
+    "MANIFEST": None,
+    "ALLOW_REGISTRATION": False,
+    "REGISTRATION_TTL": 86400,
+    "MAX_REGISTERED_QUERY_SIZE": 10000,
+    "CACHE_ALIAS": "default",
+    "DOCUMENT_CACHE_SIZE": 1000,
+}
+
+PERSISTED_QUERY_VERSION = 1
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "GRAPHQL_PERSISTED_QUERIES", {})}
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def _error(message, code):
+    return GraphQLError(message, extensions={"code": code})
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                path = _settings()["MANIFEST"]
+                manifest = {}
+                if path:
+                    with open(path, encoding="utf-8") as f:
+                        manifest = json.load(f)
+                _manifest = manifest
+    return _manifest
+
+
+def _registry_key(sha256_hash):
+    return f"pq:{sha256_hash}"
+
+
+def lookup(sha256_hash):
+    query = _load_manifest().get(sha256_hash)
+    if query is None:
+        query = caches[_settings()["CACHE_ALIAS"]].get(_registry_key(sha256_hash))
+    return query
+
+
+def register(sha256_hash, query):
+    config = _settings()
+    caches[config["CACHE_ALIAS"]].set(_registry_key(sha256_hash), query, config["REGISTRATION_TTL"])
+
+
+def resolve_query(query, extensions):
+    """
+    Return ``(query, hash)`` for a request, looking up or registering its
+    persisted query. Raises ``GraphQLError`` for unknown or mismatched hashes.
+    """
+    persisted = (extensions or {}).get("persistedQuery")
+    if not persisted:
+        return query, query_hash(query) if query else None
+
+    if persisted.get("version") != PERSISTED_QUERY_VERSION:
+        raise _error("Unsupported persisted query version.", "PERSISTED_QUERY_NOT_SUPPORTED")
+    sha256_hash = persisted.get("sha256Hash")
+    if not isinstance(sha256_hash, str):
+        raise _error("Persisted query hash is missing.", "PERSISTED_QUERY_NOT_FOUND")
+
+    if not query:
+        query = lookup(sha256_hash)
+        if query is None:
+            raise _error("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+        return query, sha256_hash
+
+    if query_hash(query) != sha256_hash:
+        raise _error("Provided sha256Hash does not match query.", "INVALID_PERSISTED_QUERY")
+    config = _settings()
+    if (
+        config["ALLOW_REGISTRATION"]
+        and len(query) <= config["MAX_REGISTERED_QUERY_SIZE"]
+        and lookup(sha256_hash) is None
+    ):
+        register(sha256_hash, query)
+    return query, sha256_hash
+
+
+class DocumentCache:
+    """
+    LRU of ``(document, validation_errors)`` keyed on schema, validation
+    rules and query hash. Invalid documents are cached too, so a client
+    stuck on a broken query does not re-parse it on every request.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, schema, validation_rules, sha256_hash, query):
+        key = (schema, tuple(validation_rules or ()), sha256_hash)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            entry = (None, [e])
+        else:
+            entry = (
+                document,
+                validate(schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS),
+            )
+
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_document_cache = None
+_document_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    """The process-wide document cache sized by ``DOCUMENT_CACHE_SIZE``."""
+    global _document_cache
+    if _document_cache is None:
+        with _document_cache_lock:
+            if _document_cache is None:
+                _document_cache = DocumentCache(_settings()["DOCUMENT_CACHE_SIZE"])
+    return _document_cache
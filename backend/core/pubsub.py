@@ -0,0 +1,103 @@
+"""
+Topic-based publish/subscribe for GraphQL subscriptions.
+
+The backend is chosen by ``settings.GRAPHQL_PUBSUB``::
+
+    GRAPHQL_PUBSUB = {
+        "BACKEND": "core.pubsub.InMemoryPubSub",
+        "OPTIONS": {"queue_size": 100},
+    }
+
+A backend provides ``publish(topic, message)`` (callable from any thread),
+``subscribe(topic)`` returning an async iterator with an async ``close()``,
+and ``has_subscribers(topic)``. The in-memory backend only reaches
+subscribers of the same process; a broker-backed one (e.g. Redis pub/sub)
+should answer ``has_subscribers`` with True and keep messages
+JSON-serializable.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_SETTINGS = {
+    "BACKEND": "core.pubsub.InMemoryPubSub",
+    "OPTIONS": {},
+}
+
+
+class Subscription:
+    """Async iterator over the messages of one topic, registered on creation."""
+
+    def __init__(self, pubsub, topic, queue_size):
+        self.pubsub = pubsub
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def deliver(self, message):
+        # Slow consumers lose their oldest message: every message is a full
+        # snapshot, so only the newest one matters.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class InMemoryPubSub:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self.queue_size)
+        with self._lock:
+            self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.topic]
+
+    def has_subscribers(self, topic):
+        return topic in self._subscriptions
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's event loop is gone.
+                self.unsubscribe(subscription)
+
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    """The process-wide backend configured by ``settings.GRAPHQL_PUBSUB``."""
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                config = {**DEFAULT_SETTINGS, **getattr(settings, "GRAPHQL_PUBSUB", {})}
+                _pubsub = import_string(config["BACKEND"])(**config["OPTIONS"])
+    return _pubsub
@@ -0,0 +1,180 @@
+"""
+Static cost and depth analysis of GraphQL operations.
+
+Runs on the validated document before execution, so a query that would fan
+out through the cyclic graph (bet -> participants -> user -> joined_bets ->
+bet ...) is rejected without touching the database.
+
+The cost of a selection is the sum over its fields of::
+
+    field cost + multiplier * cost of the field's own selection
+
+Object fields cost 1 and scalars 0 unless ``FIELD_COSTS`` says otherwise.
+The multiplier of a field is the page size it asks for (``first``/``last``,
+capped at ``RELAY_CONNECTION_MAX_LIMIT``) when it takes pagination
+arguments, ``DEFAULT_LIST_SIZE`` for other list fields and 1 for everything
+else. The ``edges`` list of a connection is already covered by the page size
+of the connection field. Introspection fields are free.
+
+Configured by ``settings.GRAPHQL_QUERY_COST``::
+
+    GRAPHQL_QUERY_COST = {
+        "MAX_COST": 5000,
+        "MAX_DEPTH": 10,
+        "DEFAULT_LIST_SIZE": 20,
+        "FIELD_COSTS": {"BetOptionType.odds": 1},   # "Type.field": cost
+    }
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    get_named_type,
+    get_nullable_type,
+    get_operation_ast,
+)
+from graphql.execution.values import get_argument_values
+
+from bets.schema.pagination import DEFAULT_PAGE_SIZE
+
+DEFAULT_SETTINGS = {
+    "MAX_COST": 5000,
+    "MAX_DEPTH": 10,
+    "DEFAULT_LIST_SIZE": 20,
+    "FIELD_COSTS": {},
+}
+
+QueryCost = namedtuple("QueryCost", ["cost", "depth"])
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "GRAPHQL_QUERY_COST", {})}
+
+
+def _is_connection(graphql_type):
+    return isinstance(graphql_type, GraphQLObjectType) and {"edges", "pageInfo"} <= set(graphql_type.fields)
+
+
+class _Analyzer:
+    def __init__(self, schema, fragments, variables, config):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.field_costs = config["FIELD_COSTS"]
+        self.default_list_size = config["DEFAULT_LIST_SIZE"]
+        self.max_page_size = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    def _fields(self, selection_set):
+        """Field nodes of a selection set with fragments flattened."""
+        stack = [selection_set]
+        while stack:
+            for selection in stack.pop().selections:
+                if isinstance(selection, FieldNode):
+                    yield selection
+                elif isinstance(selection, InlineFragmentNode):
+                    stack.append(selection.selection_set)
+                elif isinstance(selection, FragmentSpreadNode):
+                    fragment = self.fragments.get(selection.name.value)
+                    if fragment is not None:
+                        stack.append(fragment.selection_set)
+
+    def _page_size(self, field_def, node):
+        if not {"first", "last"} & set(field_def.args):
+            return None
+        try:
+            args = get_argument_values(field_def, node, self.variables)
+        except GraphQLError:
+            return DEFAULT_PAGE_SIZE
+        size = args.get("first", args.get("last"))
+        if size is None:
+            return DEFAULT_PAGE_SIZE
+        return max(0, min(size, self.max_page_size))
+
+    def _multiplier(self, parent_type, field_def, node):
+        page_size = self._page_size(field_def, node)
+        if page_size is not None:
+            return page_size
+        if isinstance(get_nullable_type(field_def.type), GraphQLList):
+            return 1 if _is_connection(parent_type) else self.default_list_size
+        return 1
+
+    def selection_cost(self, selection_set, parent_type):
+        """Return (cost, depth) of a selection set on ``parent_type``."""
+        cost, depth = 0, 0
+        for node in self._fields(selection_set):
+            name = node.name.value
+            if name.startswith("__"):
+                continue
+            field_def = parent_type.fields[name]
+            field_type = get_named_type(field_def.type)
+            default_cost = 1 if isinstance(field_type, GraphQLObjectType) else 0
+            field_cost = self.field_costs.get(f"{parent_type.name}.{name}", default_cost)
+
+            child_cost, child_depth = 0, 0
+            if node.selection_set is not None:
+                if isinstance(field_type, GraphQLObjectType):
+                    child_cost, child_depth = self.selection_cost(node.selection_set, field_type)
+                else:
+                    # Interfaces and unions: price the selection against
+                    # the most expensive possible type.
+                    child_cost, child_depth = max(
+                        self.selection_cost(node.selection_set, possible_type)
+                        for possible_type in self.schema.get_possible_types(field_type)
+                    )
+
+            cost += field_cost + self._multiplier(parent_type, field_def, node) * child_cost
+            depth = max(depth, child_depth + 1)
+        return cost, depth
+
+
+def analyze(schema, document, operation_name=None, variables=None):
+    """Return the ``QueryCost`` of the operation to run, or None if it cannot be determined."""
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return None
+    root_type = schema.get_root_type(operation.operation)
+    if root_type is None:
+        return None
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    analyzer = _Analyzer(schema, fragments, variables, _settings())
+    return QueryCost(*analyzer.selection_cost(operation.selection_set, root_type))
+
+
+def check(query_cost):
+    """Return the GraphQL errors for a ``QueryCost`` over the configured limits."""
+    config = _settings()
+    errors = []
+    if query_cost.depth > config["MAX_DEPTH"]:
+        errors.append(GraphQLError(
+            f"Query depth {query_cost.depth} exceeds the maximum of {config['MAX_DEPTH']}.",
+            extensions={"code": "QUERY_TOO_DEEP"},
+        ))
+    if query_cost.cost > config["MAX_COST"]:
+        errors.append(GraphQLError(
+            f"Query cost {query_cost.cost} exceeds the maximum of {config['MAX_COST']}.",
+            extensions={"code": "QUERY_TOO_COMPLEX"},
+        ))
+    return errors
+
+
+def extension(query_cost):
+    """The ``cost`` entry reported in the response extensions."""
+    config = _settings()
+    return {
+        "requestedQueryCost": query_cost.cost,
+        "maximumAvailable": config["MAX_COST"],
+        "depth": query_cost.depth,
+        "maximumDepth": config["MAX_DEPTH"],
+    }
@@ -0,0 +1,215 @@
+"""
+Whole-response cache for anonymous, read-only GraphQL queries.
+
+The key is a hash of the normalized query document (``print_ast`` drops
+whitespace, comments and formatting differences), the operation name and
+the variables. While the query runs, ``TagCollectorMiddleware`` records
+which bets the response touched (``bet:<id>``) and which kind of listing it
+contains (``feed``, ``feed:participant:<user id>``).
+
+Tags are invalidated by bumping a per-tag version token stored in the same
+Django cache. A cached response remembers the token of each of its tags
+and is only served while all of them are unchanged, so one invalidation
+retires every response that touched the bet without having to find them.
+
+Tags are only known once the query has run, so a mutation committing
+mid-execution could bump a tag after its rows were read but before its
+version is. Tokens therefore carry the time of their bump, and ``store``
+drops a response any of whose tags was bumped after execution started
+(less ``CLOCK_SKEW`` for clocks of other hosts); a tag without a token
+counts as just bumped. Stored versions are thus ones that were already
+current before execution.
+User fields are not tagged; the short TTL bounds how long a renamed user
+can show up under their old name.
+
+Configured by ``settings.GRAPHQL_RESPONSE_CACHE``::
+
+    GRAPHQL_RESPONSE_CACHE = {"CACHE_ALIAS": "default", "TTL": 5}
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.dispatch import receiver
+from graphql import print_ast
+
+from bets.models import Bet, BetOption, BetParticipant
+from bets.signals import bet_changed, bets_expired
+
+from . import metrics
+
+DEFAULT_SETTINGS = {"CACHE_ALIAS": "default", "TTL": 5}
+
+FEED_TAG = "feed"
+
+# Seconds by which the clocks of the processes bumping tags may disagree.
+CLOCK_SKEW = 0.5
+
+
+def _settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "GRAPHQL_RESPONSE_CACHE", {})}
+
+
+def _cache():
+    return caches[_settings()["CACHE_ALIAS"]]
+
+
+def bet_tag(bet_id):
+    return f"bet:{bet_id}"
+
+
+def participant_feed_tag(user_id):
+    return f"{FEED_TAG}:participant:{user_id}"
+
+
+def _tag_key(tag):
+    return f"gqlresp:tag:{tag}"
+
+
+def cache_key(document, operation_name, variables):
+    payload = json.dumps(
+        [print_ast(document), operation_name, variables or {}],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return "gqlresp:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _new_version():
+    return f"{time.time():.6f}:{uuid.uuid4().hex}"
+
+
+def _bumped_at(version):
+    stamp, separator, _ = version.partition(":")
+    # Tokens without a time predate it; they were bumped long ago.
+    return float(stamp) if separator else 0.0
+
+
+def _tag_versions(tags):
+    """Current version token of each tag, creating missing ones."""
+    cache = _cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+async def _atag_versions(tags):
+    """``_tag_versions`` for async callers."""
+    cache = _cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = await cache.aget_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _current_body(entry, versions):
+    """The body of a cached ``entry`` if ``versions`` (tag key -> token) still match its tags."""
+    body, tags = entry
+    if versions == {_tag_key(tag): version for tag, version in tags.items()}:
+        return body
+    return None
+
+
+def _bumped_since(versions, started):
+    return any(_bumped_at(version) >= started - CLOCK_SKEW for version in versions.values())
+
+
+def lookup(key):
+    """Return the cached response body, or None if missing or any tag was invalidated."""
+    cache = _cache()
+    entry = cache.get(key)
+    body = None
+    if entry is not None:
+        body = _current_body(entry, cache.get_many([_tag_key(tag) for tag in entry[1]]))
+    metrics.record_cache("response", body is not None)
+    return body
+
+
+async def alookup(key):
+    """``lookup`` for async views."""
+    cache = _cache()
+    entry = await cache.aget(key)
+    body = None
+    if entry is not None:
+        body = _current_body(entry, await cache.aget_many([_tag_key(tag) for tag in entry[1]]))
+    metrics.record_cache("response", body is not None)
+    return body
+
+
+def store(key, body, tags, started):
+    """
+    Cache ``body`` unless one of its tags was bumped after ``started`` (a
+    ``time.time()`` taken before execution). Returns whether it was stored.
+    """
+    versions = _tag_versions(tags)
+    if _bumped_since(versions, started):
+        return False
+    _cache().set(key, (body, versions), _settings()["TTL"])
+    return True
+
+
+async def astore(key, body, tags, started):
+    """``store`` for async views."""
+    versions = await _atag_versions(tags)
+    if _bumped_since(versions, started):
+        return False
+    await _cache().aset(key, (body, versions), _settings()["TTL"])
+    return True
+
+
+def invalidate(*tags):
+    version = _new_version()
+    _cache().set_many({_tag_key(tag): version for tag in tags}, None)
+
+
+class TagCollectorMiddleware:
+    """
+    Graphene middleware recording the cache tags of the objects a query
+    resolved fields on into ``info.context.response_cache_tags``. Only
+    installed for requests whose response may be cached.
+    """
+
+    def resolve(self, next, root, info, **args):
+        tags = info.context.response_cache_tags
+        if isinstance(root, Bet):
+            tags.add(bet_tag(root.pk))
+        elif isinstance(root, (BetOption, BetParticipant)):
+            # Rows reached through their bet always have bet_id loaded; the
+            # bet itself is tagged by its own fields either way.
+            bet_id = root.__dict__.get("bet_id")
+            if bet_id is not None:
+                tags.add(bet_tag(bet_id))
+        elif root is None and info.field_name == "allBets":
+            tags.add(FEED_TAG)
+            if args.get("participant_id") is not None:
+                tags.add(participant_feed_tag(args["participant_id"]))
+        return next(root, info, **args)
+
+
+@receiver(bet_changed, dispatch_uid="core.response_cache.bet_changed")
+def invalidate_changed_bet(sender, bet_id, created=False, deleted=False, status_changed=False,
+                           participant_id=None, **kwargs):
+    tags = [bet_tag(bet_id)]
+    # New, deleted and re-statused bets move in or out of listings they
+    # were never part of, so every feed has to go.
+    if created or deleted or status_changed:
+        tags.append(FEED_TAG)
+    if participant_id is not None:
+        tags.append(participant_feed_tag(participant_id))
+    invalidate(*tags)
+
+
+@receiver(bets_expired, dispatch_uid="core.response_cache.bets_expired")
+def invalidate_expired_bets(sender, bet_ids, **kwargs):
+    invalidate(FEED_TAG, *(bet_tag(bet_id) for bet_id in bet_ids))
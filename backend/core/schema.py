@@ -3,6 +3,7 @@ from accounts.schema.mutations import Mutation as AccountsMutation
 # from accounts.schema.queries import Query as AccountsQuery
 from bets.schema.mutations import Mutation as BetsMutation
 from bets.schema.queries import Query as BetsQuery
+from bets.schema.subscriptions import Subscription as BetsSubscription
 
 class Query(BetsQuery, graphene.ObjectType):
     pass
@@ -10,4 +11,7 @@ class Query(BetsQuery, graphene.ObjectType):
 class Mutation(AccountsMutation, BetsMutation, graphene.ObjectType):
     pass
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(BetsSubscription, graphene.ObjectType):
+    pass
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -0,0 +1,157 @@
+"""
+Synthetic data at configurable scale, for benchmarks and load tests.
+
+``seed()`` creates users with funded wallets, bets with 2 to 64 options and
+skewed participation: a few viral bets take ``VIRAL_SHARE`` of all stakes
+and the remaining bets share the rest along a Zipf-like long tail. Rows
+are written through the bulk paths (``bets.bulk``), so the usual rules,
+ledger entries and pool aggregates hold for seeded data too.
+
+Seeded users get numbered phones in ``User_Login``'s format
+(``+2519`` and eight digits) and all share ``SEED_PASSWORD``.
+"""
+import random
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Wallet, WalletLedgerEntry
+from bets.bulk import MAX_BATCH_SIZE, create_bets, place_stakes
+from bets.models import BetOption
+
+User = get_user_model()
+
+SEED_PASSWORD = "seed-password"
+PHONE_PREFIX = "+2519"
+STARTING_BALANCE = Decimal("100000.00")
+VIRAL_SHARE = 0.5
+STAKE_AMOUNTS = [Decimal(amount) for amount in ("1", "2", "5", "10", "20", "50", "100")]
+
+SeedResult = namedtuple("SeedResult", ["user_ids", "bet_ids", "viral_bet_ids", "stakes"])
+
+
+def seed(users=1000, bets=200, viral_bets=3, stakes=5000, random_seed=0):
+    """Create the data set and return the ids of what was created."""
+    rng = random.Random(random_seed)
+    user_ids = create_users(users)
+    bet_ids = create_seed_bets(rng, user_ids, bets)
+    viral_bet_ids = bet_ids[:viral_bets]
+    placed = place_seed_stakes(rng, user_ids, bet_ids, viral_bet_ids, stakes)
+    return SeedResult(user_ids, bet_ids, viral_bet_ids, placed)
+
+
+def seed_phone(number):
+    return f"{PHONE_PREFIX}{number:08d}"
+
+
+def create_users(count):
+    """Users with a wallet holding ``STARTING_BALANCE``, booked as a ledger deposit."""
+    # Continue after earlier seeds; fixed-width phones sort numerically.
+    last = User.objects.filter(phone__startswith=PHONE_PREFIX).aggregate(last=Max("phone"))["last"]
+    first = int(last[len(PHONE_PREFIX):]) + 1 if last else 0
+    # Hashing is deliberately slow, so every seeded user shares one hash.
+    password = make_password(SEED_PASSWORD)
+
+    user_ids = []
+    for start in range(first, first + count, MAX_BATCH_SIZE):
+        stop = min(start + MAX_BATCH_SIZE, first + count)
+        with transaction.atomic():
+            created = User.objects.bulk_create([
+                User(phone=seed_phone(number), first_name="Seed", last_name=str(number), password=password)
+                for number in range(start, stop)
+            ])
+            ids = [user.pk for user in created]
+            Wallet.objects.bulk_create([Wallet(user_id=user_id, balance=STARTING_BALANCE) for user_id in ids])
+            WalletLedgerEntry.objects.bulk_create([
+                WalletLedgerEntry(
+                    user_id=user_id, amount=STARTING_BALANCE, kind=WalletLedgerEntry.DEPOSIT,
+                    reference=f"seed:deposit:{user_id}",
+                )
+                for user_id in ids
+            ])
+        user_ids.extend(ids)
+    return user_ids
+
+
+def _option_count(rng):
+    # Mostly yes/no bets, some multi-way markets, a few 64-team brackets.
+    roll = rng.random()
+    if roll < 0.6:
+        return 2
+    if roll < 0.9:
+        return rng.randint(3, 8)
+    if roll < 0.98:
+        return rng.randint(9, 32)
+    return 64
+
+
+def create_seed_bets(rng, user_ids, count):
+    if len(user_ids) < 2:
+        raise ValueError("Seeding bets needs at least two users.")
+    now = timezone.now()
+    bet_ids = []
+    for start in range(0, count, MAX_BATCH_SIZE):
+        batch = []
+        for number in range(start, min(start + MAX_BATCH_SIZE, count)):
+            creator_id, judge_id = rng.sample(user_ids, 2)
+            batch.append({
+                "creator_id": creator_id,
+                "judge_id": judge_id,
+                "title": f"Seed bet {number}",
+                "description": f"Synthetic bet {number} for benchmarks.",
+                "options": [f"Option {i}" for i in range(_option_count(rng))],
+                "expires_at": now + timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 1439)),
+            })
+        bet_ids.extend(result.instance.pk for result in create_bets(batch))
+    return bet_ids
+
+
+def _participants_per_bet(rng, bet_ids, viral_bet_ids, stakes, max_participants):
+    viral = set(viral_bet_ids)
+    tail = [bet_id for bet_id in bet_ids if bet_id not in viral]
+    viral_stakes = int(stakes * VIRAL_SHARE) if tail else stakes
+    counts = {}
+    for bet_id in viral_bet_ids:
+        counts[bet_id] = viral_stakes // len(viral_bet_ids)
+    if tail:
+        rng.shuffle(tail)
+        weights = [1 / (rank + 1) ** 1.1 for rank in range(len(tail))]
+        total = sum(weights)
+        for bet_id, weight in zip(tail, weights):
+            counts[bet_id] = round((stakes - viral_stakes) * weight / total)
+    return {bet_id: min(count, max_participants) for bet_id, count in counts.items() if count}
+
+
+def place_seed_stakes(rng, user_ids, bet_ids, viral_bet_ids, stakes):
+    """Spread about ``stakes`` participations over the bets. Returns how many were placed."""
+    # Leave a tenth of the users out of every bet, so there is someone left
+    # to join even the hottest bet in benchmarks and load tests.
+    counts = _participants_per_bet(rng, bet_ids, viral_bet_ids, stakes, int(len(user_ids) * 0.9))
+    options = {}
+    judges = {}
+    for option in BetOption.objects.filter(bet_id__in=list(counts)).values("pk", "bet_id", "bet__judge_id"):
+        options.setdefault(option["bet_id"], []).append(option["pk"])
+        judges[option["bet_id"]] = option["bet__judge_id"]
+
+    placed = 0
+    batch = []
+    for bet_id, count in counts.items():
+        bet_options = options[bet_id]
+        # A favourite and an outsider or two, rather than a uniform split.
+        weights = [rng.paretovariate(1.5) for _ in bet_options]
+        sample = rng.sample(user_ids, min(count + 1, len(user_ids)))
+        participants = [user_id for user_id in sample if user_id != judges[bet_id]][:count]
+        for user_id, option_id in zip(participants, rng.choices(bet_options, weights, k=len(participants))):
+            batch.append({"user_id": user_id, "bet_id": bet_id, "bet_option_id": option_id, "stake": rng.choice(STAKE_AMOUNTS)})
+            if len(batch) == MAX_BATCH_SIZE:
+                placed += sum(result.success for result in place_stakes(batch))
+                batch = []
+    if batch:
+        placed += sum(result.success for result in place_stakes(batch))
+    return placed
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
+import hashlib
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,16 +43,19 @@ INSTALLED_APPS = [
 
     'bets',
     'accounts',
+    'core',
 
     "graphene_django",
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.auth.JWTAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,6 +94,16 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# New hashes use the tuned PBKDF2 (see accounts/hashing.py); the others still
+# verify older hashes, which are upgraded on the next login.
+PASSWORD_HASHERS = [
+    'accounts.hashing.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -157,12 +172,20 @@ LOGGING = {
         },
         "debugger": {
             "handlers": ["console_debug"],
-            "level": "DEBUG",
+            # Below DEBUG the logger itself is off, so debug calls return
+            # before their arguments are formatted
+            "level": "DEBUG" if DEBUG else "INFO",
             "propagate": False,
         },
     },
 }
 
+# LOG_FORMAT=json: every logger writes JSON lines through a bounded queue
+# drained by a background thread (core.log) instead of the colored console
+if os.environ.get("LOG_FORMAT") == "json":
+    LOGGING["handlers"]["json"] = {"()": "core.log.QueueJSONHandler", "level": "DEBUG"}
+    for logger_config in (LOGGING["root"], *LOGGING["loggers"].values()):
+        logger_config["handlers"] = ["json"]
 
 
 # Internationalization
@@ -188,3 +211,122 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "accounts.User"
+
+# Bet read models, cached responses, persisted queries and token revocations
+# live here. The expiry scheduler and settle_bets invalidate them from their
+# own processes, so production must set REDIS_URL (the accounts.E001 deploy
+# check enforces it). Without it each process keeps its own LocMemCache and
+# sees other processes' changes only when entries expire. KEY_PREFIX keeps
+# databases that share one Redis apart.
+CACHE_KEY_PREFIX = hashlib.sha1(str(DATABASES["default"]["NAME"]).encode()).hexdigest()[:12]
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": CACHE_KEY_PREFIX,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "KEY_PREFIX": CACHE_KEY_PREFIX,
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Cross-request cache for betGet read models (see bets/cache.py). It lives
+# in the default cache so that, on Redis, the expiry scheduler's and
+# settle_bets' invalidations reach every worker; "bets.cache.LocMemLRUBackend"
+# is faster but only sees its own process's invalidations.
+BETS_READ_CACHE = {
+    "BACKEND": "bets.cache.DjangoCacheBackend",
+    "TTL": 30,
+    "OPTIONS": {"alias": "default"},
+}
+
+# Whole-response cache for anonymous GraphQL queries (see core/response_cache.py).
+GRAPHQL_RESPONSE_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 5,
+}
+
+# Persisted queries and the parsed-document cache (see core/persisted_queries.py).
+# Registration lets any client store queries in the shared cache; enable it
+# only together with the TTL and size limit.
+GRAPHQL_PERSISTED_QUERIES = {
+    "MANIFEST": None,
+    "ALLOW_REGISTRATION": False,
+    "REGISTRATION_TTL": 86400,
+    "MAX_REGISTERED_QUERY_SIZE": 10000,
+    "CACHE_ALIAS": "default",
+    "DOCUMENT_CACHE_SIZE": 1000,
+}
+
+# Static query cost and depth limits (see core/query_cost.py).
+GRAPHQL_QUERY_COST = {
+    "MAX_COST": 5000,
+    "MAX_DEPTH": 10,
+    "DEFAULT_LIST_SIZE": 20,
+    "FIELD_COSTS": {},
+}
+
+# Serve /graphql/ with core.views.AsyncGraphQLView. core/asgi.py turns this
+# on; WSGI deployments keep the synchronous view.
+GRAPHQL_ASYNC_VIEW = os.environ.get("GRAPHQL_ASYNC_VIEW") == "1"
+
+# Pub/sub behind GraphQL subscriptions (see core/pubsub.py). Swap the backend
+# for a broker to fan out across processes.
+GRAPHQL_PUBSUB = {
+    "BACKEND": "core.pubsub.InMemoryPubSub",
+    "OPTIONS": {"queue_size": 100},
+}
+
+# Bet updates are coalesced per bet over this many seconds (see bets/subscriptions.py).
+BETS_SUBSCRIPTIONS = {
+    "COALESCE_WINDOW": 0.25,
+}
+
+# Per-request SQL/resolver accounting, the N+1 detector and the Prometheus
+# endpoint at /metrics/ (see core/metrics.py).
+GRAPHQL_METRICS = {
+    "ENABLED": True,
+    "EXTENSIONS": DEBUG,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "ENDPOINT_TOKEN": os.environ.get("METRICS_TOKEN"),
+}
+
+# JWTs are verified from their claims alone, without loading the user
+# (see accounts/auth.py). Revocations are kept in the cache only for as
+# long as a token can live, so tokens must expire.
+GRAPHQL_JWT = {
+    "JWT_PAYLOAD_HANDLER": "accounts.auth.jwt_payload",
+    "JWT_VERIFY_EXPIRATION": True,
+    "JWT_EXPIRATION_DELTA": timedelta(hours=1),
+}
+
+# Verified principals are reused for TTL seconds per process; revocations
+# are shared through CACHE_ALIAS, which must be shared by every process
+# (checked by manage.py check --deploy).
+ACCOUNTS_PRINCIPALS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 30,
+    "MAX_ENTRIES": 10000,
+}
+
+# New wallets open with OPENING_BALANCE, booked as a DEPOSIT; further funds
+# are added with manage.py deposit.
+ACCOUNTS_WALLETS = {
+    "OPENING_BALANCE": "100.00",
+}
+
+# Signup and login hash passwords on a bounded thread pool and fail fast
+# when it is saturated (see accounts/hashing.py). ITERATIONS can be measured
+# for a latency target with manage.py tune_password_hashing.
+ACCOUNTS_PASSWORD_HASHING = {
+    "WORKERS": 4,
+    "MAX_QUEUE": 32,
+    "TIMEOUT": 5,
+    "ITERATIONS": 1000000,
+}
@@ -14,12 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from graphene_django.views import GraphQLView
+from bets.views import bet_cache_stats
 from .schema import schema
+from .metrics import metrics_view
+from .views import AsyncGraphQLView, CachedGraphQLView
+
+# The async view only pays off when served over ASGI (see core/asgi.py).
+GraphQLEndpoint = AsyncGraphQLView if settings.GRAPHQL_ASYNC_VIEW else CachedGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql/", GraphQLView.as_view(graphiql=True, schema=schema)),
+    path("metrics/", metrics_view),
+    path("metrics/bet-cache/", bet_cache_stats),
+    path("graphql/", GraphQLEndpoint.as_view(graphiql=True, schema=schema)),
 ]
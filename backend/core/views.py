@@ -0,0 +1,404 @@
+import inspect
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import close_old_connections, connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.views.generic import View
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, FieldNode, GraphQLError, OperationType, execute, get_operation_ast, validate_schema,
+)
+
+from . import metrics, persisted_queries, query_cost, response_cache
+
+
+def _operation_name(operation, operation_name):
+    return operation_name or (operation.name.value if operation.name else None)
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    ``GraphQLView`` that accepts persisted query hashes and takes parsed,
+    validated documents from ``core.persisted_queries``' LRU instead of
+    parsing and validating the query text on every request.
+
+    Operations over the limits of ``core.query_cost`` are rejected before
+    execution; the computed cost is reported under ``extensions.cost``, and
+    the request's ``core.metrics`` profile under ``extensions.metrics``.
+    """
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions if isinstance(extensions, dict) else None
+
+    def get_document(self, request, data, query):
+        """
+        Return ``(document, errors)`` for the request's query. The result is
+        kept on the request so the view and execution share one lookup.
+        """
+        documents = request.__dict__.setdefault("graphql_documents", {})
+        if id(data) in documents:
+            return documents[id(data)]
+
+        try:
+            query, sha256_hash = persisted_queries.resolve_query(query, self.get_extensions(request, data))
+        except GraphQLError as e:
+            result = (None, [e])
+        else:
+            if not query:
+                result = (None, None)
+            else:
+                result = persisted_queries.get_document_cache().get(
+                    self.schema.graphql_schema, self.validation_rules, sha256_hash, query
+                )
+        documents[id(data)] = result
+        return result
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.build_response(request, execution_result, id, show_graphiql)
+
+    def response_extensions(self, request):
+        extensions = dict(getattr(request, "graphql_extensions", {}))
+        profile = metrics.extension()
+        if profile is not None:
+            extensions["metrics"] = profile
+        return extensions
+
+    def get_middleware(self, request):
+        middleware = list(super().get_middleware(request) or [])
+        if metrics.current_profile() is not None:
+            middleware.append(metrics.ResolverMetricsMiddleware())
+        return middleware
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        """Execute the cached document for ``query`` instead of parsing and validating it again."""
+        document, errors = self.get_document(request, data, query)
+        if document is None and errors is None:
+            # No query at all: graphene-django renders GraphiQL or rejects the request.
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is not None:
+            metrics.set_operation(operation_ast.operation.value, _operation_name(operation_ast, operation_name))
+        return self.execute_document(request, document, operation_ast, variables, operation_name, show_graphiql)
+
+    def check_cost(self, request, schema, document, operation_name, variables):
+        """Errors rejecting an operation over the ``core.query_cost`` limits, if any."""
+        cost = query_cost.analyze(schema, document, operation_name, variables)
+        if cost is None:
+            return None
+        request.graphql_extensions = {"cost": query_cost.extension(cost)}
+        return query_cost.check(cost)
+
+    # graphene-django has no hook between parsing and execution, nor one for
+    # the response body: both happen inline in GraphQLView.get_response and
+    # execute_graphql_request. ``build_response`` and ``execute_document``
+    # are those parts of graphene-django 3.2.3 (pinned in requirements.txt),
+    # unchanged apart from the lines marked "Ours". Re-sync them with the
+    # upstream methods when upgrading.
+
+    def build_response(self, request, execution_result, id=None, show_graphiql=False):
+        """Return ``(body, status_code)`` for an execution result, with our extensions."""
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(not getattr(e, "path", None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        # Ours: cost, metrics and any extensions set during execution.
+        extensions = {**(execution_result.extensions or {}), **self.response_extensions(request)}
+        if extensions:
+            response["extensions"] = extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def execute_document(self, request, document, operation_ast, variables, operation_name, show_graphiql=False):
+        """Execute an already validated ``document``; the upstream body of ``execute_graphql_request``."""
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    f"Can only perform a {operation_ast.operation.value} operation from a POST request.",
+                )
+            )
+
+        # Ours: reject over-budget operations before executing them.
+        cost_errors = self.check_cost(request, schema, document, operation_name, variables)
+        if cost_errors:
+            return ExecutionResult(data=None, errors=cost_errors)
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class CachedGraphQLView(PersistedQueryGraphQLView):
+    """
+    GraphQL view that serves anonymous queries from the response cache
+    (see ``core.response_cache``). Mutations, authenticated requests and
+    responses with errors always go through normal execution.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        status = getattr(request, "response_cache_status", None)
+        if status is not None:
+            response["X-Cache"] = status
+        return response
+
+    @staticmethod
+    def is_cacheable_request(request):
+        return not request.user.is_authenticated and "HTTP_AUTHORIZATION" not in request.META
+
+    def get_response(self, request, data, show_graphiql=False):
+        if show_graphiql or self.batch or not self.is_cacheable_request(request):
+            return super().get_response(request, data, show_graphiql)
+
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        key = self.response_cache_key(request, data, query, variables, operation_name)
+        if key is None:
+            return super().get_response(request, data, show_graphiql)
+        body = response_cache.lookup(key)
+        if body is not None:
+            request.response_cache_status = "HIT"
+            return body, 200
+
+        request.response_cache_status = "MISS"
+        request.response_cache_tags = set()
+        request.response_cache_started = time.time()
+        body, status_code = super().get_response(request, data, show_graphiql)
+        self.store_response(request, key, body, status_code)
+        return body, status_code
+
+    def response_cache_key(self, request, data, query, variables, operation_name):
+        """The response cache key of a valid query operation, or None for anything else."""
+        document, errors = self.get_document(request, data, query)
+        if document is None or errors:
+            return None
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.QUERY:
+            return None
+        metrics.set_operation(operation.operation.value, _operation_name(operation, operation_name))
+        return response_cache.cache_key(document, operation_name, variables)
+
+    @staticmethod
+    def store_response(request, key, body, status_code):
+        if status_code == 200 and not request.response_cache_errors:
+            response_cache.store(key, body, request.response_cache_tags, request.response_cache_started)
+
+    @staticmethod
+    async def astore_response(request, key, body, status_code):
+        if status_code == 200 and not request.response_cache_errors:
+            await response_cache.astore(key, body, request.response_cache_tags, request.response_cache_started)
+
+    def get_middleware(self, request):
+        middleware = list(super().get_middleware(request) or [])
+        if getattr(request, "response_cache_tags", None) is not None:
+            middleware.append(response_cache.TagCollectorMiddleware())
+        return middleware
+
+    def response_extensions(self, request):
+        extensions = super().response_extensions(request)
+        if getattr(request, "response_cache_tags", None) is not None:
+            # The stored body is served to other requests; keep this one's timings out.
+            extensions.pop("metrics", None)
+        return extensions
+
+    def build_response(self, request, execution_result, id=None, show_graphiql=False):
+        request.response_cache_errors = bool(execution_result is None or execution_result.errors)
+        return super().build_response(request, execution_result, id, show_graphiql)
+
+
+class SyncResolverFallbackMiddleware:
+    """
+    Graphene middleware for async execution: a resolver that is not
+    async-aware and touches the ORM raises ``SynchronousOnlyOperation`` on
+    the event loop, so it is run again in a worker thread instead.
+    """
+
+    def resolve(self, next, root, info, **args):
+        try:
+            return next(root, info, **args)
+        except SynchronousOnlyOperation:
+            return sync_to_async(next)(root, info, **args)
+
+
+class AsyncGraphQLView(CachedGraphQLView):
+    """
+    Native async variant of ``CachedGraphQLView`` for ASGI deployments.
+
+    Queries run on the event loop with async loaders (see
+    ``bets.schema.loaders``), so sibling fields resolve concurrently and a
+    worker waiting on the database keeps serving other connections.
+    Mutations keep their synchronous, transactional execution in a worker
+    thread; GraphiQL is rendered by the synchronous view as well.
+    """
+
+    http_method_names = ["get", "post"]
+
+    # Mutations that wait on the password hashing pool (accounts.hashing).
+    # They run on a thread of their own: on the single thread shared by all
+    # thread-sensitive sync code, every other sync call of the worker would
+    # queue behind the hash.
+    hashing_mutations = frozenset({"User_Create", "User_Login"})
+
+    def dispatch(self, request, *args, **kwargs):
+        return View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            if self.batch:
+                responses = [await self.aget_response(request, entry) for entry in data]
+                result = "[{}]".format(",".join(response[0] for response in responses))
+                status_code = max((response[1] for response in responses), default=200)
+            else:
+                result, status_code = await self.aget_response(request, data)
+
+            response = HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+
+        status = getattr(request, "response_cache_status", None)
+        if status is not None:
+            response["X-Cache"] = status
+        return response
+
+    post = get
+
+    def is_hashing_mutation(self, operation):
+        if operation is None or operation.operation != OperationType.MUTATION:
+            return False
+        fields = {
+            selection.name.value for selection in operation.selection_set.selections if isinstance(selection, FieldNode)
+        }
+        return bool(fields) and fields <= self.hashing_mutations
+
+    def get_response_unshared(self, request, data):
+        """``get_response`` on a non-thread-sensitive worker, which owns its database connection."""
+        close_old_connections()
+        try:
+            return super().get_response(request, data)
+        finally:
+            close_old_connections()
+
+    async def ais_cacheable_request(self, request):
+        user = await request.auser()
+        return not user.is_authenticated and "HTTP_AUTHORIZATION" not in request.META
+
+    async def aget_response(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        document, errors = self.get_document(request, data, query)
+        operation = get_operation_ast(document, operation_name) if document is not None and not errors else None
+        if operation is None or operation.operation != OperationType.QUERY:
+            if self.is_hashing_mutation(operation):
+                return await sync_to_async(self.get_response_unshared, thread_sensitive=False)(request, data)
+            return await sync_to_async(super().get_response)(request, data)
+
+        metrics.set_operation(operation.operation.value, _operation_name(operation, operation_name))
+        key = None
+        if not self.batch and await self.ais_cacheable_request(request):
+            key = response_cache.cache_key(document, operation_name, variables)
+            body = await response_cache.alookup(key)
+            if body is not None:
+                request.response_cache_status = "HIT"
+                return body, 200
+            request.response_cache_status = "MISS"
+            request.response_cache_tags = set()
+            request.response_cache_started = time.time()
+
+        request.graphql_async = True
+        result = self.execute_graphql_request(request, data, query, variables, operation_name)
+        if inspect.isawaitable(result):
+            try:
+                result = await result
+            except Exception as e:
+                result = ExecutionResult(errors=[e])
+
+        body, status_code = self.build_response(request, result, id)
+        if key is not None:
+            await self.astore_response(request, key, body, status_code)
+        return body, status_code
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        if getattr(request, "graphql_async", False):
+            middleware.insert(0, SyncResolverFallbackMiddleware())
+        return middleware